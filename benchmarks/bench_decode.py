@@ -0,0 +1,83 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Compares decoding the base64 data of stream records with base64.b64decode and
+ion.loads, as the function used to, with decode_payload. For every variant it reports
+the records decoded per second and, traced by tracemalloc in a separate run, the
+transient memory of decoding one record: the peak of a loop that drops every decoded
+value, which is made of the copies and reader state of a single record.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_decode --revisions 20000
+"""
+from benchmarks.synthetic import generate_payloads
+from src.qldb_streaming_to_es_sample.helpers.payload_decoder import decode_payload
+import amazon.ion.simpleion as ion
+import argparse
+import base64
+import binascii
+import time
+import tracemalloc
+
+VARIANTS = {
+    "base64.b64decode": lambda data: base64.b64decode(data),
+    "binascii.a2b_base64": lambda data: binascii.a2b_base64(data),
+    "b64decode + ion.loads": lambda data: ion.loads(base64.b64decode(data)),
+    "decode_payload": decode_payload,
+}
+
+
+def _decode_all(decode, batch):
+    for data in batch:
+        decode(data)
+
+
+def run(revisions, repeat):
+    batch = [base64.b64encode(payload).decode("ascii") for payload in generate_payloads(revisions)]
+    results = {}
+
+    for name, decode in VARIANTS.items():
+        seconds = []
+        for run in range(repeat):
+            start = time.perf_counter()
+            _decode_all(decode, batch)
+            seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        _decode_all(decode, batch)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {"records_per_second": len(batch) / min(seconds), "peak_bytes": peak_bytes}
+
+    return len(batch), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revisions", type=int, default=20000, help="revisions in the batch")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant, the fastest one is reported")
+    args = parser.parse_args()
+
+    records, results = run(args.revisions, args.repeat)
+    print("{:,} records".format(records))
+    for name, result in results.items():
+        print("{:<25} {:>14,.0f} records/s {:>10,} bytes peak".format(name, result["records_per_second"],
+                                                                       result["peak_bytes"]))
+
+
+if __name__ == "__main__":
+    main()
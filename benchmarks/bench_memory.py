@@ -0,0 +1,114 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Compares the peak memory of the handler with the whole batch deaggregated up front and
+with streaming deaggregation (STREAMING_DEAGGREGATION_ENABLED). Every mode runs in a
+fresh process that loads a synthetic batch of aggregated records from a file, so that
+generating the batch does not count, and reports how much the peak RSS grew during the
+invocation. Writes go to a mocked client in bulk mode.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_memory --revisions 10000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+MODES = ("deaggregate_all", "streaming")
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+def measure_once(event_path, mode):
+    """
+    Runs in the child process and prints the peak RSS growth of one invocation as JSON.
+    """
+    from benchmarks.bench_pipeline import handler
+    from src.qldb_streaming_to_es_sample import app
+    from unittest import mock
+    import gc
+
+    # One record per line, so that loading the batch does not raise the peak above the batch itself
+    with open(event_path) as event_file:
+        event = {"Records": [json.loads(line) for line in event_file]}
+    gc.collect()
+
+    before = _rss_bytes()
+    # The peak RSS of the process so far is at least the current RSS, ru_maxrss is in KiB on Linux
+    baseline = max(before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+    with mock.patch.object(app, "STREAMING_DEAGGREGATION_ENABLED", mode == "streaming"):
+        handler(event, bulk=True)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(json.dumps({"mode": mode, "rss_bytes": before, "peak_bytes": peak,
+                      "peak_growth_bytes": max(peak - baseline, 0)}))
+
+
+def run(revisions, runs):
+    from benchmarks.synthetic import kinesis_event
+
+    environment = dict(os.environ, LOG_LEVEL="WARNING")
+    results = {}
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as event_file:
+        for record in kinesis_event(revisions)["Records"]:
+            event_file.write(json.dumps(record) + "\n")
+        event_file.flush()
+
+        for mode in MODES:
+            samples = []
+            for run in range(runs):
+                output = subprocess.check_output([sys.executable, "-m", "benchmarks.bench_memory", "--child", mode,
+                                                  "--event", event_file.name], env=environment)
+                samples.append(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+            results[mode] = min(samples, key=lambda sample: sample["peak_growth_bytes"])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revisions", type=int, default=10000, help="revisions in the batch")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="fresh processes per mode, the run with the lowest peak growth is reported")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--event", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_once(args.event, args.child)
+        return
+
+    results = run(args.revisions, args.runs)
+    for mode in MODES:
+        print("{:<20} {:>10.1f} MiB peak RSS growth {:>10.1f} MiB peak RSS".format(
+            mode, results[mode]["peak_growth_bytes"] / 1024 / 1024, results[mode]["peak_bytes"] / 1024 / 1024))
+
+    before, after = results["deaggregate_all"]["peak_growth_bytes"], results["streaming"]["peak_growth_bytes"]
+    if before:
+        print("{:<20} {:>10.1%}".format("reduction", 1 - after / before))
+
+
+if __name__ == "__main__":
+    main()
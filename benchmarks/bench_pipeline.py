@@ -0,0 +1,195 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Measures every stage of the indexing pipeline on a synthetic batch: deaggregation,
+base64 decoding, Ion parsing, filtering, projection, serialization and the whole
+handler against a mocked client. Each stage runs on the output of the previous one
+and reports its throughput, and in a separate run traced by tracemalloc, the memory
+it allocated at peak and still holds when it returns.
+
+Results are written as JSON with --output; pass an earlier file with --compare to
+print the change of every stage.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_pipeline --revisions 10000 --output pipeline.json
+    python -m benchmarks.bench_pipeline --revisions 10000 --compare pipeline.json
+"""
+from benchmarks.synthetic import kinesis_event
+from unittest import mock
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+# Set before the function is imported, which sets the level of its loggers
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from aws_kinesis_agg.deaggregator import deaggregate_records
+from src.qldb_streaming_to_es_sample import app
+from src.qldb_streaming_to_es_sample.clients.bulk_indexer import BulkIndexer
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from src.qldb_streaming_to_es_sample.helpers.filtered_records_generator import filter_revision_record
+from src.qldb_streaming_to_es_sample.helpers.loader import add_action
+from src.qldb_streaming_to_es_sample.helpers.payload_decoder import decode_base64
+from src.qldb_streaming_to_es_sample.helpers.table_mappings import load_table_mappings
+import amazon.ion.simpleion as ion
+
+
+class FakeElasticsearchClient:
+    """
+    Answers every request with success, so the handler is measured without network time.
+    """
+
+    def __init__(self, serializer):
+        self.es_client = mock.Mock()
+        self.es_client.transport.serializer = serializer
+
+    def index(self, index, id, body, version):
+        return {"result": "created"}
+
+    def delete(self, index, id, version):
+        return {"result": "deleted"}
+
+    def bulk(self, actions):
+        return [{"status": 201}] * len(actions)
+
+    def connection_stats(self):
+        return {"requests": 0, "new_connections": 0, "reused_connections": 0}
+
+
+def serialize(serializer, actions):
+    """
+    Queues actions in a BulkIndexer and sends them to the fake client in one request,
+    which measures the serialization of the bulk entries.
+    """
+    bulk_indexer = BulkIndexer(FakeElasticsearchClient(serializer), max_actions=len(actions) + 1,
+                               max_bytes=sys.maxsize, keep_results=False)
+    for action in actions:
+        add_action(bulk_indexer, action)
+    return bulk_indexer.flush()
+
+
+def handler(event, bulk):
+    client = FakeElasticsearchClient(app.serializer)
+    with mock.patch.object(app, "get_elasticsearch_client", return_value=client), \
+            mock.patch.object(app, "BULK_INDEXING_ENABLED", bulk):
+        return app.lambda_handler(event, None)
+
+
+def stages(event):
+    """
+    Returns the stages in pipeline order as (name, function, input, input count).
+    The inputs are computed once with the stages themselves.
+    """
+    table_mappings = load_table_mappings()
+    serializer = IonJSONSerializer()
+
+    records = deaggregate_records(event["Records"])
+    payloads = [decode_base64(record["kinesis"]["data"]) for record in records]
+    ion_records = [ion.loads(payload) for payload in payloads]
+    revisions = [revision for revision in (filter_revision_record(ion_record, table_mappings.table_names)
+                                           for ion_record in ion_records) if revision]
+    actions = list(table_mappings.create_actions(revisions))
+
+    return [
+        # Counted in user records, so that the throughput of all stages is comparable
+        ("deaggregate", lambda: deaggregate_records(event["Records"]), len(records)),
+        ("base64_decode", lambda: [decode_base64(record["kinesis"]["data"]) for record in records], len(records)),
+        ("ion_parse", lambda: [ion.loads(payload) for payload in payloads], len(payloads)),
+        ("filter", lambda: [filter_revision_record(ion_record, table_mappings.table_names)
+                            for ion_record in ion_records], len(ion_records)),
+        ("projection", lambda: list(table_mappings.create_actions(revisions)), len(revisions)),
+        ("serialization", lambda: serialize(serializer, actions), len(actions)),
+        ("handler", lambda: handler(event, bulk=False), len(records)),
+        ("handler_bulk", lambda: handler(event, bulk=True), len(records)),
+    ]
+
+
+def measure(function, repeat):
+    """
+    Returns the fastest of repeat runs, then the peak and retained bytes of a traced run.
+    """
+    seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+
+    tracemalloc.start()
+    result = function()
+    retained_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return seconds, peak_bytes, retained_bytes
+
+
+def run(revisions, aggregated, repeat):
+    event = kinesis_event(revisions, aggregated=aggregated)
+    results = {"python": platform.python_version(), "platform": platform.platform(), "time": time.time(),
+               "revisions": revisions, "aggregated": aggregated, "kinesis_records": len(event["Records"]),
+               "stages": {}}
+
+    for name, function, count in stages(event):
+        seconds, peak_bytes, retained_bytes = measure(function, repeat)
+        results["stages"][name] = {"items": count, "seconds": seconds, "items_per_second": count / seconds,
+                                   "peak_bytes": peak_bytes, "retained_bytes": retained_bytes}
+
+    return results
+
+
+def report(results, baseline=None):
+    print("{revisions:,} revisions in {kinesis_records:,} Kinesis records, aggregated: {aggregated}"
+          .format(**results))
+    print("{:<15} {:>8} {:>14} {:>12} {:>12}".format("stage", "items", "items/s", "peak KiB", "held KiB"))
+
+    for name, stage in results["stages"].items():
+        line = "{:<15} {:>8,} {:>14,.0f} {:>12,.0f} {:>12,.0f}".format(
+            name, stage["items"], stage["items_per_second"], stage["peak_bytes"] / 1024,
+            stage["retained_bytes"] / 1024)
+
+        previous = baseline and baseline["stages"].get(name)
+        if previous:
+            line += " {:>+8.1%} items/s {:>+8.1%} peak".format(
+                stage["items_per_second"] / previous["items_per_second"] - 1,
+                stage["peak_bytes"] / max(previous["peak_bytes"], 1) - 1)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revisions", type=int, default=5000, help="revisions in the batch")
+    parser.add_argument("--not-aggregated", action="store_true", help="one Kinesis record per stream record")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest one is reported")
+    parser.add_argument("--output", help="file the results are written to as JSON")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(args.revisions, not args.not_aggregated, args.repeat)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
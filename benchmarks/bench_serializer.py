@@ -0,0 +1,64 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Compares the default elasticsearch-py JSONSerializer with IonJSONSerializer on
+projected VehicleRegistration documents.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_serializer
+"""
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from elasticsearch.serializer import JSONSerializer
+import amazon.ion.simpleion as ion
+import argparse
+import timeit
+
+# A plain dict of Ion values, like the projection created by TableMapping.
+# The default serializer cannot serialize nested Ion structs, so the document is flat.
+VEHICLE_REGISTRATION_DOCUMENT = dict(ion.loads(ion.dumps(ion.loads("""{
+  VIN: "1N4AL11D75C109151",
+  LicensePlateNumber: "LEWISR261LL",
+  State: "WA",
+  PendingPenaltyTicketAmount: 90.25,
+  ValidFromDate: 2017-08-21T,
+  ValidToDate: 2020-05-11T
+}"""))).items())
+
+
+def run(number, repeat):
+    results = {}
+
+    for name, serializer in (("elasticsearch-py JSONSerializer", JSONSerializer()),
+                             ("IonJSONSerializer", IonJSONSerializer())):
+        best = min(timeit.repeat(lambda: serializer.dumps(VEHICLE_REGISTRATION_DOCUMENT),
+                                 number=number, repeat=repeat))
+        results[name] = number / best
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="documents serialized per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs, the fastest one is reported")
+    args = parser.parse_args()
+
+    for name, documents_per_second in run(args.number, args.repeat).items():
+        print("{name:<35} {rate:>12,.0f} documents/s".format(name=name, rate=documents_per_second))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Measures the cold start of the indexer: the import of the function module and
+its first invocation, each in a fresh Python process. Requests to Elasticsearch
+are answered locally, so the first invocation covers client creation, decoding
+and serialization but no network time.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --max-import-ms 400 --max-first-invocation-ms 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PERSON_REVISION = """{
+  recordType: "REVISION_DETAILS",
+  payload: {
+    tableInfo: { tableName: "Person" },
+    revision: {
+      data: { FirstName: "Nova", LastName: "Lewis", GovId: "LEWISR261LL" },
+      metadata: { version: 0, id: "a8698243bnnmjy" }
+    }
+  }
+}"""
+
+
+def measure_once():
+    """
+    Runs in the child process and prints the timings as JSON.
+    """
+    start = time.perf_counter()
+    from src.qldb_streaming_to_es_sample import app
+    imported = time.perf_counter()
+
+    from unittest import mock
+    import amazon.ion.simpleion as ion
+    import base64
+
+    data = base64.b64encode(ion.dumps(ion.loads(PERSON_REVISION))).decode("ascii")
+    event = {"Records": [{"kinesis": {"data": data, "sequenceNumber": "1"}}]}
+
+    with mock.patch("elasticsearch.Transport.perform_request", return_value={"result": "created"}):
+        invoked = time.perf_counter()
+        app.lambda_handler(event, None)
+        finished = time.perf_counter()
+
+    print(json.dumps({"import_ms": (imported - start) * 1000, "first_invocation_ms": (finished - invoked) * 1000}))
+
+
+def run(runs):
+    environment = dict(os.environ)
+    environment.setdefault("ES_HOST", "localhost")
+    environment.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    environment.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    environment.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    environment.setdefault("LOG_LEVEL", "WARNING")
+
+    samples = []
+    for run in range(runs):
+        output = subprocess.check_output([sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+                                         env=environment)
+        samples.append(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+
+    return {name: statistics.median(sample[name] for sample in samples)
+            for name in ("import_ms", "first_invocation_ms")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes, the median is reported")
+    parser.add_argument("--max-import-ms", type=float, help="fails when the median import time is higher")
+    parser.add_argument("--max-first-invocation-ms", type=float,
+                        help="fails when the median first invocation time is higher")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_once()
+        return
+
+    result = run(args.runs)
+    print("{:<25} {:>10.1f} ms".format("import", result["import_ms"]))
+    print("{:<25} {:>10.1f} ms".format("first invocation", result["first_invocation_ms"]))
+
+    limits = (("import_ms", args.max_import_ms), ("first_invocation_ms", args.max_first_invocation_ms))
+    exceeded = [name for name, limit in limits if limit is not None and result[name] > limit]
+    if exceeded:
+        sys.exit("Startup regression: {} above the limit".format(", ".join(exceeded)))
+
+
+if __name__ == "__main__":
+    main()
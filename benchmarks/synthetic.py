@@ -0,0 +1,139 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Generates synthetic QLDB stream batches for the benchmarks: REVISION_DETAILS and
+BLOCK_SUMMARY records built from the templates of the unit test fixtures, optionally
+aggregated with the KPL record format, wrapped in a Lambda Kinesis event.
+"""
+from aws_kinesis_agg.aggregator import RecordAggregator
+from tests.unit.fixtures import (person_block_summary_ion_record, person_revision_details_ion_record,
+                                 person_revision_details_ion_record_for_delete_scenario,
+                                 vehicle_registration_revision_details_ion_record)
+import amazon.ion.simpleion as ion
+import base64
+import functools
+import random
+
+PERSON = "Person"
+VEHICLE_REGISTRATION = "VehicleRegistration"
+
+# Document ids of the templates, replaced with a placeholder of the length of generated ids
+TEMPLATE_IDS = {PERSON: "a8698243bnnmjy", VEHICLE_REGISTRATION: "2136bjkdc8"}
+DOCUMENT_ID_PLACEHOLDER = "X" * 22
+
+
+def document_id(number):
+    """
+    Returns a document id with the length of QLDB document ids.
+    """
+    return "{:022d}".format(number)
+
+
+@functools.lru_cache(maxsize=None)
+def _revision_template(table, version, deleted):
+    if table == PERSON and deleted:
+        text = person_revision_details_ion_record_for_delete_scenario().replace("version: 2",
+                                                                              "version: {}".format(version))
+    elif table == PERSON:
+        text = person_revision_details_ion_record(version)
+    else:
+        text = vehicle_registration_revision_details_ion_record(version)
+
+    return ion.dumps(ion.loads(text.replace(TEMPLATE_IDS[table], DOCUMENT_ID_PLACEHOLDER)))
+
+
+def revision_details(table, id, version, deleted=False):
+    """
+    Returns a binary Ion REVISION_DETAILS record. Only the document id differs from the
+    cached template, it has the same length as the placeholder so the binary encoding stays valid.
+    """
+    return _revision_template(table, version, deleted).replace(DOCUMENT_ID_PLACEHOLDER.encode("ascii"),
+                                                               id.encode("ascii"))
+
+
+@functools.lru_cache(maxsize=None)
+def block_summary():
+    """
+    Returns a binary Ion BLOCK_SUMMARY record.
+    """
+    return ion.dumps(ion.loads(person_block_summary_ion_record()))
+
+
+def generate_payloads(revisions, documents=1000, revisions_per_block=3, delete_ratio=0.05, seed=0):
+    """
+    Returns the payloads of a stream: every block summary is followed by the revisions of its
+    transaction. Revisions are spread over the given number of documents, half of them Person
+    and half VehicleRegistration, and versions increase per document like in a ledger.
+    """
+    generator = random.Random(seed)
+    versions = {}
+    payloads = []
+
+    for revision in range(revisions):
+        if revision % revisions_per_block == 0:
+            payloads.append(block_summary())
+
+        number = generator.randrange(documents)
+        table = PERSON if number % 2 == 0 else VEHICLE_REGISTRATION
+        version = versions.get(number, -1) + 1
+        deleted = table == PERSON and version > 0 and generator.random() < delete_ratio
+        # A deleted document is inserted again as a new document
+        versions[number] = -1 if deleted else version
+
+        payloads.append(revision_details(table, document_id(number), version, deleted))
+
+    return payloads
+
+
+def kinesis_records(payloads, aggregated=True, records_per_aggregate=100, partition_key="ledger"):
+    """
+    Wraps payloads into Kinesis records of a Lambda event, aggregated into KPL records
+    of at most records_per_aggregate user records when aggregated is set.
+    """
+    if aggregated:
+        aggregator = RecordAggregator()
+        blobs = []
+
+        for start in range(0, len(payloads), records_per_aggregate):
+            for payload in payloads[start:start + records_per_aggregate]:
+                # Returns the full record when the payload does not fit anymore
+                full_record = aggregator.add_user_record(partition_key, payload)
+                if full_record:
+                    blobs.append(full_record.get_contents()[2])
+            blobs.append(aggregator.clear_and_get().get_contents()[2])
+    else:
+        blobs = payloads
+
+    return [{
+        "kinesis": {
+            "kinesisSchemaVersion": "1.0",
+            "partitionKey": partition_key,
+            "sequenceNumber": str(49590338271490256608559692538361571095921575989136588800 + number),
+            "data": base64.b64encode(blob).decode("ascii"),
+            "approximateArrivalTimestamp": 1576049251.0
+        },
+        "eventSource": "aws:kinesis",
+        "eventName": "aws:kinesis:record"
+    } for number, blob in enumerate(blobs)]
+
+
+def kinesis_event(revisions, aggregated=True, **options):
+    """
+    Returns a Lambda event with a batch holding the given number of revisions.
+    """
+    records_per_aggregate = options.pop("records_per_aggregate", 100)
+    return {"Records": kinesis_records(generate_payloads(revisions, **options), aggregated=aggregated,
+                                       records_per_aggregate=records_per_aggregate)}
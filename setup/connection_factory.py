@@ -0,0 +1,189 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Source: src/qldb_streaming_to_es_sample/clients/connection_factory.py
+# Copied to setup/connection_factory.py, since SAM packages the provisioning function
+# from its CodeUri directory only. Edit the source and copy it over; the copy is checked by
+# tests/unit/test_connection_factory.py::test_provisioning_function_copy_is_identical.
+"""
+Creates Elasticsearch clients with pooled, persistent connections.
+
+This module only depends on elasticsearch-py, requests and urllib3 so that it
+can be shared by the indexer and the provisioning function.
+"""
+from elasticsearch import Elasticsearch, RequestsHttpConnection, Urllib3HttpConnection
+from requests.adapters import HTTPAdapter
+import gzip
+import requests
+
+CONNECTION_CLASS_REQUESTS = "requests"
+CONNECTION_CLASS_URLLIB3 = "urllib3"
+
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_TIMEOUT_SECONDS = 10
+
+
+def compress(body, headers, compression_threshold):
+    """
+    Gzips request bodies of at least compression_threshold bytes.
+    Returns the body and the headers to send it with.
+    """
+    if not compression_threshold or not body or len(body) < compression_threshold:
+        return body, headers
+
+    if isinstance(body, str):
+        body = body.encode("utf-8", "surrogatepass")
+
+    headers = dict(headers or {})
+    headers["content-encoding"] = "gzip"
+
+    return gzip.compress(body), headers
+
+
+class PooledRequestsHttpConnection(RequestsHttpConnection):
+    """
+    RequestsHttpConnection with a sized connection pool and compression of large request bodies.
+    Requests sessions keep connections alive, so connections are reused across requests.
+
+    Parameters:
+       pool_maxsize (int): Number of connections kept open to the host
+       compression_threshold (int): Smallest body in bytes that is gzipped, None disables compression
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE, compression_threshold=None, **kwargs):
+        super(PooledRequestsHttpConnection, self).__init__(**kwargs)
+        self.compression_threshold = compression_threshold
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        # Compressed before the auth of the session signs the request, so the signature covers the sent body
+        body, headers = compress(body, headers, self.compression_threshold)
+
+        return super(PooledRequestsHttpConnection, self).perform_request(
+            method, url, params=params, body=body, timeout=timeout, ignore=ignore, headers=headers)
+
+    def connection_pools(self):
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                yield pools[key]
+
+
+class PooledUrllib3HttpConnection(Urllib3HttpConnection):
+    """
+    Urllib3HttpConnection that accepts a requests auth, such as AWS4Auth, to sign requests with.
+    Avoids the per-request overhead of a requests session.
+
+    Parameters:
+       http_auth: A requests auth callable, or basic auth credentials
+       pool_maxsize (int): Number of connections kept open to the host
+       compression_threshold (int): Smallest body in bytes that is gzipped, None disables compression
+    """
+
+    def __init__(self, http_auth=None, pool_maxsize=DEFAULT_POOL_MAXSIZE, compression_threshold=None, **kwargs):
+        self.signer = None
+        if callable(http_auth):
+            self.signer, http_auth = http_auth, None
+
+        super(PooledUrllib3HttpConnection, self).__init__(http_auth=http_auth, maxsize=pool_maxsize, **kwargs)
+        self.compression_threshold = compression_threshold
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        body, headers = compress(body, headers, self.compression_threshold)
+
+        if self.signer:
+            headers = self.__sign(method, url, params, body, headers)
+
+        return super(PooledUrllib3HttpConnection, self).perform_request(
+            method, url, params=params, body=body, timeout=timeout, ignore=ignore, headers=headers)
+
+    def __sign(self, method, url, params, body, headers):
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+
+        request = requests.Request(method=method, url=self.host + self.url_prefix + url, params=params,
+                                   data=body, headers=request_headers).prepare()
+        self.signer(request)
+
+        return dict(request.headers)
+
+    def connection_pools(self):
+        yield self.pool
+
+
+CONNECTION_CLASSES = {
+    CONNECTION_CLASS_REQUESTS: PooledRequestsHttpConnection,
+    CONNECTION_CLASS_URLLIB3: PooledUrllib3HttpConnection
+}
+
+
+def create_elasticsearch(host, awsauth, connection_class=CONNECTION_CLASS_REQUESTS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                         timeout=DEFAULT_TIMEOUT_SECONDS, compression_threshold=None, port=443, use_ssl=True,
+                         **kwargs):
+    """
+    Creates an Elasticsearch client for an Amazon Elasticsearch Service domain.
+
+    Parameters:
+       host (string): Domain endpoint
+       awsauth: Auth that signs the requests
+       connection_class (string): "requests" or "urllib3"
+       pool_maxsize (int): Connections kept open to the domain, should match the number of concurrent requests
+       timeout (float): Default request timeout in seconds, single calls can override it with request_timeout
+       compression_threshold (int): Smallest request body in bytes that is gzipped, None disables compression
+       port (int): Port of the endpoint, e.g. 9200 for a local Elasticsearch
+       use_ssl (bool): Whether to connect with HTTPS
+       kwargs: Further arguments of Elasticsearch, e.g. serializer
+    """
+    if connection_class not in CONNECTION_CLASSES:
+        raise ValueError("Unsupported connection class: {}".format(connection_class))
+
+    options = dict(retry_on_timeout=True, max_retries=3)
+    options.update(kwargs)
+
+    return Elasticsearch(
+        hosts=[{'host': host, 'port': port}],
+        http_auth=awsauth,
+        use_ssl=use_ssl,
+        verify_certs=use_ssl,
+        connection_class=CONNECTION_CLASSES[connection_class],
+        pool_maxsize=pool_maxsize,
+        timeout=timeout,
+        compression_threshold=compression_threshold,
+        **options
+    )
+
+
+def connection_stats(es):
+    """
+    Returns the number of requests sent and connections opened by an Elasticsearch client.
+    Each new connection to the HTTPS endpoint costs a TLS handshake, all other requests reuse a connection.
+    """
+    requests_sent = 0
+    new_connections = 0
+
+    for connection in es.transport.connection_pool.connections:
+        for pool in connection.connection_pools():
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+
+    return {
+        "requests": requests_sent,
+        "new_connections": new_connections,
+        "reused_connections": max(requests_sent - new_connections, 0)
+    }
@@ -0,0 +1,113 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Creates the Elasticsearch indices of the sample from a declarative spec, see index_spec.json,
+and brings existing indices in line with it.
+"""
+from elasticsearch import RequestError
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+INDEX_SPEC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_spec.json")
+
+# Settings that can only be chosen when an index is created, or while it is closed
+STATIC_SETTINGS = ("index.number_of_shards",)
+STATIC_SETTING_PREFIXES = ("index.analysis.",)
+
+
+def load_index_spec(path=None):
+    with open(path or INDEX_SPEC_FILE) as spec_file:
+        return json.load(spec_file)
+
+
+def provision_index(es, index_spec):
+    """
+    Creates an index with the settings and mappings of its spec. When the index already exists,
+    only the settings that differ and the fields that are not mapped yet are applied.
+    """
+    index = index_spec["index"]
+    settings = index_spec.get("settings", {})
+    mappings = index_spec.get("mappings", {})
+
+    try:
+        es.indices.create(index=index, body={'settings': {'index': settings}, 'mappings': mappings})
+        logger.info("Created index %s", index)
+        return
+    except RequestError as e:
+        if e.error != "resource_already_exists_exception":
+            raise e
+
+    __update_settings(es, index, settings)
+    __add_mappings(es, index, mappings)
+
+
+def flatten_settings(settings, prefix="index"):
+    """
+    Returns settings as flat, dotted names with normalized string values, the way
+    Elasticsearch returns them with flat_settings, e.g. {"index.refresh_interval": "5s"}.
+    """
+    flat = {}
+    for name, value in settings.items():
+        name = name if name.startswith(prefix + ".") else "{}.{}".format(prefix, name)
+        if isinstance(value, dict):
+            flat.update(flatten_settings(value, name))
+        else:
+            flat[name] = _normalize(value)
+
+    return flat
+
+
+def _normalize(value):
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    return str(value)
+
+
+def __update_settings(es, index, settings):
+    current = es.indices.get_settings(index=index, flat_settings=True)[index]["settings"]
+    current = {name: _normalize(value) for name, value in current.items()}
+    changed = {name: value for name, value in flatten_settings(settings).items() if current.get(name) != value}
+
+    for name in sorted(changed):
+        if name in STATIC_SETTINGS or name.startswith(STATIC_SETTING_PREFIXES):
+            logger.warning("Index %s has %s=%s instead of %s, it is only applied to a new index",
+                           index, name, current.get(name), changed.pop(name))
+
+    if changed:
+        es.indices.put_settings(index=index, body=changed)
+        logger.info("Updated settings of index %s: %s", index, changed)
+
+
+def __add_mappings(es, index, mappings):
+    current = es.indices.get_mapping(index=index)[index]["mappings"].get("properties", {})
+    new_properties = {}
+
+    for field, mapping in mappings.get("properties", {}).items():
+        if field not in current:
+            new_properties[field] = mapping
+        elif current[field].get("type") != mapping.get("type"):
+            logger.warning("Field %s of index %s is mapped as %s instead of %s, reindex to change it",
+                           field, index, current[field].get("type"), mapping.get("type"))
+
+    if new_properties:
+        es.indices.put_mapping(index=index, body={'properties': new_properties})
+        logger.info("Added mappings to index %s: %s", index, sorted(new_properties))
@@ -19,14 +19,14 @@ import logging
 import boto3
 import os
 from requests_aws4auth import AWS4Auth
-from elasticsearch import Elasticsearch, RequestsHttpConnection, RequestError
+from connection_factory import create_elasticsearch
+from index_provisioning import load_index_spec, provision_index
 
 logger = logging.getLogger(__name__)
 # Initialise the helper, all inputs are optional, this example shows the defaults
 helper = CfnResource(json_logging=False, log_level='DEBUG', boto_level='CRITICAL')
 
 service = 'es'
-INDEXES = ["person_index", "vehicle_registration_index"]
 es = None
 
 try:
@@ -35,15 +35,8 @@ try:
     credentials = session.get_credentials()
     region = session.region_name
     awsauth = AWS4Auth(credentials.access_key, credentials.secret_key, region, service, session_token=credentials.token)
-    es = Elasticsearch(
-        hosts=[{'host': host, 'port': 443}],
-        http_auth=awsauth,
-        use_ssl=True,
-        verify_certs=True,
-        connection_class=RequestsHttpConnection,
-        retry_on_timeout=True,
-        max_retries=3
-    )
+    # Index creation sends its requests one after another, so one pooled connection is enough
+    es = create_elasticsearch(host, awsauth, pool_maxsize=1)
 
 except Exception as e:
     helper.init_failure(e)
@@ -53,21 +46,18 @@ except Exception as e:
 def create(event, context):
     logger.info("Initiating index creation")
     helper.Data.update({"Status": "Initiated"})
-
-    for index in INDEXES:
-        try:
-            es.indices.create(index=index, body={'settings': {'index': {'gc_deletes': '1d'}}})
-        except RequestError as e:
-            if e.error == "resource_already_exists_exception":
-                es.indices.put_settings(index=index, body={'gc_deletes': '1d'})
-            else:
-                raise e
+    provision_indices()
 
 
 @helper.update
 def update(event, context):
-    # no op
-    pass
+    # Changes to the spec are applied the same way as on a re-run of create
+    provision_indices()
+
+
+def provision_indices():
+    for index_spec in load_index_spec()["indices"]:
+        provision_index(es, index_spec)
 
 
 @helper.delete
@@ -14,85 +14,523 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from aws_kinesis_agg.deaggregator import deaggregate_records
-import boto3
+from elasticsearch import TransportError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import functools
 import os
-from requests_aws4auth import AWS4Auth
-from .helpers.filtered_records_generator import filtered_records_generator
-from .clients.elasticsearch import ElasticsearchClient
+import time
+from .helpers.parallel_decoder import decode_records
+from .helpers.coalesce import coalesce_actions
+from .helpers.dispatcher import ConcurrentDispatcher
+from .helpers.partitioner import partition_by_document
+from .helpers.batch_item_failures import BatchItemFailures
+from .helpers.throttle import AdaptiveController, TokenBucket
+from .helpers.circuit_breaker import CircuitBreaker
+from .helpers.spool import Spool
+from .helpers.metrics import Metrics, COUNT
+from .helpers.record_stream import RecordStream
+from .helpers.version_cache import VersionCache, content_digest
+from .helpers import environment
+from .helpers.logger import get_logger
+from .helpers.table_mappings import load_table_mappings
+from .clients.elasticsearch import ElasticsearchClient, is_transient_error, is_successful, is_retryable
+from .clients.bulk_indexer import BulkIndexer
+from .clients.auth import RefreshableAWS4Auth
+from .clients.connection_factory import CONNECTION_CLASS_REQUESTS
+from .clients.serializer import IonJSONSerializer, DECIMAL_AS_FLOAT, TIMESTAMP_AS_ISO
 from .constants import Constants
 
+logger = get_logger("app")
+
 service = 'es'
-session = boto3.Session()
-credentials = session.get_credentials()
-region = session.region_name
-awsauth = AWS4Auth(credentials.access_key, credentials.secret_key, region, service, session_token=credentials.token)
-host = os.environ['ES_HOST']
 
-elasticsearch_client = ElasticsearchClient(host=host, awsauth=awsauth)
+BULK_INDEXING_ENABLED = environment.get_bool('BULK_INDEXING_ENABLED')
+BULK_MAX_ACTIONS = environment.get_int('BULK_MAX_ACTIONS', Constants.BULK_MAX_ACTIONS)
+BULK_MAX_BYTES = environment.get_int('BULK_MAX_BYTES', Constants.BULK_MAX_BYTES)
+COALESCE_REVISIONS_ENABLED = environment.get_bool('COALESCE_REVISIONS_ENABLED')
+MAX_IN_FLIGHT_REQUESTS = environment.get_int('MAX_IN_FLIGHT_REQUESTS', Constants.MAX_IN_FLIGHT_REQUESTS)
+REPORT_BATCH_ITEM_FAILURES = environment.get_bool('REPORT_BATCH_ITEM_FAILURES')
+PARTITION_LANES = environment.get_int('PARTITION_LANES', Constants.PARTITION_LANES)
+DECODE_PROCESSES = environment.get_int('DECODE_PROCESSES', 1)
+DECODE_MIN_BATCH_SIZE = environment.get_int('DECODE_MIN_BATCH_SIZE', Constants.DECODE_MIN_BATCH_SIZE)
+STREAMING_DEAGGREGATION_ENABLED = environment.get_bool('STREAMING_DEAGGREGATION_ENABLED')
+
+TABLE_MAPPINGS = load_table_mappings(os.environ.get('TABLE_MAPPINGS_FILE'))
+
+# Every request that may be in flight gets its own pooled connection
+CONNECTION_OPTIONS = {
+    "connection_class": os.environ.get('ES_CONNECTION_CLASS', CONNECTION_CLASS_REQUESTS),
+    "pool_maxsize": max(MAX_IN_FLIGHT_REQUESTS, 1),
+    "timeout": environment.get_int('ES_REQUEST_TIMEOUT_SECONDS', Constants.REQUEST_TIMEOUT_SECONDS),
+    "compression_threshold": environment.get_int('ES_COMPRESSION_MIN_BYTES', Constants.COMPRESSION_MIN_BYTES)
+}
+
+PREWARM_CONNECTION = environment.get_bool('PREWARM_CONNECTION')
+ADAPTIVE_THROTTLING_ENABLED = environment.get_bool('ADAPTIVE_THROTTLING_ENABLED')
+MAX_ACTIONS_PER_SECOND = environment.get_int('MAX_ACTIONS_PER_SECOND', 0)
+
+# Kept for the lifetime of the execution environment, so later invocations start from what was learned
+controller = None
+if ADAPTIVE_THROTTLING_ENABLED:
+    controller = AdaptiveController(
+        min_bulk_size=min(environment.get_int('BULK_MIN_ACTIONS', Constants.BULK_MIN_ACTIONS), BULK_MAX_ACTIONS),
+        max_bulk_size=BULK_MAX_ACTIONS,
+        bulk_size_step=environment.get_int('BULK_ACTIONS_STEP', Constants.BULK_ACTIONS_STEP),
+        max_in_flight=max(MAX_IN_FLIGHT_REQUESTS, 1),
+        latency_target=environment.get_int('BULK_LATENCY_TARGET_MS', Constants.BULK_LATENCY_TARGET_MS) / 1000)
+
+rate_limiter = TokenBucket(rate=MAX_ACTIONS_PER_SECOND) if MAX_ACTIONS_PER_SECOND > 0 else None
+
+circuit_breaker = None
+if environment.get_bool('CIRCUIT_BREAKER_ENABLED'):
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=environment.get_int('CIRCUIT_BREAKER_FAILURE_THRESHOLD',
+                                              Constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD),
+        reset_timeout=environment.get_int('CIRCUIT_BREAKER_RESET_SECONDS', Constants.CIRCUIT_BREAKER_RESET_SECONDS))
+
+# Bulk actions that cannot be sent are spilled here and sent by a later invocation
+spool = Spool(os.environ['SPOOL_DIR']) if os.environ.get('SPOOL_DIR') and BULK_INDEXING_ENABLED else None
+
+# Collected during an invocation and written to the log as one EMF document at its end
+metrics = None
+if environment.get_bool('METRICS_ENABLED'):
+    metrics = Metrics(namespace=os.environ.get('METRICS_NAMESPACE', Constants.METRICS_NAMESPACE),
+                      dimensions={"FunctionName": os.environ.get('AWS_LAMBDA_FUNCTION_NAME', "local")})
+
+# Highest confirmed version per document, kept across invocations and optionally saved to a file
+version_cache = None
+VERSION_CACHE_SNAPSHOT_PATH = os.environ.get('VERSION_CACHE_SNAPSHOT_PATH')
+# Skips revisions whose projected document did not change, using the digests kept in the version cache
+CONTENT_HASH_SKIP_ENABLED = environment.get_bool('CONTENT_HASH_SKIP_ENABLED')
+CONTENT_HASH_MGET_ENABLED = CONTENT_HASH_SKIP_ENABLED and environment.get_bool('CONTENT_HASH_MGET_ENABLED')
+if environment.get_bool('VERSION_CACHE_ENABLED') or CONTENT_HASH_SKIP_ENABLED:
+    version_cache = VersionCache(max_size=environment.get_int('VERSION_CACHE_SIZE', Constants.VERSION_CACHE_SIZE),
+                                 metrics=metrics)
+    if VERSION_CACHE_SNAPSHOT_PATH:
+        version_cache.load(VERSION_CACHE_SNAPSHOT_PATH)
+
+serializer = IonJSONSerializer(decimal_policy=os.environ.get('DECIMAL_SERIALIZATION', DECIMAL_AS_FLOAT),
+                               timestamp_format=os.environ.get('TIMESTAMP_SERIALIZATION', TIMESTAMP_AS_ISO))
+lane_clients = []
+# Counters kept for the lifetime of the execution environment as of the last invocation, see __increase
+reported_counters = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_awsauth():
+    """
+    Returns the auth of the Elasticsearch requests, created on first use.
+    boto3 is only imported here, as it takes a good part of the import time of the function.
+    """
+    import boto3
+
+    session = boto3.Session()
+    # Signs with the current credentials of the session, which botocore refreshes before they expire
+    return RefreshableAWS4Auth(session.get_credentials(), session.region_name, service)
+
+
+@functools.lru_cache(maxsize=None)
+def get_elasticsearch_client():
+    """
+    Returns the shared Elasticsearch client, created on first use and kept for later invocations.
+    """
+    return __create_elasticsearch_client(**CONNECTION_OPTIONS)
+
+
+def __create_elasticsearch_client(**connection_options):
+    return ElasticsearchClient(host=os.environ['ES_HOST'], awsauth=get_awsauth(), serializer=serializer,
+                               controller=controller, rate_limiter=rate_limiter, circuit_breaker=circuit_breaker,
+                               metrics=metrics, **connection_options)
+
+
+def __getattr__(name):
+    # Module attributes for the lazily created objects, see PEP 562
+    if name == "elasticsearch_client":
+        return get_elasticsearch_client()
+    if name == "awsauth":
+        return get_awsauth()
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __prewarm():
+    """
+    Creates the client and opens its first connection, including the TLS handshake,
+    during the init phase of the execution environment instead of in the first invocation.
+    """
+    start = time.time()
+    connected = get_elasticsearch_client().ping()
+
+    logger.info("Pre-warmed connection to Elasticsearch in %d ms, reachable: %s", (time.time() - start) * 1000,
+                connected)
+
+
+if PREWARM_CONNECTION:
+    __prewarm()
 
-TABLE_TO_INDEX_MAP = {Constants.PERSON_TABLENAME : Constants.PERSON_INDEX,
-                   Constants.VEHICLE_REGISTRATION_TABLENAME : Constants.VEHICLE_REGISTRATION_INDEX}
 
 def lambda_handler(event, context):
     """
     Triggered for a batch of kinesis records.
     Parses QLDB Journal streams and indexes documents to Elasticsearch for
-    Person and Vehicle Registration Events.
+    the tables configured in the table mappings, by default Person and Vehicle Registration.
     """
     raw_kinesis_records = event['Records']
+    invoked = time.perf_counter()
 
-    # Deaggregate all records in one call
-    records = deaggregate_records(raw_kinesis_records)
-
-    # Iterate through deaggregated records of Person and VehicleRegistration Table
-    for record in filtered_records_generator(records,
-                                             table_names=[Constants.PERSON_TABLENAME,
-                                                          Constants.VEHICLE_REGISTRATION_TABLENAME]):
-        table_name = record["table_info"]["tableName"]
-        revision_data = record["revision_data"]
-        revision_metadata = record["revision_metadata"]
-        version = revision_metadata["version"]
-        document = None
-
-        if revision_data:
-            # if record is for Person table and is an insert event
-            if (table_name == Constants.PERSON_TABLENAME) and (version == 0) and \
-                    __fields_are_present(Constants.PERSON_TABLE_FIELDS, revision_data):
-
-                document = __create_document(Constants.PERSON_TABLE_FIELDS, revision_data)
-                elasticsearch_client.index(index=TABLE_TO_INDEX_MAP[table_name],
-                                           id=revision_metadata["id"], body=document, version=version)
-
-            # if record is for VehicleRegistration table and is an insert or update event
-            elif table_name == Constants.VEHICLE_REGISTRATION_TABLENAME and \
-                    __fields_are_present(Constants.VEHICLE_REGISTRATION_TABLE_FIELDS, revision_data):
-                document = __create_document(Constants.VEHICLE_REGISTRATION_TABLE_FIELDS, revision_data)
-                elasticsearch_client.index(index=TABLE_TO_INDEX_MAP[table_name],
-                                           id=revision_metadata["id"], body=document, version=version)
+    if STREAMING_DEAGGREGATION_ENABLED:
+        # Records are deaggregated one by one while they are decoded and written
+        records = RecordStream(raw_kinesis_records)
+    else:
+        # Deaggregate all records in one call
+        records = deaggregate_records(raw_kinesis_records)
+        if metrics:
+            metrics.add_time("DeaggregateTime", time.perf_counter() - invoked)
 
-        else:
-            # delete record
-            elasticsearch_client.delete(index=TABLE_TO_INDEX_MAP[table_name],
-                                           id=revision_metadata["id"], version=version)
+    # Requests are sent from a thread pool when more than one request may be in flight.
+    # Partitioned lanes send their requests from their own threads instead.
+    dispatcher = None
+    if MAX_IN_FLIGHT_REQUESTS > 1 and PARTITION_LANES <= 1:
+        dispatcher = ConcurrentDispatcher(max_in_flight=MAX_IN_FLIGHT_REQUESTS, controller=controller)
 
+    failures = BatchItemFailures() if REPORT_BATCH_ITEM_FAILURES else None
 
-    return {
+    start = time.time()
+    try:
+        if spool:
+            __drain_spool()
+
+        writes, dropped = __process_records(records, dispatcher, failures)
+    except Exception:
+        # The metrics of a failed invocation are written too, instead of being added to the next one
+        if metrics:
+            metrics.increment("InvocationErrors")
+            __emit_metrics(invoked, records)
+        raise
+    finally:
+        if dispatcher:
+            dispatcher.shutdown()
+
+    logger.info("Processed batch of %d records with %d writes, %d superseded writes dropped in %d ms",
+                __count(records), writes, dropped, (time.time() - start) * 1000)
+    __log_connection_stats()
+    __log_throttling_metrics()
+    __save_version_cache()
+
+    response = {
         'statusCode': 200
     }
 
+    if failures is not None:
+        response['batchItemFailures'] = failures.response()
+        if failures:
+            logger.warning("Reporting batch as failed from sequence number %s", failures.sequence_number)
+
+    if metrics:
+        metrics.increment("Writes", writes)
+        metrics.increment("RevisionsCoalesced", dropped)
+        # Lambda retries the batch from the failed record on
+        if failures:
+            metrics.increment("RecordsFailed", __count(records, from_sequence_number=failures.sequence_number))
+        __emit_metrics(invoked, records)
+
+    return response
+
+
+def __process_records(records, dispatcher, failures):
+    # Convert deaggregated records of the mapped tables into write actions
+    revisions = decode_records(records, table_names=TABLE_MAPPINGS.table_names,
+                               processes=DECODE_PROCESSES, min_batch_size=DECODE_MIN_BATCH_SIZE, metrics=metrics)
+    actions = TABLE_MAPPINGS.create_actions(revisions)
+
+    dropped = 0
+    if COALESCE_REVISIONS_ENABLED:
+        actions, dropped = coalesce_actions(actions)
+
+    if CONTENT_HASH_MGET_ENABLED:
+        actions = __prefetch_documents(actions, get_elasticsearch_client())
+
+    if PARTITION_LANES <= 1:
+        return __write_actions(actions, get_elasticsearch_client(), dispatcher, failures), dropped
+
+    # Every lane writes its documents in order through its own client and bulk buffer,
+    # so a slow request only holds up the documents of its lane.
+    lanes = [lane for lane in partition_by_document(actions, PARTITION_LANES) if lane]
+    if not lanes:
+        return 0, dropped
+
+    clients = __get_lane_clients(len(lanes))
+
+    with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+        futures = [executor.submit(__write_actions, lane, client, None, failures)
+                   for lane, client in zip(lanes, clients)]
+
+        return sum(future.result() for future in futures), dropped
+
+
+def __write_actions(actions, client, dispatcher, failures):
+    # Writes go through a bulk indexer in bulk mode, otherwise one request per revision
+    bulk_indexer = None
+    if BULK_INDEXING_ENABLED:
+        bulk_indexer = BulkIndexer(client, max_actions=BULK_MAX_ACTIONS, max_bytes=BULK_MAX_BYTES,
+                                   dispatcher=dispatcher, on_failure=failures.add if failures is not None else None,
+                                   controller=controller, spool=spool, version_cache=version_cache)
+
+    writes = 0
+    for action in actions:
+        # Lambda retries the batch from the first failed record, so later records are not sent now.
+        # Lanes share the failures, and earlier records of other lanes must still be written.
+        if failures and failures.covers(action["sequence_number"]):
+            continue
+
+        if version_cache is not None and __is_redundant(action):
+            continue
+
+        if bulk_indexer:
+            __queue(bulk_indexer, action)
+        elif dispatcher:
+            dispatcher.submit([(action["index"], action["id"])], __send, client, action, failures)
+        else:
+            __send(client, action, failures)
+        writes += 1
+
+    if bulk_indexer:
+        bulk_indexer.flush()
+
+    if dispatcher:
+        dispatcher.wait()
+
+    if metrics and bulk_indexer:
+        metrics.increment("PartialUpdateFallbacks", bulk_indexer.fallbacks)
+
+    return writes
+
+
+def __get_lane_clients(count):
+    """
+    Returns a client per lane. Lane clients have their own connections and are kept
+    for later invocations; the first lane uses the shared client.
+    """
+    while len(lane_clients) < count - 1:
+        lane_clients.append(__create_elasticsearch_client(**dict(CONNECTION_OPTIONS, pool_maxsize=1)))
+
+    return [get_elasticsearch_client()] + lane_clients[:count - 1]
+
+
+def __log_connection_stats():
+    # Counters are kept for the lifetime of the execution environment, so reuse across invocations shows up
+    stats = [client.connection_stats() for client in [get_elasticsearch_client()] + lane_clients]
+
+    logger.info("Connections: %d requests sent, %d reused connections, %d new connections (TLS handshakes)",
+                sum(stat["requests"] for stat in stats), sum(stat["reused_connections"] for stat in stats),
+                sum(stat["new_connections"] for stat in stats))
+
+    if metrics:
+        reused = sum(stat["reused_connections"] for stat in stats)
+        new = sum(stat["new_connections"] for stat in stats)
+        metrics.increment("ConnectionsReused", __increase("ConnectionsReused", reused))
+        metrics.increment("ConnectionsNew", __increase("ConnectionsNew", new))
+
+
+def __drain_spool():
+    """
+    Sends the spooled actions of earlier invocations, and of other processes writing to the same
+    directory. While the circuit breaker is open the first request fails fast and everything stays
+    spooled; when it is half-open that request is the probe. Actions that are sent again after a
+    partial drain are harmless because of external versioning.
+    """
+    client = get_elasticsearch_client()
+    drained = 0
+    failed = 0
+
+    with closing(spool.claim()) as claimed_paths:
+        for path in claimed_paths:
+            retry = []
+            for batch in spool.batches(BULK_MAX_ACTIONS, BULK_MAX_BYTES, path):
+                try:
+                    results = client.bulk(actions=batch)
+                except TransportError as e:
+                    if not is_transient_error(e):
+                        raise e
+
+                    # The claimed file keeps all its actions and is drained again by a later invocation
+                    logger.warning("Stopped draining the spool after %d actions. Error: %s", drained, e)
+                    return
+
+                drained += len(batch)
+                retry.extend(entry for entry, result in zip(batch, results)
+                             if not is_successful(result) and is_retryable(result["status"]))
+
+            spool.append(retry)
+            failed += len(retry)
+
+    if drained:
+        logger.info("Drained %d spooled actions, %d failed again and stay spooled", drained, failed)
+
+
+def __save_version_cache():
+    if version_cache is None:
+        return
+
+    logger.info("Version cache holds %d documents: %d hits, %d misses, %d evictions, %d unchanged projections",
+                len(version_cache), version_cache.hits, version_cache.misses, version_cache.evictions,
+                version_cache.unchanged)
+
+    # Batches of revisions the cache already holds leave the snapshot as it is
+    if VERSION_CACHE_SNAPSHOT_PATH and version_cache.changed:
+        version_cache.save(VERSION_CACHE_SNAPSHOT_PATH)
+
+
+def __log_throttling_metrics():
+    if controller:
+        logger.info("Adaptive throttling: bulk size %(bulk_size)d, %(in_flight)d requests in flight, "
+                    "%(increases)d increases, %(decreases)d decreases, %(rejections)d rejections",
+                    controller.metrics())
+
+    if circuit_breaker:
+        logger.info("Circuit breaker is %s, opened %d times", circuit_breaker.state, circuit_breaker.opened)
+
+    if rate_limiter:
+        logger.info("Rate limit of %d actions per second delayed requests by %d ms in total",
+                    rate_limiter.rate, rate_limiter.waited * 1000)
+
+    if metrics and controller:
+        controller_metrics = controller.metrics()
+        metrics.add_value("BulkSize", controller_metrics["bulk_size"], COUNT)
+        metrics.add_value("InFlight", controller_metrics["in_flight"], COUNT)
+        metrics.increment("ThrottleDecreases", __increase("ThrottleDecreases", controller_metrics["decreases"]))
+        metrics.increment("ThrottleRejections", __increase("ThrottleRejections", controller_metrics["rejections"]))
+
+    if metrics and rate_limiter:
+        metrics.add_time("RateLimitWaitTime", __increase("RateLimitWaitTime", rate_limiter.waited))
+
+
+def __increase(name, total):
+    # Returns how much a counter kept for the lifetime of the execution environment grew since the last invocation
+    increase = total - reported_counters.get(name, 0)
+    reported_counters[name] = total
+    return increase
 
-def __create_document(fields, revision_data):
-    document = {}
 
-    for field in fields:
-        document[field] = revision_data[field]
+def __count(records, from_sequence_number=None):
+    # Records of a stream are counted as they are read, see RecordStream
+    if isinstance(records, RecordStream):
+        return records.count if from_sequence_number is None else records.count_from(from_sequence_number)
 
-    return document
+    if from_sequence_number is None:
+        return len(records)
+
+    return sum(1 for record in records if int(record['kinesis']['sequenceNumber']) >= int(from_sequence_number))
+
+
+def __emit_metrics(invoked, records):
+    metrics.increment("RecordsIn", __count(records))
+    if isinstance(records, RecordStream):
+        metrics.add_time("DeaggregateTime", records.seconds)
+
+    metrics.add_time("HandlerTime", time.perf_counter() - invoked)
+    metrics.flush()
+
+
+def __is_redundant(action):
+    """
+    Checks whether a write would leave Elasticsearch unchanged. When content hashes are compared,
+    index actions get the digest of their document, recorded once Elasticsearch confirms them.
+    """
+    key = (action["index"], action["id"])
+
+    # Elasticsearch already holds this revision or a later one and would reject the write
+    if version_cache.is_applied(key, action["version"]):
+        return True
+
+    if CONTENT_HASH_SKIP_ENABLED:
+        if action["action"] == "index":
+            action["digest"] = content_digest(serializer, action["body"])
+
+            # Only fields that are not indexed changed. The new version is recorded, so that
+            # redeliveries of this revision are skipped as well.
+            if version_cache.is_unchanged(key, action["digest"]):
+                version_cache.update(key, action["version"], action["digest"])
+                return True
+
+        # Until the write is confirmed, the document Elasticsearch holds is not known
+        version_cache.discard_digest(key)
+
+    return False
+
+
+def __prefetch_documents(actions, client):
+    """
+    Looks up the documents that are updated by the batch and missing from the version cache
+    in one mget request per BULK_MAX_ACTIONS documents, so that unchanged projections are
+    skipped on a cold cache too. Returns the actions, materialized as a list.
+    """
+    actions = list(actions)
+    keys = list(dict.fromkeys((action["index"], action["id"]) for action in actions
+                              if action["action"] == "index" and action["version"] > 0 and
+                              (action["index"], action["id"]) not in version_cache))
+
+    for start in range(0, len(keys), BULK_MAX_ACTIONS):
+        chunk = keys[start:start + BULK_MAX_ACTIONS]
+        try:
+            documents = client.mget(chunk)
+        except TransportError as e:
+            # Only an optimization, the revisions are written as usual
+            logger.warning("Prefetching %d documents failed. Error: %s", len(chunk), e)
+            break
+
+        for key, document in zip(chunk, documents):
+            if document.get("found"):
+                version_cache.update(key, document["_version"], content_digest(serializer, document["_source"]))
+
+    return actions
+
+
+def __queue(bulk_indexer, action):
+    if action["action"] == "delete":
+        bulk_indexer.delete(index=action["index"], id=action["id"], version=action["version"],
+                            context=action["sequence_number"])
+        return
+
+    # Mappings with partial updates send the fields that changed since the previous revision,
+    # once Elasticsearch confirmed it. Its document is kept in the version cache.
+    partial = action.get("partial", False) and version_cache is not None
+    state = partial and version_cache.previous_state((action["index"], action["id"]), action["version"])
+
+    if state:
+        seq_no, primary_term, document = state
+        changes = {field: value for field, value in action["body"].items() if document.get(field) != value}
+        bulk_indexer.update(index=action["index"], id=action["id"], doc=changes, body=action["body"],
+                            version=action["version"], if_seq_no=seq_no, if_primary_term=primary_term,
+                            context=action["sequence_number"], digest=action.get("digest"))
+        if metrics:
+            metrics.increment("PartialUpdates")
+    else:
+        bulk_indexer.index(index=action["index"], id=action["id"], body=action["body"],
+                           version=action["version"], context=action["sequence_number"],
+                           digest=action.get("digest"), keep_source=partial)
+
+
+def __send(client, action, failures):
+    """
+    Sends a single index or delete request.
+    When failures are reported, transient errors mark the record as failed instead of raising.
+    """
+    try:
+        if action["action"] == "delete":
+            response = client.delete(index=action["index"], id=action["id"], version=action["version"])
+        else:
+            response = client.index(index=action["index"], id=action["id"], body=action["body"],
+                                    version=action["version"])
 
+        # Handled errors return no response, see ElasticsearchClient
+        if version_cache is not None and response is not None:
+            version_cache.update((action["index"], action["id"]), action["version"], action.get("digest"))
 
-def __fields_are_present(fields_list, revision_data):
-    for field in fields_list:
-        if not field in revision_data:
-            return False
+    except TransportError as e:
+        if failures is None or not is_transient_error(e):
+            raise e
 
-    return True
+        logger.warning("Elasticsearch request failed for id=%s. Error: %s", action["id"], e)
+        failures.add(action["sequence_number"])
@@ -0,0 +1,107 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from requests.auth import AuthBase
+from requests_aws4auth import AWS4Auth, AWS4SigningKey
+import datetime
+import hashlib
+import hmac
+import threading
+
+SIGNED_HEADERS = ['host', 'content-type', 'date', 'x-amz-*']
+
+# Size of the slices the payload is hashed in
+PAYLOAD_HASH_CHUNK_SIZE = 64 * 1024
+
+
+def payload_hash(body):
+    """
+    Returns the hex SHA-256 of a request body for the x-amz-content-sha256 header.
+    Large bodies, like bulk requests, are hashed in slices of a memoryview instead of copies.
+    """
+    digest = hashlib.sha256()
+
+    if body:
+        view = memoryview(body)
+        for start in range(0, len(view), PAYLOAD_HASH_CHUNK_SIZE):
+            digest.update(view[start:start + PAYLOAD_HASH_CHUNK_SIZE])
+
+    return digest.hexdigest()
+
+
+class RefreshableAWS4Auth(AWS4Auth):
+    """
+    SigV4 auth that signs every request with the current credentials of a credentials provider,
+    e.g. the credentials of a boto3 session. Botocore refreshes temporary credentials shortly
+    before they expire, so requests of long-lived execution environments keep being accepted.
+
+    The derived signing key only changes with the date or the credentials, so it is cached
+    instead of computing the HMAC chain for every request. Instances can be shared between threads.
+
+    Parameters:
+       credentials: Provider with a get_frozen_credentials() method, e.g. botocore Credentials
+       region (string): AWS region of the domain
+       service (string): Signing name of the service, "es" for Amazon Elasticsearch Service
+    """
+
+    def __init__(self, credentials, region, service):
+        AuthBase.__init__(self)
+        self.credentials = credentials
+        self.region = region
+        self.service = service
+        self.include_hdrs = SIGNED_HEADERS
+        self.__signing_keys = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, req):
+        credentials = self.credentials.get_frozen_credentials()
+        now = datetime.datetime.utcnow()
+
+        req.headers.pop('date', None)
+        req.headers['x-amz-date'] = now.strftime('%Y%m%dT%H%M%SZ')
+
+        if req.body is not None:
+            self.encode_body(req)
+        req.headers['x-amz-content-sha256'] = payload_hash(req.body)
+
+        if credentials.token:
+            req.headers['x-amz-security-token'] = credentials.token
+        else:
+            req.headers.pop('x-amz-security-token', None)
+
+        signing_key = self.signing_key_for(credentials.secret_key, now.strftime('%Y%m%d'))
+
+        cano_headers, signed_headers = self.get_canonical_headers(req, self.include_hdrs)
+        cano_req = self.get_canonical_request(req, cano_headers, signed_headers)
+        sig_string = self.get_sig_string(req, cano_req, signing_key.scope)
+        signature = hmac.new(signing_key.key, sig_string.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        req.headers['Authorization'] = 'AWS4-HMAC-SHA256 Credential={}/{}, SignedHeaders={}, Signature={}'.format(
+            credentials.access_key, signing_key.scope, signed_headers, signature)
+        return req
+
+    def signing_key_for(self, secret_key, date):
+        """
+        Returns the signing key of a day. Only the key of the current day and credentials is kept.
+        """
+        scope = (secret_key, date, self.region, self.service)
+
+        with self.__lock:
+            signing_key = self.__signing_keys.get(scope)
+            if signing_key is None:
+                signing_key = AWS4SigningKey(secret_key, self.region, self.service, date, store_secret_key=False)
+                self.__signing_keys = {scope: signing_key}
+
+        return signing_key
@@ -0,0 +1,253 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from elasticsearch import TransportError
+from .elasticsearch import is_retryable, is_successful, is_transient_error
+from ..constants import Constants
+from ..helpers.logger import get_logger
+from collections import namedtuple
+import threading
+
+logger = get_logger("bulk_indexer")
+
+# Version and digest of a queued action, its source when it is kept, and whether it is a partial update
+_Write = namedtuple("_Write", ["version", "digest", "source", "partial"])
+
+# A partial update finding a different document, or none, is sent as a full index action
+PARTIAL_UPDATE_FALLBACK_STATUSES = (404, 409)
+
+
+class BulkIndexer:
+    """
+    Collects index and delete actions and sends them to Elasticsearch as _bulk requests.
+    Exposes the same index/delete methods as ElasticsearchClient so the handler can
+    write through either of them. A request is sent as soon as adding the next action
+    would exceed max_actions or max_bytes, and on flush().
+
+    When a ConcurrentDispatcher is given, requests are sent on its thread pool and a
+    request waits for earlier requests that contain any of the same documents.
+
+    When on_failure is given, it is called with the context of every action that failed
+    for a transient reason, after retries. Requests failing with transient errors are
+    then reported the same way instead of raising.
+
+    When an AdaptiveController is given, requests hold at most its current bulk size,
+    and never more than max_actions.
+
+    When a Spool is given, actions that failed for a transient reason, including requests
+    refused by an open circuit breaker, are spilled to it instead of being reported.
+
+    When a VersionCache is given, the version of every action Elasticsearch confirmed,
+    including version conflicts with a later version, is recorded in it along with the
+    digest the action was queued with, unless it was a conflict. Index actions queued with
+    keep_source, and partial updates, also record their document with the sequence number and
+    primary term Elasticsearch assigned to it.
+
+    Partial updates are conditional on the sequence number and primary term of the previous
+    revision. When the document changed or is missing, the full document is sent with
+    external versioning in a second request.
+
+    The response items of all requests are collected in results. Long running loads pass
+    keep_results=False to only count them in sent and failed, which keeps memory bounded.
+    """
+
+    def __init__(self, elasticsearch_client, max_actions=Constants.BULK_MAX_ACTIONS,
+                 max_bytes=Constants.BULK_MAX_BYTES, dispatcher=None, on_failure=None, controller=None,
+                 spool=None, keep_results=True, version_cache=None):
+        self.elasticsearch_client = elasticsearch_client
+        self.version_cache = version_cache
+        self.keep_results = keep_results
+        self.controller = controller
+        self.spool = spool
+        self.dispatcher = dispatcher
+        self.on_failure = on_failure
+        self.serializer = elasticsearch_client.es_client.transport.serializer
+        self.max_actions = max_actions
+        self.max_bytes = max_bytes
+        self.results = []
+        self.sent = 0
+        self.failed = 0
+        self.fallbacks = 0
+        self._counter_lock = threading.Lock()
+        self._entries = []
+        self._keys = []
+        self._writes = []
+        self._contexts = []
+        self._byte_count = 0
+
+    def index(self, index, id, body, version, context=None, digest=None, keep_source=False):
+        """
+        Queues an index action using external versioning.
+        The context is passed to on_failure if the action fails.
+        """
+        self._add((index, id), _Write(version, digest, body if keep_source else None, False), context,
+                  *self._index_lines(index, id, body, version))
+
+    def update(self, index, id, doc, body, version, if_seq_no, if_primary_term, context=None, digest=None):
+        """
+        Queues an update of the fields in doc, applied only while Elasticsearch holds the document
+        with if_seq_no and if_primary_term. Updates do not support external versioning, the version
+        Elasticsearch increments to must be the version of the revision. Otherwise body, the full
+        document, is indexed instead. The context is passed to on_failure if the action fails.
+        """
+        action = {"update": {"_index": index, "_id": id,
+                             "if_seq_no": if_seq_no, "if_primary_term": if_primary_term}}
+        self._add((index, id), _Write(version, digest, body, True), context, self.serializer.dumps(action),
+                  self.serializer.dumps({"doc": doc}))
+
+    def delete(self, index, id, version, context=None):
+        """
+        Queues a delete action using external versioning.
+        The context is passed to on_failure if the action fails.
+        """
+        action = {"delete": {"_index": index, "_id": id,
+                             "version": version, "version_type": "external"}}
+        self._add((index, id), _Write(version, None, None, False), context, self.serializer.dumps(action))
+
+    def flush(self):
+        """
+        Sends all queued actions. Does nothing when the buffer is empty.
+        Without a dispatcher the response items of the sent actions are returned,
+        otherwise the request is scheduled and its future is returned.
+        """
+        if not self._entries:
+            return []
+
+        entries = self._entries
+        keys = self._keys
+        writes = self._writes
+        contexts = self._contexts
+        self._entries = []
+        self._keys = []
+        self._writes = []
+        self._contexts = []
+        self._byte_count = 0
+
+        if self.dispatcher:
+            return self.dispatcher.submit(keys, self._send, entries, contexts, keys, writes)
+
+        return self._send(entries, contexts, keys, writes)
+
+    def _send(self, entries, contexts, keys, writes):
+        results = self._request(entries, contexts, keys, writes)
+
+        fallbacks = [position for position, (write, result) in enumerate(zip(writes, results))
+                     if write.partial and result["status"] in PARTIAL_UPDATE_FALLBACK_STATUSES]
+        if fallbacks:
+            logger.info("Indexing %d full documents whose partial update did not apply", len(fallbacks))
+            writes = list(writes)
+            for position in fallbacks:
+                writes[position] = writes[position]._replace(partial=False)
+
+            fallback_keys = [keys[position] for position in fallbacks]
+            fallback_writes = [writes[position] for position in fallbacks]
+            fallback_results = self._request([self._index_entry(key, write) for key, write
+                                              in zip(fallback_keys, fallback_writes)],
+                                             [contexts[position] for position in fallbacks],
+                                             fallback_keys, fallback_writes)
+            for position, result in zip(fallbacks, fallback_results):
+                results[position] = result
+
+        if self.version_cache is not None:
+            for key, write, result in zip(keys, writes, results):
+                # On a version conflict Elasticsearch holds a later document than the one sent
+                if not is_successful(result):
+                    continue
+                if result["status"] == 409:
+                    self.version_cache.update(key, write.version)
+                elif write.source is not None and result.get("_version") == write.version and "_seq_no" in result:
+                    self.version_cache.update(key, write.version, write.digest,
+                                              (result["_seq_no"], result["_primary_term"], write.source))
+                else:
+                    self.version_cache.update(key, write.version, write.digest)
+
+        failed = sum(1 for result in results if not is_successful(result))
+        with self._counter_lock:
+            self.sent += len(results)
+            self.failed += failed
+            self.fallbacks += len(fallbacks)
+            if self.keep_results:
+                self.results.extend(results)
+
+        return results
+
+    def _request(self, entries, contexts, keys, writes):
+        try:
+            results = self.elasticsearch_client.bulk(actions=entries)
+        except TransportError as e:
+            if (self.on_failure is None and self.spool is None) or not is_transient_error(e):
+                raise e
+
+            logger.warning("Bulk request with %d actions failed. Error: %s", len(entries), e)
+            results = [{"status": e.status_code, "error": str(e)} for entry in entries]
+            failed = range(len(entries))
+        else:
+            failed = [position for position, result in enumerate(results)
+                      if not is_successful(result) and is_retryable(result["status"])]
+
+        self._failed([entries[position] for position in failed], [contexts[position] for position in failed],
+                     [keys[position] for position in failed], [writes[position] for position in failed])
+        return results
+
+    def _index_lines(self, index, id, body, version):
+        action = {"index": {"_index": index, "_id": id,
+                            "version": version, "version_type": "external"}}
+        return self.serializer.dumps(action), self.serializer.dumps(body)
+
+    def _index_entry(self, key, write):
+        return _entry(*self._index_lines(*key, write.source, write.version))
+
+    def _failed(self, entries, contexts, keys, writes):
+        if not entries:
+            return
+
+        if self.spool is not None:
+            # The sequence number a partial update is conditional on is stale by the time it is sent again
+            entries = [self._index_entry(key, write) if write.partial else entry
+                       for entry, key, write in zip(entries, keys, writes)]
+            self.spool.append(entries)
+            logger.warning("Spilled %d actions to %s", len(entries), self.spool.path)
+        elif self.on_failure is not None:
+            for context in contexts:
+                self.on_failure(context)
+
+    def _max_actions(self):
+        if self.controller:
+            return min(self.max_actions, self.controller.bulk_size)
+
+        return self.max_actions
+
+    def _add(self, key, write, context, *lines):
+        entry = _entry(*lines)
+        size = len(entry.encode("utf-8"))
+        max_actions = self._max_actions()
+
+        if self._entries and (len(self._entries) + 1 > max_actions or
+                              self._byte_count + size > self.max_bytes):
+            self.flush()
+
+        self._entries.append(entry)
+        self._keys.append(key)
+        self._writes.append(write)
+        self._contexts.append(context)
+        self._byte_count += size
+
+        if len(self._entries) >= max_actions:
+            self.flush()
+
+
+def _entry(*lines):
+    # Each line is terminated by a newline in the request body
+    return "".join(line + "\n" for line in lines)
@@ -13,8 +13,28 @@
 # HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from elasticsearch import Elasticsearch, RequestsHttpConnection, NotFoundError
-from elasticsearch import SerializationError, ConflictError, RequestError
+from elasticsearch import NotFoundError
+from elasticsearch import SerializationError, ConflictError, RequestError, TransportError
+from elasticsearch import ConnectionError, SSLError
+from .serializer import IonJSONSerializer
+from .connection_factory import create_elasticsearch, connection_stats
+from ..constants import Constants
+from ..helpers.logger import get_logger, record_sampler
+import logging
+import random
+import time
+
+logger = get_logger("elasticsearch")
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    It is a transient error, like the connection failures that opened the breaker.
+    """
+
+    def __init__(self):
+        super(CircuitOpenError, self).__init__("N/A", "Circuit breaker is open", None)
 
 
 class ElasticsearchClient:
@@ -23,16 +43,37 @@ class ElasticsearchClient:
     """
     es_client = None
 
-    def __init__(self, host, awsauth):
-        self.es_client = Elasticsearch(
-            hosts=[{'host': host, 'port': 443}],
-            http_auth=awsauth,
-            use_ssl=True,
-            verify_certs=True,
-            connection_class=RequestsHttpConnection,
-            retry_on_timeout=True,
-            max_retries=3
-        )
+    def __init__(self, host, awsauth, bulk_max_retries=Constants.BULK_MAX_RETRIES,
+                 bulk_backoff_base_seconds=Constants.BULK_BACKOFF_BASE_SECONDS,
+                 bulk_backoff_max_seconds=Constants.BULK_BACKOFF_MAX_SECONDS, serializer=None,
+                 controller=None, rate_limiter=None, circuit_breaker=None, metrics=None, **connection_options):
+        self.bulk_max_retries = bulk_max_retries
+        # Optional AdaptiveController fed with the outcome of every bulk request,
+        # and TokenBucket that limits the actions sent per second
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        # Optional CircuitBreaker, opened by connection failures and server side errors
+        self.circuit_breaker = circuit_breaker
+        # Optional Metrics the requests and their outcome are counted in
+        self.metrics = metrics
+        self.bulk_backoff_base_seconds = bulk_backoff_base_seconds
+        self.bulk_backoff_max_seconds = bulk_backoff_max_seconds
+        # connection_options are passed to create_elasticsearch, e.g. pool_maxsize or compression_threshold
+        self.es_client = create_elasticsearch(host, awsauth, serializer=serializer or IonJSONSerializer(),
+                                              **connection_options)
+
+    def ping(self):
+        """
+        Sends a HEAD request to the domain, which opens a pooled connection.
+        Returns whether the domain answered.
+        """
+        return self.es_client.ping()
+
+    def connection_stats(self):
+        """
+        Returns the requests sent and connections opened since the client was created.
+        """
+        return connection_stats(self.es_client)
 
     def index(self, index, id, body, version):
         """
@@ -41,34 +82,267 @@ class ElasticsearchClient:
         https://www.elastic.co/blog/elasticsearch-versioning-support
         https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-index_.html#index-version-types
         """
+        self._before_request(1)
+
+        start = time.time()
         try:
             response = self.es_client.index(index=index, id=id,
                                             body=body, version=version, version_type="external")
+            self._record_outcome()
+            self._count("DocumentsIndexed")
 
-            print("Indexed document with id: {id}, body: {body}"
-                  " and version: {version}".format(id=id, body=body,
-                                                   version=version))
+            if logger.isEnabledFor(logging.DEBUG) and record_sampler.sample():
+                logger.debug("Indexed document with id: %s, body: %s and version: %s", id, body, version)
 
             return response
 
         except (SerializationError, ConflictError,
                 RequestError) as e:  # https://elasticsearch-py.readthedocs.io/en/master/exceptions.html#elasticsearch.ElasticsearchException
-            print("Elasticsearch Exception occured while indexing id={id}, body={body} and"
-                  "version={version}. Error: {error}".format(id=id, body=body, version=version,
-                                                             error=str(e)))
+            logger.warning("Elasticsearch Exception occured while indexing id=%s and version=%s. Error: %s",
+                           id, version, e)
+            logger.debug("Document body of id=%s: %s", id, body)
+            self._record_outcome()
+            self._count("VersionConflicts" if isinstance(e, ConflictError) else "DocumentsFailed")
             return None
 
+        except TransportError as e:
+            self._record_outcome(e)
+            self._count("RequestErrors")
+            raise e
+
+        finally:
+            self._record_request(start)
+
     def delete(self, index, id, version):
 
+        self._before_request(1)
+
+        start = time.time()
         try:
 
             response = self.es_client.delete(index=index, id=id, version=version, version_type="external")
-            print("Deleted document with id: {id}".format(id=id))
+            self._record_outcome()
+            self._count("DocumentsDeleted")
+            if logger.isEnabledFor(logging.DEBUG) and record_sampler.sample():
+                logger.debug("Deleted document with id: %s", id)
 
             return response
 
         except (SerializationError, ConflictError,
                 RequestError, NotFoundError) as e:  # https://elasticsearch-py.readthedocs.io/en/master/exceptions.html#elasticsearch.ElasticsearchException
-            print("Elasticsearch Exception occured while deleting id={id}. Error: {error}"
-                  .format(id=id, error=str(e)))
+            logger.warning("Elasticsearch Exception occured while deleting id=%s. Error: %s", id, e)
+            self._record_outcome()
+            # Deleting a document that does not exist leaves nothing to do, see is_successful
+            self._count("VersionConflicts" if isinstance(e, ConflictError) else
+                        "DocumentsDeleted" if isinstance(e, NotFoundError) else "DocumentsFailed")
             return None
+
+        except TransportError as e:
+            self._record_outcome(e)
+            self._count("RequestErrors")
+            raise e
+
+        finally:
+            self._record_request(start)
+
+    def bulk(self, actions):
+        """
+        Sends serialized actions to the _bulk endpoint and checks the result of every item.
+        https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-bulk.html
+
+        Version conflicts count as success, since external versioning rejects revisions
+        that are already superseded. Items rejected with 429 or 5xx are resent with jittered
+        exponential backoff, without the items that already succeeded. Other failures such
+        as mapping errors are reported and not retried.
+
+        Parameters:
+           actions (list): Newline terminated action entries, each holding the action line
+                           and the document source line if the action has one
+
+        Returns:
+           A list with the final response item of every action, in the order of actions
+        """
+        results = [None] * len(actions)
+        pending = list(range(len(actions)))
+        attempt = 0
+
+        while pending:
+            retry = []
+            rejected = False
+            took = None
+
+            self._before_request(len(pending))
+
+            start = time.time()
+            try:
+                response = self.es_client.bulk(body="".join(actions[position] for position in pending))
+                self._record_outcome()
+                took = response.get("took")
+
+                for position, item in zip(pending, response["items"]):
+                    # Every item is keyed by its action type, e.g. {"index": {...}}
+                    result = next(iter(item.values()))
+                    results[position] = result
+
+                    if is_retryable(result["status"]):
+                        retry.append(position)
+                        rejected = rejected or result["status"] == 429
+
+            except (SerializationError, ConflictError,
+                    RequestError) as e:  # https://elasticsearch-py.readthedocs.io/en/master/exceptions.html#elasticsearch.ElasticsearchException
+                logger.warning("Elasticsearch Exception occured while sending bulk request. Error: %s", e)
+                self._record_outcome()
+                for position in pending:
+                    results[position] = {"status": 400, "error": str(e)}
+
+            except TransportError as e:
+                self._record_outcome(e)
+                self._count("RequestErrors")
+                if not is_retryable(e.status_code):
+                    self._record_request(start)
+                    raise e
+
+                retry = pending
+                rejected = e.status_code == 429
+                for position in pending:
+                    results[position] = {"status": e.status_code, "error": str(e)}
+
+            if self.controller:
+                self.controller.record(time.time() - start, rejected)
+            self._record_request(start, took)
+
+            if retry and attempt < self.bulk_max_retries:
+                self._count("BulkItemRetries", len(retry))
+                attempt += 1
+                time.sleep(self._backoff_delay(attempt))
+                pending = retry
+            else:
+                pending = []
+
+        self._report_bulk_results(results)
+
+        return results
+
+    def mget(self, keys):
+        """
+        Fetches the current version and source of documents.
+        https://www.elastic.co/guide/en/elasticsearch/reference/current/docs-multi-get.html
+
+        Parameters:
+           keys (list): (index, id) pairs of the documents
+
+        Returns:
+           A list with the response doc of every key, in the order of keys
+        """
+        self._before_request(len(keys))
+
+        start = time.time()
+        try:
+            response = self.es_client.mget(body={"docs": [{"_index": index, "_id": id} for index, id in keys]})
+            self._record_outcome()
+            return response["docs"]
+
+        except TransportError as e:
+            self._record_outcome(e)
+            self._count("RequestErrors")
+            raise e
+
+        finally:
+            self._record_request(start)
+
+    def _before_request(self, actions):
+        if self.circuit_breaker and not self.circuit_breaker.allow():
+            raise CircuitOpenError()
+
+        if self.rate_limiter:
+            self.rate_limiter.acquire(actions)
+
+    def _record_outcome(self, error=None):
+        if not self.circuit_breaker:
+            return
+
+        # Throttling shows that the domain is up, it is handled by backoff and the adaptive controller
+        if error is not None and is_transient_error(error) and error.status_code != 429:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    def _record_request(self, start, took=None):
+        if not self.metrics:
+            return
+
+        latency = time.time() - start
+        self.metrics.increment("Requests")
+        self.metrics.add_time("RequestTime", latency)
+        self.metrics.add_value("RequestLatency", latency * 1000)
+        # Time Elasticsearch spent on a bulk request, without network and queueing
+        if took is not None:
+            self.metrics.add_value("BulkTook", took)
+
+    def _count(self, name, value=1):
+        if self.metrics:
+            self.metrics.increment(name, value)
+
+    def _backoff_delay(self, attempt):
+        # Full jitter, see https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        return random.uniform(0, min(self.bulk_backoff_max_seconds,
+                                     self.bulk_backoff_base_seconds * (2 ** attempt)))
+
+    def _report_bulk_results(self, results):
+        failed = [result for result in results if not is_successful(result)]
+
+        for result in failed:
+            logger.warning("Elasticsearch bulk item failed for id=%s, status=%s. Error: %s",
+                           result.get("_id"), result["status"], result.get("error"))
+
+        logger.info("Bulk request completed with %d successful and %d failed items",
+                    len(results) - len(failed), len(failed))
+
+        if self.metrics:
+            for result in results:
+                self.metrics.increment(_result_metric(result))
+
+
+def _result_metric(result):
+    if not is_successful(result):
+        return "DocumentsFailed"
+    if result["status"] == 409:
+        return "VersionConflicts"
+    if result.get("result") in ("deleted", "not_found"):
+        return "DocumentsDeleted"
+
+    return "DocumentsIndexed"
+
+
+def is_retryable(status):
+    """
+    Too many requests and server side errors are transient and can be retried.
+    """
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def is_transient_error(error):
+    """
+    Checks whether a request failed for reasons that may go away when it is sent again later:
+    connection failures and timeouts, throttling and server side errors.
+    """
+    if isinstance(error, SSLError):
+        return False
+
+    return isinstance(error, ConnectionError) or \
+        (isinstance(error, TransportError) and is_retryable(error.status_code))
+
+
+def is_successful(result):
+    """
+    Checks a bulk response item.
+    Version conflicts are expected with external versioning when a newer revision is already
+    indexed, and deleting a document that does not exist leaves nothing to do.
+    """
+    status = result["status"]
+
+    # Connection failures have no HTTP status, see TransportError.status_code
+    if not isinstance(status, int):
+        return False
+
+    return 200 <= status < 300 or status == 409 or (status == 404 and result.get("result") == "not_found")
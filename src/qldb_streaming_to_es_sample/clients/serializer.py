@@ -0,0 +1,168 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion.core import IonType, Timestamp, TimestampPrecision
+from amazon.ion.simple_types import IonPyDecimal, IonPyDict, IonPyInt, IonPyList, IonPyNull
+from amazon.ion.simple_types import IonPySymbol, IonPyTimestamp, IonPyBytes
+from elasticsearch.serializer import JSONSerializer
+from elasticsearch import SerializationError
+from ..helpers.ion_types import PreciseDatetime
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+import base64
+import json
+
+DECIMAL_AS_FLOAT = "float"
+DECIMAL_AS_STRING = "string"
+
+TIMESTAMP_AS_ISO = "iso"
+TIMESTAMP_WITH_PRECISION = "precision"
+
+# Number of characters of an ISO 8601 timestamp to keep for the coarse Ion timestamp precisions
+_PRECISION_LENGTH = {TimestampPrecision.YEAR: 4, TimestampPrecision.MONTH: 7, TimestampPrecision.DAY: 10}
+
+
+class IonJSONSerializer(JSONSerializer):
+    """
+    Serializes documents holding values loaded with amazon.ion.simpleion to JSON.
+
+    Values are converted with a lookup on their exact type instead of isinstance checks,
+    and a single preconfigured encoder is reused for every document. Ion strings and
+    floats are subclasses of str and float, which the encoder writes without conversion. Ion structs are
+    serialized as objects and Ion bools as true/false, which the default serializer of
+    elasticsearch-py does not do.
+
+    Parameters:
+       decimal_policy (string): "float" serializes decimals as JSON numbers, "string" keeps
+                                their exact digits as JSON strings
+       timestamp_format (string): "iso" serializes timestamps with datetime.isoformat,
+                                  "precision" truncates year, month and day precision
+                                  timestamps to that precision, e.g. 1963-08-19
+    """
+
+    def __init__(self, decimal_policy=DECIMAL_AS_FLOAT, timestamp_format=TIMESTAMP_AS_ISO):
+        if decimal_policy not in (DECIMAL_AS_FLOAT, DECIMAL_AS_STRING):
+            raise ValueError("Unknown decimal policy {policy}".format(policy=decimal_policy))
+        if timestamp_format not in (TIMESTAMP_AS_ISO, TIMESTAMP_WITH_PRECISION):
+            raise ValueError("Unknown timestamp format {format}".format(format=timestamp_format))
+
+        self.decimal_policy = decimal_policy
+        self.timestamp_format = timestamp_format
+        self._encoder = json.JSONEncoder(default=self.default, ensure_ascii=False, separators=(",", ":"))
+
+        convert_decimal = float if decimal_policy == DECIMAL_AS_FLOAT else str
+        convert_timestamp = self._timestamp_with_precision if timestamp_format == TIMESTAMP_WITH_PRECISION \
+            else self._timestamp_as_iso
+        convert_dict = self._convert_dict
+        convert_list = self._convert_list
+
+        self._converters = {
+            dict: convert_dict,
+            IonPyDict: convert_dict,
+            list: convert_list,
+            tuple: convert_list,
+            IonPyList: convert_list,
+            IonPyInt: self._convert_int,
+            IonPySymbol: self._convert_symbol,
+            IonPyNull: self._convert_null,
+            IonPyBytes: self._convert_bytes,
+            IonPyDecimal: convert_decimal,
+            Decimal: convert_decimal,
+            IonPyTimestamp: convert_timestamp,
+            Timestamp: convert_timestamp,
+            PreciseDatetime: convert_timestamp,
+            datetime: self._timestamp_as_iso,
+            date: self._timestamp_as_iso,
+        }
+
+    def dumps(self, data):
+        # don't serialize strings
+        if isinstance(data, str):
+            return data
+
+        try:
+            return self._encoder.encode(self.convert(data))
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+    def convert(self, value):
+        """
+        Converts value into types the json module serializes natively.
+        """
+        converter = self._converters.get(type(value))
+
+        return converter(value) if converter else value
+
+    def default(self, data):
+        # Fallback for subclasses of the types in the lookup table
+        if isinstance(data, Timestamp):
+            return self._converters[Timestamp](data)
+        if isinstance(data, Decimal):
+            return self._converters[Decimal](data)
+        if isinstance(data, Mapping):
+            return self._convert_dict(data)
+
+        return super(IonJSONSerializer, self).default(data)
+
+    def _convert_dict(self, value):
+        converters = self._converters
+        result = {}
+
+        for key, item in value.items():
+            converter = converters.get(item.__class__)
+            result[key] = converter(item) if converter else item
+
+        return result
+
+    def _convert_list(self, value):
+        converters = self._converters
+        result = []
+
+        for item in value:
+            converter = converters.get(item.__class__)
+            result.append(converter(item) if converter else item)
+
+        return result
+
+    @staticmethod
+    def _convert_int(value):
+        # IonPyBool is the same class as IonPyInt
+        if value.ion_type is IonType.BOOL:
+            return bool(value)
+        return int(value)
+
+    @staticmethod
+    def _convert_symbol(value):
+        return value.text
+
+    @staticmethod
+    def _convert_null(value):
+        return None
+
+    @staticmethod
+    def _convert_bytes(value):
+        return base64.b64encode(value).decode("ascii")
+
+    @staticmethod
+    def _timestamp_as_iso(value):
+        return value.isoformat()
+
+    @staticmethod
+    def _timestamp_with_precision(value):
+        length = _PRECISION_LENGTH.get(getattr(value, "precision", None))
+        text = value.isoformat()
+
+        return text[:length] if length else text
@@ -15,14 +15,43 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 class Constants:
 
-    PERSON_TABLENAME = "Person"
-    VEHICLE_REGISTRATION_TABLENAME = "VehicleRegistration"
+    # Bulk indexing limits. Amazon Elasticsearch Service rejects payloads above 10 MiB
+    # on smaller instance types, so the byte limit stays well below that.
+    BULK_MAX_ACTIONS = 500
+    BULK_MAX_BYTES = 5 * 1024 * 1024
 
-    PERSON_INDEX = "person_index"
-    VEHICLE_REGISTRATION_INDEX = "vehicle_registration_index"
+    # Retries for bulk items rejected with 429 or 5xx
+    BULK_MAX_RETRIES = 3
+    BULK_BACKOFF_BASE_SECONDS = 0.1
+    BULK_BACKOFF_MAX_SECONDS = 5
 
-    PERSON_TABLE_FIELDS = ["FirstName","LastName", "GovId"]
-    VEHICLE_REGISTRATION_TABLE_FIELDS = ["VIN", "LicensePlateNumber", "State",
-                                         "PendingPenaltyTicketAmount"]
+    # Adaptive throttling shrinks bulk requests down to BULK_MIN_ACTIONS on rejections and latency
+    # above BULK_LATENCY_TARGET_MS, and grows them back by BULK_ACTIONS_STEP after every good request
+    BULK_MIN_ACTIONS = 50
+    BULK_ACTIONS_STEP = 50
+    BULK_LATENCY_TARGET_MS = 1000
 
+    # Consecutive failed requests that open the circuit breaker, and seconds until it lets a probe through
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+    CIRCUIT_BREAKER_RESET_SECONDS = 30
 
+    # Requests sent concurrently by one invocation, 1 sends them one after another
+    MAX_IN_FLIGHT_REQUESTS = 1
+
+    # Default timeout of requests to Elasticsearch
+    REQUEST_TIMEOUT_SECONDS = 10
+
+    # Smallest request body that is sent gzipped, 0 sends all bodies uncompressed
+    COMPRESSION_MIN_BYTES = 0
+
+    # Number of lanes the writes of a batch are partitioned into by document id
+    PARTITION_LANES = 1
+
+    # Smallest batch that is decoded in child processes when DECODE_PROCESSES is above 1
+    DECODE_MIN_BATCH_SIZE = 1000
+
+    # Documents whose highest confirmed version is cached when VERSION_CACHE_ENABLED is set
+    VERSION_CACHE_SIZE = 100000
+
+    # CloudWatch namespace of the metrics written when METRICS_ENABLED is set
+    METRICS_NAMESPACE = "QLDBStreamingToElasticsearch"
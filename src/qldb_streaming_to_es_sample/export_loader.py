@@ -0,0 +1,107 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Loads a QLDB journal export into Elasticsearch, for the initial load of a ledger
+that existed before the stream, or to rebuild the indices.
+
+The export is read from a local directory, e.g. a copy made with
+`aws s3 sync s3://BUCKET/PREFIX export/`. Every data file is loaded by its own worker
+process: blocks are read one at a time, their revisions of the mapped tables are
+mapped like the ones of the stream and written with _bulk requests, so memory does not
+grow with the size of the file. With external versioning, loading the export while the
+stream is running, or loading it twice, leaves the latest revisions in the indices.
+
+Run from the src directory:
+    python -m qldb_streaming_to_es_sample.export_loader --endpoint http://localhost:9200 export/
+    python -m qldb_streaming_to_es_sample.export_loader --endpoint https://DOMAIN_ENDPOINT --sigv4 export/
+    python -m qldb_streaming_to_es_sample.export_loader --dry-run export/
+"""
+from .helpers.journal_export import export_files, read_export_file
+from .helpers import loader
+from .constants import Constants
+import os
+import sys
+import time
+
+COUNTERS = ("files", "bytes", "revisions", "actions", "sent", "failed")
+
+
+def load_file(path):
+    """
+    Streams the revisions of one export file into Elasticsearch and returns its counters.
+    """
+    stats = dict.fromkeys(COUNTERS, 0)
+    stats.update(files=1, bytes=os.path.getsize(path))
+
+    bulk_indexer = loader.create_bulk_indexer()
+
+    def counted_revisions():
+        for revision in read_export_file(path, loader.table_mappings.table_names):
+            stats["revisions"] += 1
+            yield revision
+
+    for action in loader.table_mappings.create_actions(counted_revisions()):
+        stats["actions"] += 1
+
+        if bulk_indexer:
+            loader.add_action(bulk_indexer, action)
+
+    if bulk_indexer:
+        bulk_indexer.flush()
+        stats.update(sent=bulk_indexer.sent, failed=bulk_indexer.failed)
+
+    return stats
+
+
+def load(directory, endpoint=None, sigv4=False, processes=1, table_mappings_file=None,
+         bulk_max_actions=Constants.BULK_MAX_ACTIONS):
+    """
+    Loads the export files of a directory and returns the summed counters.
+    Without an endpoint nothing is written, which measures reading, decoding and mapping only.
+    """
+    totals = dict.fromkeys(COUNTERS, 0)
+    initargs = (endpoint, sigv4, table_mappings_file, bulk_max_actions)
+    paths = export_files(directory)
+    start = time.perf_counter()
+
+    # One file per task, files are large enough to amortize the dispatch
+    loader.run(load_file, paths, totals, min(processes, max(len(paths), 1)), initargs, chunksize=1)
+
+    totals["seconds"] = time.perf_counter() - start
+
+    return totals
+
+
+def report(totals, output=sys.stdout):
+    print("Loaded {files:,} files with {revisions:,} revisions and {actions:,} actions "
+          "in {seconds:.2f} s".format(**totals), file=output)
+    loader.report_throughput(totals, "revisions", output)
+
+
+def main(arguments=None):
+    parser = loader.argument_parser(__doc__)
+    parser.add_argument("directory", help="directory with the files of a journal export")
+    args = parser.parse_args(arguments)
+
+    totals = load(args.directory, endpoint=None if args.dry_run else args.endpoint, sigv4=args.sigv4,
+                  processes=args.processes, table_mappings_file=args.table_mappings,
+                  bulk_max_actions=args.bulk_max_actions)
+
+    loader.finish(totals, args.json, report)
+
+
+if __name__ == "__main__":
+    main()
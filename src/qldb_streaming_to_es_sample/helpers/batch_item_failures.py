@@ -0,0 +1,69 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import threading
+
+
+class BatchItemFailures:
+    """
+    Tracks the Kinesis sequence number of the first record that could not be written,
+    for the ReportBatchItemFailures response of Kinesis event source mappings.
+    https://docs.aws.amazon.com/lambda/latest/dg/with-kinesis.html#services-kinesis-batchfailurereporting
+
+    Lambda retries the batch starting at the reported record, so only the lowest
+    sequence number matters. Failures may be added from several threads.
+    """
+
+    def __init__(self):
+        self.sequence_number = None
+        self.unidentified = False
+        self._lock = threading.Lock()
+
+    def add(self, sequence_number):
+        with self._lock:
+            if sequence_number is None:
+                self.unidentified = True
+            elif self.sequence_number is None or int(sequence_number) < int(self.sequence_number):
+                self.sequence_number = sequence_number
+
+    def covers(self, sequence_number):
+        """
+        Returns whether the record with sequence_number is retried with the batch, so that
+        it does not need to be written now. Records of unknown position are always written.
+        """
+        with self._lock:
+            if self.unidentified:
+                return True
+            if sequence_number is None or self.sequence_number is None:
+                return False
+
+            return int(sequence_number) >= int(self.sequence_number)
+
+    def __bool__(self):
+        return self.unidentified or self.sequence_number is not None
+
+    def response(self):
+        """
+        Returns the batchItemFailures list of the handler response.
+        Raises an error when a failed record has no sequence number, which makes
+        Lambda retry the whole batch instead.
+        """
+        if self.unidentified:
+            raise RuntimeError("Writes failed for records without a Kinesis sequence number")
+
+        if self.sequence_number is None:
+            return []
+
+        return [{"itemIdentifier": self.sequence_number}]
@@ -0,0 +1,47 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+def coalesce_actions(actions):
+    """
+    Keeps only the write with the highest revision version for every (index, id) pair
+    in a batch. Earlier revisions of the same document would be overwritten anyway,
+    or rejected as version conflicts, so sending them is wasted work. A delete with a
+    higher version supersedes earlier index actions for the same document.
+
+    Surviving actions keep their relative order in the batch.
+
+    Parameters:
+       actions (iterable): Write actions, each a dict with "index", "id" and "version" keys
+
+    Returns:
+       A list of the surviving actions and the number of actions that were dropped
+    """
+    latest = {}
+    count = 0
+
+    for position, action in enumerate(actions):
+        count += 1
+        key = (action["index"], action["id"])
+        current = latest.get(key)
+
+        # On equal versions (redelivered records) the later one wins
+        if current is None or action["version"] >= current[1]["version"]:
+            latest[key] = (position, action)
+
+    coalesced = [action for position, action in sorted(latest.values(), key=lambda entry: entry[0])]
+
+    return coalesced, count - len(coalesced)
@@ -0,0 +1,102 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+
+
+class ConcurrentDispatcher:
+    """
+    Runs requests on a thread pool with a bounded number of requests in flight.
+
+    Every task is submitted with the document keys it writes. A task does not start
+    before the tasks previously submitted for any of its keys have finished, so writes
+    to the same document are applied in the order they were submitted. Tasks are picked
+    up by the pool in submission order, which means a task only ever waits for tasks
+    that are already running.
+
+    When an AdaptiveController is given, at most its current in_flight tasks are pending,
+    and never more than max_in_flight.
+    """
+
+    def __init__(self, max_in_flight, controller=None):
+        self.max_in_flight = max_in_flight
+        self.controller = controller
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._pending = 0
+        self._slot_released = threading.Condition()
+        self._last_by_key = {}
+        self._futures = []
+        self._error = None
+
+    def submit(self, keys, fn, *args, **kwargs):
+        """
+        Schedules fn(*args, **kwargs) after the earlier tasks for the same keys.
+        Blocks while max_in_flight tasks are pending and raises the first error
+        of an already finished task instead of scheduling more work.
+        """
+        with self._slot_released:
+            while self._pending >= self._limit():
+                self._slot_released.wait()
+
+            if self._error is not None:
+                raise self._error
+
+            self._pending += 1
+
+        predecessors = {self._last_by_key[key] for key in keys if key in self._last_by_key}
+        future = self._executor.submit(self._run, predecessors, fn, args, kwargs)
+        future.add_done_callback(self._task_done)
+
+        for key in keys:
+            self._last_by_key[key] = future
+        self._futures.append(future)
+
+        return future
+
+    def wait(self):
+        """
+        Waits for all submitted tasks and returns their results in submission order.
+        Raises the first error raised by a task.
+        """
+        futures = self._futures
+        self._futures = []
+        self._last_by_key = {}
+
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _limit(self):
+        if self.controller:
+            return min(self.max_in_flight, self.controller.in_flight)
+
+        return self.max_in_flight
+
+    def _task_done(self, future):
+        with self._slot_released:
+            if self._error is None and future.exception() is not None:
+                self._error = future.exception()
+            self._pending -= 1
+            self._slot_released.notify()
+
+    @staticmethod
+    def _run(predecessors, fn, args, kwargs):
+        if predecessors:
+            wait(predecessors)
+
+        return fn(*args, **kwargs)
+
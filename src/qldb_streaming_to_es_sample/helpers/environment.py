@@ -0,0 +1,43 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def get_bool(name, default=False):
+    """
+    Reads a boolean flag from the environment.
+    Accepts 1/true/yes/on (case insensitive) as true, anything else as false.
+    """
+    value = os.environ.get(name)
+
+    if value is None or value == "":
+        return default
+
+    return value.strip().lower() in TRUE_VALUES
+
+
+def get_int(name, default):
+    """
+    Reads an integer from the environment, falling back to default when unset.
+    """
+    value = os.environ.get(name)
+
+    if value is None or value == "":
+        return default
+
+    return int(value)
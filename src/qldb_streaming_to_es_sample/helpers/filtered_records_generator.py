@@ -13,29 +13,67 @@
 # HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-import amazon.ion.simpleion as ion
-import base64
+from amazon.ion import simpleion
+from .logger import get_logger, record_sampler, IonText
+from .metrics import BYTES
+from .payload_decoder import decode_base64
+import logging
+import time
+
+logger = get_logger("filtered_records_generator")
 
 REVISION_DETAILS_RECORD_TYPE = "REVISION_DETAILS"
 
 
-def filtered_records_generator(kinesis_deaggregate_records, table_names=None):
+def filtered_records_generator(kinesis_deaggregate_records, table_names=None, metrics=None):
+    """
+    Decodes deaggregated records and yields the revisions of the given tables.
+    When Metrics are given, the decoded bytes, the time spent decoding and the
+    records that were filtered out are added to them.
+    """
     for record in kinesis_deaggregate_records:
-        # Kinesis data in Python Lambdas is base64 encoded
-        payload = base64.b64decode(record['kinesis']['data'])
-        # payload is the actual ion binary record published by QLDB to the stream
-        ion_record = ion.loads(payload)
-        print("Ion record: ", (ion.dumps(ion_record, binary=False)))
+        start = time.perf_counter()
+        # Kinesis data in Python Lambdas is base64 encoded, the payload is
+        # the actual ion binary record published by QLDB to the stream
+        payload = decode_base64(record['kinesis']['data'])
+        ion_record = simpleion.loads(payload)
+
+        if metrics:
+            metrics.add_time("DecodeTime", time.perf_counter() - start)
+            metrics.increment("BytesDecoded", len(payload), BYTES)
+
+        if logger.isEnabledFor(logging.DEBUG) and record_sampler.sample():
+            logger.debug("Ion record: %s", IonText(ion_record))
+
+        revision = filter_revision_record(ion_record, table_names, record['kinesis'].get('sequenceNumber'))
+        if revision:
+            yield revision
+        elif metrics:
+            metrics.increment("RecordsFiltered")
+
+
+def filter_revision_record(ion_record, table_names=None, sequence_number=None):
+    """
+    Returns the revision of a decoded stream record, or None when it is not a revision
+    of one of the given tables, e.g. a block summary.
+
+    Parameters:
+       ion_record (IonPyDict): The decoded record from QLDB Streams
+       table_names (list): The tables to keep, all tables when empty
+       sequence_number (string): The Kinesis sequence number of the record
+    """
+    if ("recordType" in ion_record) and (ion_record["recordType"] == REVISION_DETAILS_RECORD_TYPE):
+        table_info = get_table_info_from_revision_record(ion_record)
 
-        if ("recordType" in ion_record) and (ion_record["recordType"] == REVISION_DETAILS_RECORD_TYPE):
-            table_info = get_table_info_from_revision_record(ion_record)
+        if not table_names or (table_info and (table_info["tableName"] in table_names)):
+            revision_data, revision_metadata = get_data_metdata_from_revision_record(ion_record)
 
-            if not table_names or (table_info and (table_info["tableName"] in table_names)):
-                revision_data, revision_metadata = get_data_metdata_from_revision_record(ion_record)
+            return {"table_info": table_info,
+                    "revision_data": revision_data,
+                    "revision_metadata": revision_metadata,
+                    "sequence_number": sequence_number}
 
-                yield {"table_info": table_info,
-                       "revision_data": revision_data,
-                       "revision_metadata": revision_metadata}
+    return None
 
 
 def get_data_metdata_from_revision_record(revision_record):
@@ -0,0 +1,80 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion.core import IonType, TimestampPrecision
+from amazon.ion.simple_types import IonPyNull
+from datetime import datetime
+from decimal import Decimal
+
+
+def to_python(value):
+    """
+    Converts a value loaded with amazon.ion.simpleion into plain Python types
+    (dict, list, str, int, bool, float, Decimal, datetime, bytes and None).
+    Ion annotations are dropped. Timestamps keep their precision, see PreciseDatetime.
+
+    Values loaded by simpleion cannot be pickled, plain types can be sent to other processes.
+    """
+    if isinstance(value, IonPyNull):
+        return None
+
+    converter = _CONVERTERS.get(getattr(value, "ion_type", None))
+
+    return converter(value) if converter else value
+
+
+class PreciseDatetime(datetime):
+    """
+    datetime with the precision of the Ion timestamp it was converted from, which the serializer
+    truncates year, month and day precision timestamps to. Unlike Ion timestamps, it keeps the
+    precision when it is pickled, so documents decoded in other processes serialize the same.
+    """
+
+    precision = None
+
+    def __reduce_ex__(self, protocol):
+        # TimestampPrecision members cannot be pickled, they are restored by name
+        return _precise_datetime, (self.year, self.month, self.day, self.hour, self.minute, self.second,
+                                   self.microsecond, self.tzinfo,
+                                   None if self.precision is None else self.precision.name)
+
+
+def _precise_datetime(year, month, day, hour, minute, second, microsecond, tzinfo, precision_name):
+    value = PreciseDatetime(year, month, day, hour, minute, second, microsecond, tzinfo)
+    value.precision = None if precision_name is None else getattr(TimestampPrecision, precision_name)
+    return value
+
+
+def _to_datetime(value):
+    timestamp = PreciseDatetime(value.year, value.month, value.day, value.hour, value.minute, value.second,
+                                value.microsecond, value.tzinfo)
+    timestamp.precision = getattr(value, "precision", None)
+    return timestamp
+
+
+_CONVERTERS = {
+    IonType.BOOL: bool,
+    IonType.INT: int,
+    IonType.FLOAT: float,
+    IonType.DECIMAL: Decimal,
+    IonType.TIMESTAMP: _to_datetime,
+    IonType.SYMBOL: lambda value: value.text,
+    IonType.STRING: str,
+    IonType.CLOB: bytes,
+    IonType.BLOB: bytes,
+    IonType.LIST: lambda value: [to_python(item) for item in value],
+    IonType.SEXP: lambda value: [to_python(item) for item in value],
+    IonType.STRUCT: lambda value: {key: to_python(item) for key, item in value.items()},
+}
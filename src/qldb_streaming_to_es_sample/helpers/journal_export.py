@@ -0,0 +1,112 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion import simpleion
+from amazon.ion.core import IonEventType, IonType
+from amazon.ion.reader import blocking_reader, NEXT_EVENT
+from amazon.ion.reader_binary import binary_reader
+from amazon.ion.reader_managed import managed_reader
+from amazon.ion.reader_text import text_reader
+from amazon.ion.simple_types import IonPyDict, IonPyList
+import glob
+import os
+
+ION_VERSION_MARKER = b"\xe0\x01\x00\xea"
+MANIFEST_SUFFIX = ".completed.manifest"
+
+# Size of the chunks export files are read in
+READ_BUFFER_SIZE = 64 * 1024
+
+
+def iter_ion_values(ion_file):
+    """
+    Yields the top-level containers of an Ion stream, text or binary, one at a time.
+    simpleion.load reads the whole stream into a list; this keeps a single block in memory
+    and reads the file in chunks of READ_BUFFER_SIZE. Top-level scalars are skipped.
+    """
+    binary = ion_file.read(len(ION_VERSION_MARKER)) == ION_VERSION_MARKER
+    ion_file.seek(0)
+
+    reader = blocking_reader(managed_reader(binary_reader() if binary else text_reader()), ion_file,
+                             READ_BUFFER_SIZE)
+
+    event = reader.send(NEXT_EVENT)
+    while event.event_type is not IonEventType.STREAM_END:
+        if event.event_type is IonEventType.CONTAINER_START:
+            is_struct = event.ion_type is IonType.STRUCT
+            container = (IonPyDict if is_struct else IonPyList).from_event(event)
+            # simpleion has no public API that yields top-level values one at a time, simpleion.load
+            # would hold the whole export file in memory. The private _load helper builds the rest of
+            # the container from the reader events like simpleion.load does; it is only known to work
+            # with amazon.ion 0.5.0, pinned in requirements.txt, and must be checked when upgrading.
+            simpleion._load(container, reader, IonEventType.CONTAINER_END, is_struct)
+            yield container
+
+        event = reader.send(NEXT_EVENT)
+
+
+def revisions_from_block(block, table_names=None):
+    """
+    Yields the revisions of a journal block as records shaped like the ones of
+    filtered_records_generator. Revisions hold no table name, it is looked up by document id
+    in the transaction info of the block. Revisions that only hold a hash, e.g. of system
+    tables or redacted revisions, are skipped.
+    """
+    transaction_info = block.get("transactionInfo") or {}
+    documents = transaction_info.get("documents") or {}
+
+    for revision in block.get("revisions") or []:
+        revision_metadata = revision.get("metadata")
+        if not revision_metadata:
+            continue
+
+        document = documents.get(revision_metadata["id"])
+        if not document or (table_names and document.get("tableName") not in table_names):
+            continue
+
+        yield {"table_info": {"tableName": document.get("tableName"), "tableId": document.get("tableId")},
+               "revision_data": revision.get("data"),
+               "revision_metadata": revision_metadata,
+               "sequence_number": None}
+
+
+def read_export_file(path, table_names=None):
+    """
+    Yields the revisions of the mapped tables in a journal export file, block by block.
+    """
+    with open(path, "rb") as export_file:
+        for block in iter_ion_values(export_file):
+            yield from revisions_from_block(block, table_names)
+
+
+def export_files(directory):
+    """
+    Returns the data files of a journal export in a directory, a local copy of the S3 prefix of
+    the export. The completed manifest lists them in journal order; without one, all Ion and JSON
+    files that are not manifests are returned sorted by name.
+    """
+    manifests = glob.glob(os.path.join(directory, "**", "*" + MANIFEST_SUFFIX), recursive=True)
+
+    if manifests:
+        paths = []
+        for manifest in sorted(manifests):
+            with open(manifest, "rb") as manifest_file:
+                keys = next(iter_ion_values(manifest_file)).get("keys") or []
+            paths.extend(os.path.join(os.path.dirname(manifest), os.path.basename(key)) for key in keys)
+        return paths
+
+    return sorted(path for pattern in ("*.ion", "*.json")
+                  for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+                  if not path.endswith(".manifest"))
@@ -0,0 +1,138 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Worker setup, fan-out and reporting shared by the command line loaders,
+replay and export_loader, that run the indexing pipeline outside Lambda.
+"""
+from urllib.parse import urlparse
+from ..clients.elasticsearch import ElasticsearchClient
+from ..clients.bulk_indexer import BulkIndexer
+from ..clients.serializer import IonJSONSerializer
+from ..constants import Constants
+from .table_mappings import load_table_mappings
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+# Set up in every worker process by init_worker
+table_mappings = None
+elasticsearch_client = None
+bulk_max_actions = None
+
+
+def init_worker(endpoint, sigv4, table_mappings_file, max_actions):
+    global table_mappings, elasticsearch_client, bulk_max_actions
+
+    table_mappings = load_table_mappings(table_mappings_file)
+    bulk_max_actions = max_actions
+    elasticsearch_client = create_client(endpoint, sigv4) if endpoint else None
+
+
+def create_client(endpoint, sigv4=False):
+    """
+    Creates a client for an endpoint URL, e.g. http://localhost:9200.
+    Requests are only signed with the AWS credentials of the environment when sigv4 is set.
+    """
+    url = urlparse(endpoint)
+    use_ssl = url.scheme == "https"
+
+    awsauth = None
+    if sigv4:
+        import boto3
+        from ..clients.auth import RefreshableAWS4Auth
+
+        session = boto3.Session()
+        awsauth = RefreshableAWS4Auth(session.get_credentials(), session.region_name, "es")
+
+    return ElasticsearchClient(host=url.hostname, awsauth=awsauth, serializer=IonJSONSerializer(),
+                               port=url.port or (443 if use_ssl else 80), use_ssl=use_ssl)
+
+
+def create_bulk_indexer():
+    """
+    Returns a BulkIndexer for the client of the worker, or None for a dry run.
+    """
+    if not elasticsearch_client:
+        return None
+
+    return BulkIndexer(elasticsearch_client, max_actions=bulk_max_actions, keep_results=False)
+
+
+def add_action(bulk_indexer, action):
+    if action["action"] == "delete":
+        bulk_indexer.delete(index=action["index"], id=action["id"], version=action["version"])
+    else:
+        bulk_indexer.index(index=action["index"], id=action["id"], body=action["body"], version=action["version"])
+
+
+def run(function, items, totals, processes=1, initargs=(), chunksize=1):
+    """
+    Calls function for every item, in worker processes when there is more than one,
+    and adds the counters it returns to totals.
+    """
+    if processes <= 1:
+        init_worker(*initargs)
+        _sum(totals, map(function, items))
+    else:
+        with multiprocessing.Pool(processes, initializer=init_worker, initargs=initargs) as pool:
+            _sum(totals, pool.imap_unordered(function, items, chunksize=chunksize))
+
+    return totals
+
+
+def _sum(totals, results):
+    for result in results:
+        for name, value in result.items():
+            totals[name] += value
+
+
+def argument_parser(description):
+    """
+    Returns a parser with the options every loader takes, to which the input arguments are added.
+    """
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="http://localhost:9200", help="Elasticsearch endpoint URL")
+    parser.add_argument("--sigv4", action="store_true", help="sign requests with the AWS credentials")
+    parser.add_argument("--dry-run", action="store_true", help="run the pipeline without writing")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--table-mappings", help="table mappings file, defaults to the one of the function")
+    parser.add_argument("--bulk-max-actions", type=int, default=Constants.BULK_MAX_ACTIONS,
+                        help="maximum actions per bulk request")
+    parser.add_argument("--json", action="store_true", help="print the totals as JSON")
+    return parser
+
+
+def report_throughput(totals, unit, output=sys.stdout):
+    seconds = max(totals["seconds"], 1e-9)
+
+    print("{:>14,.0f} {}/s {:>10.2f} MB/s".format(totals[unit] / seconds, unit,
+                                                  totals["bytes"] / seconds / 1024 / 1024), file=output)
+    print("  sent {sent:,} failed {failed:,}".format(**totals), file=output)
+
+
+def finish(totals, as_json, report):
+    """
+    Prints the totals and exits with status 1 when Elasticsearch rejected actions.
+    """
+    if as_json:
+        print(json.dumps(totals))
+    else:
+        report(totals)
+
+    if totals["failed"]:
+        sys.exit(1)
@@ -0,0 +1,69 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from . import environment
+import amazon.ion.simpleion as ion
+import itertools
+import logging
+import os
+
+LOGGER_NAME = "qldb_streaming_to_es_sample"
+
+_package_logger = logging.getLogger(LOGGER_NAME)
+_package_logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+def get_logger(name):
+    """
+    Returns a logger below the package logger, whose level is set by the LOG_LEVEL
+    environment variable. In Lambda, records are written by the handler the runtime
+    installs on the root logger.
+    """
+    return logging.getLogger(LOGGER_NAME + "." + name)
+
+
+class IonText:
+    """
+    Renders an Ion value as text only when a log record is actually formatted.
+    Pass it as a logging argument: logger.debug("Ion record: %s", IonText(value))
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return ion.dumps(self.value, binary=False)
+
+
+class Sampler:
+    """
+    Lets one in every rate calls through. A rate of 1 samples everything and
+    a rate of 0 samples nothing.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._counter = itertools.count()
+
+    def sample(self):
+        if self.rate <= 0:
+            return False
+
+        return next(self._counter) % self.rate == 0
+
+
+# Shared by the per record log lines, configured with LOG_SAMPLE_RATE
+record_sampler = Sampler(environment.get_int("LOG_SAMPLE_RATE", 1))
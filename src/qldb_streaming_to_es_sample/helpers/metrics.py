@@ -0,0 +1,131 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from contextlib import contextmanager
+import json
+import sys
+import threading
+import time
+
+COUNT = "Count"
+BYTES = "Bytes"
+MILLISECONDS = "Milliseconds"
+
+# CloudWatch accepts at most 100 values per metric in one EMF document
+MAX_VALUES = 100
+
+
+class Metrics:
+    """
+    Collects the counters, timings and sampled values of one invocation and writes them
+    as a single CloudWatch Embedded Metric Format document to stdout, which CloudWatch
+    Logs turns into metrics without any API call.
+    https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+
+    Counters and timings are summed; values, e.g. request latencies, are kept individually
+    up to MAX_VALUES per metric so that CloudWatch can compute percentiles. Updates are
+    thread-safe, as requests may be sent from several threads.
+
+    Parameters:
+       namespace (string): The CloudWatch namespace of the metrics
+       dimensions (dict): Dimension names and values every metric is reported with
+    """
+
+    def __init__(self, namespace, dimensions=None):
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self._lock = threading.Lock()
+        self._units = {}
+        self._sums = {}
+        self._values = {}
+
+    def increment(self, name, value=1, unit=COUNT):
+        with self._lock:
+            self._units[name] = unit
+            self._sums[name] = self._sums.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        self.increment(name, seconds * 1000, MILLISECONDS)
+
+    def add_value(self, name, value, unit=MILLISECONDS):
+        with self._lock:
+            self._units[name] = unit
+            values = self._values.setdefault(name, [])
+            if len(values) < MAX_VALUES:
+                values.append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Adds the wall time spent in the with block to a timing metric.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Returns the collected metrics as plain data, see merge.
+        """
+        with self._lock:
+            return {"units": dict(self._units), "sums": dict(self._sums),
+                    "values": {name: list(values) for name, values in self._values.items()}}
+
+    def merge(self, snapshot):
+        """
+        Adds metrics collected elsewhere, e.g. by a child process.
+        """
+        for name, value in snapshot["sums"].items():
+            self.increment(name, value, snapshot["units"][name])
+        for name, values in snapshot["values"].items():
+            for value in values:
+                self.add_value(name, value, snapshot["units"][name])
+
+    def to_emf(self, timestamp=None):
+        """
+        Returns the collected metrics as an EMF document.
+        """
+        with self._lock:
+            document = {"_aws": {
+                "Timestamp": int((time.time() if timestamp is None else timestamp) * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [sorted(self.dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in sorted(self._units.items())]
+                }]
+            }}
+            document.update(self.dimensions)
+            document.update(self._sums)
+            document.update(self._values)
+
+        return document
+
+    def flush(self, output=None):
+        """
+        Writes the collected metrics as one line to stdout and starts over.
+        """
+        document = self.to_emf()
+        self.reset()
+
+        print(json.dumps(document, separators=(",", ":")), file=output or sys.stdout, flush=True)
+        return document
+
+    def reset(self):
+        with self._lock:
+            self._units = {}
+            self._sums = {}
+            self._values = {}
@@ -0,0 +1,91 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from collections.abc import Sequence
+from .filtered_records_generator import filtered_records_generator
+from .ion_types import to_python
+from .metrics import Metrics
+import multiprocessing
+
+
+def decode_records(kinesis_deaggregate_records, table_names=None, processes=1, min_batch_size=0, metrics=None):
+    """
+    Decodes and filters deaggregated records like filtered_records_generator, optionally
+    splitting the batch into contiguous chunks that are decoded by child processes.
+    Records are returned in the order of the batch.
+
+    Batches smaller than min_batch_size, or with a single process, are decoded serially
+    since forking is not worth it for them. So are iterators, which cannot be split.
+
+    Records decoded by child processes hold plain Python types instead of simpleion types,
+    see ion_types.to_python. Their metrics are collected in the child and merged into metrics.
+    """
+    records = kinesis_deaggregate_records
+
+    # Streams of records, see RecordStream, are decoded lazily record by record
+    if not isinstance(records, Sequence):
+        yield from filtered_records_generator(records, table_names=table_names, metrics=metrics)
+        return
+
+    processes = min(processes, len(records))
+
+    if processes <= 1 or len(records) < min_batch_size:
+        yield from filtered_records_generator(records, table_names=table_names, metrics=metrics)
+        return
+
+    # multiprocessing.Pool and Queue need /dev/shm which is not available in Lambda,
+    # Process and Pipe are.
+    workers = []
+    chunk_size = -(-len(records) // processes)
+    for start in range(0, len(records), chunk_size):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_decode_chunk,
+                                          args=(records[start:start + chunk_size], table_names, sender,
+                                                metrics is not None))
+        process.start()
+        sender.close()
+        workers.append((process, receiver))
+
+    try:
+        for process, receiver in workers:
+            succeeded, result = receiver.recv()
+            process.join()
+
+            if not succeeded:
+                raise result
+
+            result, snapshot = result
+            if metrics and snapshot:
+                metrics.merge(snapshot)
+
+            yield from result
+    finally:
+        for process, receiver in workers:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _decode_chunk(records, table_names, sender, collect_metrics):
+    try:
+        metrics = Metrics(namespace=None) if collect_metrics else None
+        result = [{key: to_python(value) for key, value in record.items()}
+                  for record in filtered_records_generator(records, table_names=table_names, metrics=metrics)]
+        sender.send((True, (result, metrics and metrics.snapshot())))
+    except Exception as e:
+        sender.send((False, e))
+    finally:
+        sender.close()
@@ -0,0 +1,45 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import zlib
+
+
+def lane_for(document_id, lanes):
+    """
+    Returns the lane of a document. CRC32 is used instead of hash() since it is
+    stable across processes and invocations.
+    """
+    return zlib.crc32(document_id.encode("utf-8")) % lanes
+
+
+def partition_by_document(actions, lanes):
+    """
+    Splits write actions into lanes by document id. All actions of a document
+    go to the same lane and keep their relative order, so every lane can be
+    written independently without breaking the per-document version order.
+
+    Parameters:
+       actions (iterable): Write actions with an "id" key holding revision_metadata["id"]
+       lanes (int): Number of lanes
+
+    Returns:
+       A list of lanes, each a list of actions
+    """
+    partitions = [[] for lane in range(lanes)]
+
+    for action in actions:
+        partitions[lane_for(action["id"], lanes)].append(action)
+
+    return partitions
@@ -0,0 +1,33 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion import simpleion
+import binascii
+
+
+def decode_base64(data):
+    """
+    Returns the bytes of the base64 data of a Kinesis record. binascii.a2b_base64 decodes
+    the str directly, base64.b64decode first encodes it to bytes.
+    """
+    return binascii.a2b_base64(data)
+
+
+def decode_payload(data):
+    """
+    Decodes the base64 data of a Kinesis record into the Ion value QLDB published, like
+    ion.loads(base64.b64decode(data)).
+    """
+    return simpleion.loads(decode_base64(data))
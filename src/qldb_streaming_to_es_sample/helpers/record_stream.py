@@ -0,0 +1,58 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from aws_kinesis_agg.deaggregator import iter_deaggregate_records
+import time
+
+
+class RecordStream:
+    """
+    Deaggregates the Kinesis records of a batch lazily, one user record at a time.
+    Chained with the lazy decoding and mapping of the handler, every user record and its
+    buffers are released once its write is queued, instead of the whole deaggregated batch
+    being held until the end of the invocation.
+
+    Counts the records read and the time spent deaggregating them. Only their sequence
+    numbers are kept, for count_from.
+    """
+
+    def __init__(self, kinesis_records):
+        self._records = iter_deaggregate_records(kinesis_records)
+        self._sequence_numbers = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            record = next(self._records)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+        self.count += 1
+        self._sequence_numbers.append(record['kinesis']['sequenceNumber'])
+        return record
+
+    def count_from(self, sequence_number):
+        """
+        Returns the number of records at or after sequence_number, reading the rest of the batch.
+        """
+        for record in self:
+            pass
+
+        return sum(1 for number in self._sequence_numbers if int(number) >= int(sequence_number))
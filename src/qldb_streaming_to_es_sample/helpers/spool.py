@@ -0,0 +1,168 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from .logger import get_logger
+import fcntl
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+logger = get_logger("spool")
+
+# Every frame is the length and CRC32 of its payload, followed by the payload
+FRAME_HEADER = struct.Struct(">II")
+
+
+class Spool:
+    """
+    Append-only files of bulk entries that could not be sent to Elasticsearch.
+
+    Frames are checksummed, so a frame torn by an interrupted write, and everything after it,
+    is skipped when the spool is read instead of sending corrupt actions. Every process appends
+    to its own file, and drains the files of all processes in the directory, including those left
+    behind after a restart of the runtime or by other execution environments sharing an EFS mount.
+    Files are locked while they are appended to or drained. Instances can be shared between threads.
+
+    Parameters:
+       directory (string): Directory of the spool files, e.g. /tmp
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = self._new_path()
+        self._lock = threading.Lock()
+
+    def append(self, entries):
+        """
+        Appends serialized bulk entries and syncs them to disk.
+        """
+        if not entries:
+            return
+
+        with self._lock:
+            while True:
+                with open(self.path, "ab") as spool_file:
+                    fcntl.flock(spool_file, fcntl.LOCK_EX)
+                    # The file was claimed by a drain while waiting for the lock, the entries go to a new one
+                    if not self._is_current(spool_file, self.path):
+                        continue
+
+                    self._write(spool_file, entries)
+                    return
+
+    def claim(self):
+        """
+        Yields the paths of the spool files in the directory that are not appended to or drained
+        by another process, oldest name first. Every file is renamed, so that its writer starts a
+        new one, and stays locked until the next file is claimed. It is then removed, so entries
+        that failed again must be appended before. When the generator is closed early, the file
+        keeps its entries and is claimed by a later drain.
+        """
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("spool-") and name.endswith(".bin")):
+                continue
+
+            path = os.path.join(self.directory, name)
+            claimed_path = self._new_path()
+            try:
+                spool_file = open(path, "rb")
+            except FileNotFoundError:
+                continue
+
+            with spool_file:
+                try:
+                    fcntl.flock(spool_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                if not self._is_current(spool_file, path):
+                    continue
+
+                os.rename(path, claimed_path)
+                yield claimed_path
+                os.remove(claimed_path)
+
+    def read(self, path=None):
+        """
+        Yields the entries of a spool file, by default the one of this process, in the order
+        they were appended, reading the file frame by frame.
+        """
+        path = path or self.path
+        if not os.path.exists(path):
+            return
+
+        with open(path, "rb") as spool_file:
+            offset = 0
+            while True:
+                header = spool_file.read(FRAME_HEADER.size)
+                if not header:
+                    return
+
+                payload = b""
+                if len(header) == FRAME_HEADER.size:
+                    length, checksum = FRAME_HEADER.unpack(header)
+                    payload = spool_file.read(length)
+
+                if len(header) < FRAME_HEADER.size or len(payload) != length or zlib.crc32(payload) != checksum:
+                    logger.warning("Skipped torn or corrupt frame at offset %d of %s and everything after it",
+                                   offset, path)
+                    return
+
+                yield payload.decode("utf-8")
+                offset += FRAME_HEADER.size + length
+
+    def batches(self, max_actions, max_bytes, path=None):
+        """
+        Yields the entries of a spool file in batches that fit into a bulk request.
+        """
+        batch = []
+        size = 0
+
+        for entry in self.read(path):
+            entry_size = len(entry.encode("utf-8"))
+            if batch and (len(batch) + 1 > max_actions or size + entry_size > max_bytes):
+                yield batch
+                batch = []
+                size = 0
+
+            batch.append(entry)
+            size += entry_size
+
+        if batch:
+            yield batch
+
+    def _new_path(self):
+        return os.path.join(self.directory, "spool-{}.bin".format(uuid.uuid4().hex))
+
+    @staticmethod
+    def _is_current(spool_file, path):
+        # Whether the locked file is still the one at path, and not renamed by a drain
+        try:
+            return os.stat(path).st_ino == os.fstat(spool_file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _write(spool_file, entries):
+        frames = []
+        for entry in entries:
+            payload = entry.encode("utf-8")
+            frames.append(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)))
+            frames.append(payload)
+
+        spool_file.write(b"".join(frames))
+        spool_file.flush()
+        os.fsync(spool_file.fileno())
@@ -0,0 +1,142 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from operator import itemgetter
+import json
+import os
+
+DEFAULT_TABLE_MAPPINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                           "table_mappings.json")
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+OPERATIONS = (INSERT, UPDATE, DELETE)
+
+
+class TableMapping:
+    """
+    Describes how revisions of a QLDB table are written to Elasticsearch:
+    the target index, the projected fields and which operations are replicated.
+    Inserts are revisions with version 0, updates are later revisions with data
+    and deletes are revisions without data.
+
+    The projection is compiled once into an itemgetter, which both checks that all
+    fields are present and extracts them in a single call.
+
+    With partial_updates, index actions are marked as partial, so that only the fields that
+    changed since the previous revision are sent when its document is known.
+    """
+
+    def __init__(self, table, index, fields, operations=OPERATIONS, partial_updates=False):
+        unknown_operations = set(operations) - set(OPERATIONS)
+        if unknown_operations:
+            raise ValueError("Unknown operations {operations} for table {table}"
+                             .format(operations=sorted(unknown_operations), table=table))
+        if not fields:
+            raise ValueError("No fields configured for table {table}".format(table=table))
+
+        self.table = table
+        self.index = index
+        self.fields = tuple(fields)
+        self.operations = frozenset(operations)
+        self.partial_updates = partial_updates
+        self._getter = itemgetter(*self.fields)
+        self._single_field = len(self.fields) == 1
+
+    def project(self, revision_data):
+        """
+        Returns the document with the mapped fields of revision_data,
+        or None if any of the fields is missing.
+        """
+        try:
+            values = self._getter(revision_data)
+        except KeyError:
+            return None
+
+        if self._single_field:
+            values = (values,)
+
+        return dict(zip(self.fields, values))
+
+    def create_action(self, revision_data, revision_metadata):
+        """
+        Maps a revision to the index or delete action it results in.
+        Returns None when the revision should not be written.
+        """
+        version = revision_metadata["version"]
+        action = {"index": self.index, "id": revision_metadata["id"], "version": version}
+
+        if not revision_data:
+            if DELETE not in self.operations:
+                return None
+
+            action["action"] = "delete"
+            return action
+
+        if (INSERT if version == 0 else UPDATE) not in self.operations:
+            return None
+
+        document = self.project(revision_data)
+        if document is None:
+            return None
+
+        action["action"] = "index"
+        action["body"] = document
+        if self.partial_updates:
+            action["partial"] = True
+        return action
+
+
+class TableMappingRegistry:
+    """
+    Table mappings keyed by QLDB table name.
+    """
+
+    def __init__(self, mappings):
+        self._mappings = {mapping.table: mapping for mapping in mappings}
+        self.table_names = list(self._mappings)
+
+    def get(self, table_name):
+        return self._mappings.get(table_name)
+
+    def create_actions(self, records):
+        """
+        Maps decoded revision records, see filtered_records_generator, to write actions and skips
+        the revisions that are not written. Every action carries the sequence number of its record.
+        """
+        for record in records:
+            mapping = self.get(record["table_info"]["tableName"])
+            action = mapping and mapping.create_action(record["revision_data"], record["revision_metadata"])
+
+            if action:
+                action["sequence_number"] = record.get("sequence_number")
+                yield action
+
+    @classmethod
+    def from_config(cls, config):
+        return cls([TableMapping(table=table["table"], index=table["index"], fields=table["fields"],
+                                 operations=table.get("operations", OPERATIONS),
+                                 partial_updates=table.get("partial_updates", False))
+                    for table in config["tables"]])
+
+
+def load_table_mappings(path=None):
+    """
+    Loads the table mappings from a JSON file, by default the table_mappings.json
+    file shipped with the function.
+    """
+    with open(path or DEFAULT_TABLE_MAPPINGS_FILE) as mappings_file:
+        return TableMappingRegistry.from_config(json.load(mappings_file))
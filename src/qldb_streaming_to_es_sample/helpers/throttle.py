@@ -0,0 +1,132 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import threading
+import time
+
+
+class AdaptiveController:
+    """
+    Adapts the bulk size and the number of requests in flight to the feedback of the cluster,
+    additive increase / multiplicative decrease (AIMD) like TCP congestion control.
+
+    Every bulk request that completes below the latency target without rejections grows the
+    bulk size by bulk_size_step, and every in_flight such requests grow the number of requests
+    in flight by one. A request that was rejected with 429, e.g. es_rejected_execution_exception,
+    or took longer than the latency target cuts both by decrease_factor.
+    Instances can be shared between threads.
+
+    Parameters:
+       min_bulk_size (int): Lowest number of actions in a bulk request
+       max_bulk_size (int): Highest number of actions in a bulk request, also the initial one
+       bulk_size_step (int): Actions added to the bulk size after a good request
+       max_in_flight (int): Highest number of requests in flight, also the initial one
+       latency_target (float): Seconds above which a request counts as a latency spike
+       decrease_factor (float): Factor both settings are multiplied with on rejections or spikes
+    """
+
+    def __init__(self, min_bulk_size, max_bulk_size, bulk_size_step, max_in_flight, latency_target,
+                 decrease_factor=0.5):
+        self.min_bulk_size = min_bulk_size
+        self.max_bulk_size = max_bulk_size
+        self.bulk_size_step = bulk_size_step
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.bulk_size = max_bulk_size
+        self.in_flight = max_in_flight
+        self.increases = 0
+        self.decreases = 0
+        self.rejections = 0
+        self._good_requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, rejected):
+        """
+        Adjusts the settings to the outcome of a request.
+
+        Parameters:
+           latency (float): Seconds the request took
+           rejected (bool): Whether the cluster rejected the request or any of its items with 429
+        """
+        with self._lock:
+            if rejected or latency > self.latency_target:
+                self.rejections += 1 if rejected else 0
+                self.decreases += 1
+                self.bulk_size = max(self.min_bulk_size, int(self.bulk_size * self.decrease_factor))
+                self.in_flight = max(1, int(self.in_flight * self.decrease_factor))
+                self._good_requests = 0
+                return
+
+            self.increases += 1
+            self.bulk_size = min(self.max_bulk_size, self.bulk_size + self.bulk_size_step)
+
+            self._good_requests += 1
+            if self._good_requests >= self.in_flight:
+                self.in_flight = min(self.max_in_flight, self.in_flight + 1)
+                self._good_requests = 0
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "bulk_size": self.bulk_size,
+                "in_flight": self.in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "rejections": self.rejections
+            }
+
+
+class TokenBucket:
+    """
+    Limits the rate of actions sent to the cluster, as a hard ceiling on top of the adaptive controller.
+    Tokens refill at rate per second up to capacity. Taking more tokens than available waits for the
+    missing ones, so a request larger than the capacity is still sent, just later.
+    Instances can be shared between threads.
+
+    Parameters:
+       rate (float): Tokens added per second, e.g. actions per second
+       capacity (float): Largest burst, defaults to one second worth of tokens
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.waited = 0.0
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Takes tokens from the bucket, waiting until they are refilled if needed.
+        Returns the seconds waited.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Tokens may go negative, which makes later callers wait for the debt as well
+            self._tokens -= tokens
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += delay
+
+        if delay:
+            self._sleep(delay)
+
+        return delay
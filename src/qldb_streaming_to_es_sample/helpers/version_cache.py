@@ -0,0 +1,186 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from collections import OrderedDict
+from .logger import get_logger
+import hashlib
+import json
+import os
+import threading
+
+logger = get_logger("version_cache")
+
+
+class VersionCache:
+    """
+    Least recently used cache of the highest revision version Elasticsearch confirmed per
+    (index, id). With external versioning a write with a version at or below it would be
+    rejected as a version conflict, so it can be skipped without a request. Redelivered
+    batches, KPL duplicates and retries of partially written batches then cost no round-trip.
+
+    Along with the version, the digest of the projected document Elasticsearch holds can be
+    kept, see content_digest, so that revisions which do not change it can be skipped too.
+
+    For mappings with partial updates, the confirmed document is kept as well, with the sequence
+    number and primary term Elasticsearch assigned to it. The next revision can then be sent as
+    an update of the changed fields, conditional on the document not having changed since.
+    Documents are not saved to snapshots.
+
+    The cache lives as long as the execution environment. It can be saved to a file, e.g. in
+    /tmp, and loaded again when the function is initialized after a crash or a timeout in the
+    same environment. The changed attribute tells whether the versions or digests changed since
+    the cache was last saved or loaded, so that unchanged caches do not need to be written again.
+    Instances can be shared between threads.
+
+    Parameters:
+       max_size (int): Maximum number of documents, the least recently used one is evicted beyond it
+       metrics (Metrics): Optional metrics the hits, misses and evictions are counted in
+    """
+
+    def __init__(self, max_size, metrics=None):
+        self.max_size = max_size
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.unchanged = 0
+        self.changed = False
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._versions)
+
+    def __contains__(self, key):
+        return key in self._versions
+
+    def is_applied(self, key, version):
+        """
+        Returns whether a write of version, or of a later one, was already confirmed for key.
+        """
+        with self._lock:
+            entry = self._versions.get(key)
+            hit = entry is not None and version <= entry[0]
+
+            if entry is not None:
+                self._versions.move_to_end(key)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        self._count("VersionCacheHits" if hit else "VersionCacheMisses")
+        return hit
+
+    def is_unchanged(self, key, digest):
+        """
+        Returns whether Elasticsearch holds a document with digest for key.
+        """
+        with self._lock:
+            entry = self._versions.get(key)
+            unchanged = entry is not None and entry[1] is not None and entry[1] == digest
+            if unchanged:
+                self.unchanged += 1
+
+        if unchanged:
+            self._count("ProjectionsUnchanged")
+        return unchanged
+
+    def previous_state(self, key, version):
+        """
+        Returns the (seq_no, primary_term, document) Elasticsearch confirmed for the revision
+        preceding version of key, or None when it is not known.
+        """
+        with self._lock:
+            entry = self._versions.get(key)
+            if entry is None or entry[0] != version - 1:
+                return None
+
+            return entry[2]
+
+    def discard_digest(self, key):
+        """
+        Forgets the digest of key while a write that may change the document is in flight.
+        """
+        with self._lock:
+            entry = self._versions.get(key)
+            if entry is not None:
+                self._versions[key] = (entry[0], None, entry[2])
+                self.changed = self.changed or entry[1] is not None
+
+    def update(self, key, version, digest=None, state=None):
+        """
+        Records that Elasticsearch holds version, or a later one, for key, the digest of its
+        document and, for partial updates, its (seq_no, primary_term, document). Deletes have
+        neither.
+        """
+        evicted = 0
+        with self._lock:
+            entry = self._versions.get(key)
+            if entry is None or version >= entry[0]:
+                self._versions[key] = (version, digest, state)
+                self.changed = self.changed or entry is None or entry[:2] != (version, digest)
+            self._versions.move_to_end(key)
+
+            while len(self._versions) > self.max_size:
+                self._versions.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted:
+            self._count("VersionCacheEvictions", evicted)
+
+    def save(self, path):
+        """
+        Writes the cache to path, replacing the previous file atomically.
+        """
+        with self._lock:
+            entries = [[index, id, version, digest] for (index, id), (version, digest, state)
+                       in self._versions.items()]
+            self.changed = False
+
+        temporary_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary_path, "w") as cache_file:
+            json.dump(entries, cache_file, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    def load(self, path):
+        """
+        Adds the entries of a file written by save, in their least recently used order.
+        A missing or unreadable file leaves the cache empty.
+        """
+        try:
+            with open(path) as cache_file:
+                entries = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning("Ignored unreadable version cache snapshot %s. Error: %s", path, e)
+            return
+
+        for index, id, version, digest in entries:
+            self.update((index, id), version, digest)
+        self.changed = False
+
+    def _count(self, name, value=1):
+        if self.metrics:
+            self.metrics.increment(name, value)
+
+
+def content_digest(serializer, document):
+    """
+    Returns a compact hash of a projected document as it is serialized for Elasticsearch.
+    """
+    return hashlib.blake2b(serializer.dumps(document).encode("utf-8"), digest_size=8).hexdigest()
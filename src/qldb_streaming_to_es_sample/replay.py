@@ -0,0 +1,165 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Replays recorded Lambda events through the indexing pipeline without Kinesis,
+for backfills, incident replays and profiling.
+
+Events are read from .jsonl files with one event per line, which are streamed,
+and .json files holding one event or a list of events. A .json file is decoded
+whole in memory, so large recordings should be converted to .jsonl, e.g. with
+jq -c '.[]' events.json > events.jsonl. Every event is a batch with a "Records"
+array, like the events Lambda passes to the function. Batches are fanned out
+across worker processes; with external versioning the order in which they are
+written does not change the result.
+
+Run from the src directory:
+    python -m qldb_streaming_to_es_sample.replay --endpoint http://localhost:9200 events.jsonl
+    python -m qldb_streaming_to_es_sample.replay --endpoint https://DOMAIN_ENDPOINT --sigv4 events.jsonl
+    python -m qldb_streaming_to_es_sample.replay --dry-run --processes 1 events.jsonl
+"""
+from aws_kinesis_agg.deaggregator import deaggregate_records
+from .helpers.filtered_records_generator import filtered_records_generator
+from .helpers import loader
+from .constants import Constants
+import json
+import mmap
+import os
+import sys
+import time
+
+STAGES = ("parse", "deaggregate", "decode", "map", "write")
+
+# Files of at least this size are memory-mapped instead of read through a buffer
+DEFAULT_MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+
+def read_events(paths, mmap_threshold=DEFAULT_MMAP_THRESHOLD_BYTES):
+    """
+    Yields the events of the given files. Lines of .jsonl files are yielded undecoded,
+    so that workers parse them. .json files are not streamed, they are decoded whole and
+    their events are yielded decoded.
+    """
+    for path in paths:
+        if not path.endswith(".jsonl"):
+            with open(path, "rb") as events_file:
+                events = json.load(events_file)
+            yield from events if isinstance(events, list) else [events]
+            continue
+
+        with open(path, "rb") as events_file:
+            if os.path.getsize(path) >= max(mmap_threshold, 1):
+                with mmap.mmap(events_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield from _lines(iter(mapped.readline, b""))
+            else:
+                yield from _lines(events_file)
+
+
+def _lines(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def replay_event(event):
+    """
+    Runs one event through the pipeline of the function and returns its counters and stage timings.
+    Actions Elasticsearch rejected, other than version conflicts, are counted as failed.
+    """
+    stats = dict.fromkeys(STAGES, 0.0)
+    start = time.perf_counter()
+
+    stats["bytes"] = len(event) if isinstance(event, bytes) else 0
+    if isinstance(event, bytes):
+        event = json.loads(event)
+    stats["parse"], start = _lap(start)
+
+    records = deaggregate_records(event["Records"])
+    stats["deaggregate"], start = _lap(start)
+
+    revisions = list(filtered_records_generator(records, table_names=loader.table_mappings.table_names))
+    stats["decode"], start = _lap(start)
+
+    actions = list(loader.table_mappings.create_actions(revisions))
+    stats["map"], start = _lap(start)
+
+    stats.update(sent=0, failed=0)
+    bulk_indexer = loader.create_bulk_indexer()
+    if bulk_indexer:
+        for action in actions:
+            loader.add_action(bulk_indexer, action)
+        bulk_indexer.flush()
+        stats.update(sent=bulk_indexer.sent, failed=bulk_indexer.failed)
+    stats["write"], start = _lap(start)
+
+    stats.update(events=1, records=len(records), revisions=len(revisions), actions=len(actions))
+    return stats
+
+
+def _lap(start):
+    now = time.perf_counter()
+    return now - start, now
+
+
+def replay(paths, endpoint=None, sigv4=False, processes=1, table_mappings_file=None,
+           bulk_max_actions=Constants.BULK_MAX_ACTIONS, mmap_threshold=DEFAULT_MMAP_THRESHOLD_BYTES):
+    """
+    Replays the events of the given files and returns the summed counters and stage timings.
+    Without an endpoint nothing is written, which measures reading, decoding and mapping only.
+    """
+    totals = dict.fromkeys(STAGES + ("events", "records", "revisions", "actions", "bytes", "sent", "failed"), 0)
+    initargs = (endpoint, sigv4, table_mappings_file, bulk_max_actions)
+    events = read_events(paths, mmap_threshold)
+    start = time.perf_counter()
+
+    loader.run(replay_event, events, totals, processes, initargs)
+
+    totals["seconds"] = time.perf_counter() - start
+    # Events of .json files are decoded by the reader, so their size is taken from the files
+    totals["bytes"] += sum(os.path.getsize(path) for path in paths if not path.endswith(".jsonl"))
+
+    return totals
+
+
+def report(totals, output=sys.stdout):
+    stage_seconds = sum(totals[stage] for stage in STAGES) or 1e-9
+
+    print("Replayed {events:,} events with {records:,} records, {revisions:,} revisions and {actions:,} actions "
+          "in {seconds:.2f} s".format(**totals), file=output)
+    loader.report_throughput(totals, "records", output)
+
+    # Stage timings are summed over all workers
+    for stage in STAGES:
+        print("  {:<12} {:>10.3f} s {:>6.1%}".format(stage, totals[stage], totals[stage] / stage_seconds),
+              file=output)
+
+
+def main(arguments=None):
+    parser = loader.argument_parser(__doc__)
+    parser.add_argument("paths", nargs="+", help=".jsonl files with recorded events, or .json files, which are read whole")
+    parser.add_argument("--mmap-threshold", type=int, default=DEFAULT_MMAP_THRESHOLD_BYTES,
+                        help="size in bytes from which files are memory-mapped")
+    args = parser.parse_args(arguments)
+
+    totals = replay(args.paths, endpoint=None if args.dry_run else args.endpoint, sigv4=args.sigv4,
+                    processes=args.processes, table_mappings_file=args.table_mappings,
+                    bulk_max_actions=args.bulk_max_actions, mmap_threshold=args.mmap_threshold)
+
+    loader.finish(totals, args.json, report)
+
+
+if __name__ == "__main__":
+    main()
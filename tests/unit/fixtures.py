@@ -136,12 +136,14 @@ def deaggregated_stream_records():
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588801',
                 'data': base64.b64encode(ion.dumps(ion.loads(person_block_summary_ion_record()))).decode("utf-8")
             }
         }, {
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588802',
                 'data': base64.b64encode(
                     ion.dumps(ion.loads(person_revision_details_ion_record(revision_version)))).decode("utf-8")
             }
@@ -149,6 +151,7 @@ def deaggregated_stream_records():
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588803',
                 'data': base64.b64encode(
                     ion.dumps(ion.loads(vehicle_registration_revision_details_ion_record(revision_version)))).decode("utf-8")
             }
@@ -164,6 +167,7 @@ def deaggregated_stream_records_for_delete_scenario():
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588801',
                 'data': base64.b64encode(ion.dumps(
                     ion.loads(person_revision_details_ion_record_for_delete_scenario()))).decode("utf-8")
             }
@@ -171,6 +175,7 @@ def deaggregated_stream_records_for_delete_scenario():
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588802',
                 'data': base64.b64encode(
                     ion.dumps(ion.loads(person_revision_details_ion_record(revision_version)))).decode("utf-8")
             }
@@ -178,6 +183,7 @@ def deaggregated_stream_records_for_delete_scenario():
             'kinesis': {
                 'kinesisSchemaVersion': '1.0',
                 'aggregated': True,
+                'sequenceNumber': '49590338271490256608559692538361571095921575989136588803',
                 'data': base64.b64encode(
                     ion.dumps(ion.loads(vehicle_registration_revision_details_ion_record(revision_version)))).decode("utf-8")
             }
@@ -0,0 +1,98 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.clients.auth import RefreshableAWS4Auth, payload_hash
+from requests_aws4auth import AWS4Auth
+from collections import namedtuple
+import hashlib
+import requests
+
+FrozenCredentials = namedtuple("FrozenCredentials", ["access_key", "secret_key", "token"])
+
+
+class FakeCredentialProvider:
+    """
+    Hands out the next credentials on every call, like a provider that refreshed them.
+    """
+
+    def __init__(self, *credentials):
+        self.credentials = list(credentials)
+        self.calls = 0
+
+    def get_frozen_credentials(self):
+        credentials = self.credentials[min(self.calls, len(self.credentials) - 1)]
+        self.calls += 1
+        return credentials
+
+
+def __request(body=b'{"index": {}}\n{"FirstName": "John"}\n'):
+    return requests.Request(method="POST", url="https://elasticsearch_host/_bulk?refresh=false", data=body,
+                            headers={"content-type": "application/x-ndjson"}).prepare()
+
+
+def __request_with_date(amz_date):
+    request = __request()
+    request.headers["x-amz-date"] = amz_date
+    return request
+
+
+def test_payload_hash_matches_sha256_of_whole_body():
+    body = b"x" * (3 * 64 * 1024 + 17)
+
+    assert payload_hash(body) == hashlib.sha256(body).hexdigest()
+    assert payload_hash(None) == hashlib.sha256(b"").hexdigest()
+
+
+def test_signature_matches_aws4auth():
+    credentials = FrozenCredentials("access_key", "secret_key", "session_token")
+    auth = RefreshableAWS4Auth(FakeCredentialProvider(credentials), "us-east-1", "es")
+
+    # Trigger
+    signed = auth(__request())
+
+    # Verify
+    date = signed.headers["x-amz-date"][:8]
+    expected = AWS4Auth("access_key", "secret_key", "us-east-1", "es", date, session_token="session_token")(
+        __request_with_date(signed.headers["x-amz-date"]))
+    assert signed.headers["Authorization"] == expected.headers["Authorization"]
+    assert signed.headers["x-amz-security-token"] == "session_token"
+
+
+def test_refreshed_credentials_are_used_for_later_requests():
+    provider = FakeCredentialProvider(FrozenCredentials("old_key", "old_secret", "old_token"),
+                                      FrozenCredentials("new_key", "new_secret", "new_token"))
+    auth = RefreshableAWS4Auth(provider, "us-east-1", "es")
+
+    # Trigger
+    first = auth(__request())
+    second = auth(__request())
+
+    # Verify
+    assert "Credential=old_key/" in first.headers["Authorization"]
+    assert "Credential=new_key/" in second.headers["Authorization"]
+    assert second.headers["x-amz-security-token"] == "new_token"
+
+
+def test_signing_key_is_cached_per_day():
+    auth = RefreshableAWS4Auth(FakeCredentialProvider(FrozenCredentials("access_key", "secret_key", None)),
+                               "us-east-1", "es")
+
+    # Trigger
+    key = auth.signing_key_for("secret_key", "20201001")
+
+    # Verify
+    assert auth.signing_key_for("secret_key", "20201001") is key
+    assert auth.signing_key_for("secret_key", "20201002") is not key
+    assert auth.signing_key_for("rotated_secret", "20201002").scope == "20201002/us-east-1/es/aws4_request"
@@ -0,0 +1,64 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.batch_item_failures import BatchItemFailures
+from .test_constants import TestConstants
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+
+def test_no_failures():
+    failures = BatchItemFailures()
+
+    assert not failures
+    assert failures.response() == []
+
+
+def test_lowest_sequence_number_is_reported():
+    failures = BatchItemFailures()
+
+    failures.add(TestConstants.SEQUENCE_NUMBERS[2])
+    failures.add(TestConstants.SEQUENCE_NUMBERS[1])
+    failures.add(TestConstants.SEQUENCE_NUMBERS[2])
+
+    assert failures
+    assert failures.response() == [{"itemIdentifier": TestConstants.SEQUENCE_NUMBERS[1]}]
+
+
+def test_failures_without_sequence_number_fail_the_batch():
+    failures = BatchItemFailures()
+
+    failures.add(TestConstants.SEQUENCE_NUMBERS[1])
+    failures.add(None)
+
+    test_case_instance.assertRaises(RuntimeError, failures.response)
+
+
+def test_only_records_from_the_reported_one_on_are_covered():
+    failures = BatchItemFailures()
+
+    assert not failures.covers(TestConstants.SEQUENCE_NUMBERS[1])
+
+    failures.add(TestConstants.SEQUENCE_NUMBERS[1])
+
+    assert not failures.covers(TestConstants.SEQUENCE_NUMBERS[0])
+    assert failures.covers(TestConstants.SEQUENCE_NUMBERS[1])
+    assert failures.covers(TestConstants.SEQUENCE_NUMBERS[2])
+    assert not failures.covers(None)
+
+    failures.add(None)
+
+    assert failures.covers(TestConstants.SEQUENCE_NUMBERS[0])
@@ -0,0 +1,283 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.clients.elasticsearch import ElasticsearchClient, CircuitOpenError
+from src.qldb_streaming_to_es_sample.clients.bulk_indexer import BulkIndexer
+from src.qldb_streaming_to_es_sample.helpers.dispatcher import ConcurrentDispatcher
+from src.qldb_streaming_to_es_sample.helpers.spool import Spool
+from src.qldb_streaming_to_es_sample.helpers.version_cache import VersionCache
+from requests_aws4auth import AWS4Auth
+from elasticsearch import ConnectionError
+from .test_constants import TestConstants
+from unittest.mock import MagicMock
+import json
+
+awsauth = AWS4Auth("access_key", "secret_key", "us-east-1", "es", "session_token")
+elasticsearch_client = ElasticsearchClient(host="elasticsearch_host", awsauth=awsauth)
+
+
+def sent_lines(bulk_mock, call_index=0):
+    body = "".join(bulk_mock.call_args_list[call_index][1]["actions"])
+    assert body.endswith("\n")
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_actions_use_external_versioning():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[])
+    bulk_indexer = BulkIndexer(elasticsearch_client)
+
+    # Trigger
+    bulk_indexer.index(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID,
+                       body=TestConstants.PERSON_DATA, version=0)
+    bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=2)
+    bulk_indexer.flush()
+
+    # Verify
+    assert sent_lines(elasticsearch_client.bulk) == [
+        {"index": {"_index": TestConstants.PERSON_INDEX, "_id": TestConstants.PERSON_METADATA_ID,
+                   "version": 0, "version_type": "external"}},
+        TestConstants.PERSON_DATA,
+        {"delete": {"_index": TestConstants.PERSON_INDEX, "_id": TestConstants.PERSON_METADATA_ID,
+                    "version": 2, "version_type": "external"}}]
+
+
+def test_request_is_sent_when_action_limit_is_reached():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[])
+    bulk_indexer = BulkIndexer(elasticsearch_client, max_actions=2)
+
+    # Trigger
+    for version in range(5):
+        bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=version)
+    bulk_indexer.flush()
+
+    # Verify
+    assert elasticsearch_client.bulk.call_count == 3
+    assert len(sent_lines(elasticsearch_client.bulk, 0)) == 2
+    assert len(sent_lines(elasticsearch_client.bulk, 2)) == 1
+
+
+def test_request_is_sent_before_byte_limit_is_exceeded():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[])
+    bulk_indexer = BulkIndexer(elasticsearch_client, max_bytes=300)
+
+    # Trigger
+    for version in range(3):
+        bulk_indexer.index(index=TestConstants.VEHICLE_REGISTRATION_INDEX,
+                           id=TestConstants.VEHICLE_REGISTRATION_METADATA_ID,
+                           body=TestConstants.VEHICLE_REGISTRATION_DATA, version=version)
+    bulk_indexer.flush()
+
+    # Verify
+    assert elasticsearch_client.bulk.call_count == 3
+    for call in elasticsearch_client.bulk.call_args_list:
+        assert len("".join(call[1]["actions"]).encode("utf-8")) <= 300
+
+
+def test_flush_without_actions_sends_nothing():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock()
+    bulk_indexer = BulkIndexer(elasticsearch_client)
+
+    # Trigger
+    results = bulk_indexer.flush()
+
+    # Verify
+    assert results == []
+    elasticsearch_client.bulk.assert_not_called()
+
+
+def test_requests_are_sent_through_dispatcher():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[{"status": 201}])
+    dispatcher = ConcurrentDispatcher(max_in_flight=2)
+    bulk_indexer = BulkIndexer(elasticsearch_client, max_actions=1, dispatcher=dispatcher)
+
+    # Trigger
+    for version in range(3):
+        bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=version)
+    bulk_indexer.flush()
+    dispatcher.wait()
+    dispatcher.shutdown()
+
+    # Verify
+    assert [sent_lines(elasticsearch_client.bulk, call)[0]["delete"]["version"] for call in range(3)] == [0, 1, 2]
+    assert len(bulk_indexer.results) == 3
+
+
+def test_transient_failures_are_passed_to_on_failure():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[{"status": 201}, {"status": 503}, {"status": 400},
+                                                        {"status": 409}])
+    failed = []
+    bulk_indexer = BulkIndexer(elasticsearch_client, on_failure=failed.append)
+
+    # Trigger
+    for version in range(4):
+        bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=version,
+                            context=TestConstants.SEQUENCE_NUMBERS[version % 3])
+    bulk_indexer.flush()
+
+    # Verify
+    assert failed == [TestConstants.SEQUENCE_NUMBERS[1]]
+
+
+def test_failed_requests_are_passed_to_on_failure():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(side_effect=ConnectionError("N/A", "connection refused", None))
+    failed = []
+    bulk_indexer = BulkIndexer(elasticsearch_client, on_failure=failed.append)
+
+    # Trigger
+    bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=0,
+                        context=TestConstants.SEQUENCE_NUMBERS[0])
+    bulk_indexer.flush()
+
+    # Verify
+    assert failed == [TestConstants.SEQUENCE_NUMBERS[0]]
+
+
+def test_requests_hold_at_most_the_bulk_size_of_the_controller():
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[])
+    bulk_indexer = BulkIndexer(elasticsearch_client, max_actions=4, controller=MagicMock(bulk_size=2))
+
+    # Trigger
+    for version in range(5):
+        bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=version)
+    bulk_indexer.flush()
+
+    # Verify
+    assert elasticsearch_client.bulk.call_count == 3
+
+
+def test_failed_actions_are_spilled_to_the_spool(tmp_path):
+    spool = Spool(str(tmp_path))
+    on_failure = MagicMock()
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(side_effect=CircuitOpenError())
+    bulk_indexer = BulkIndexer(elasticsearch_client, on_failure=on_failure, spool=spool)
+
+    # Trigger
+    bulk_indexer.delete(index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_METADATA_ID, version=2)
+    bulk_indexer.flush()
+
+    # Verify
+    assert len(list(spool.read())) == 1
+    on_failure.assert_not_called()
+
+
+def test_confirmed_versions_are_recorded_in_the_version_cache():
+    version_cache = VersionCache(max_size=10)
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[{"status": 201}, {"status": 409}, {"status": 400}])
+    bulk_indexer = BulkIndexer(elasticsearch_client, version_cache=version_cache)
+
+    # Trigger
+    bulk_indexer.index(index=TestConstants.PERSON_INDEX, id="1", body=TestConstants.PERSON_DATA, version=0,
+                       digest="digest")
+    bulk_indexer.index(index=TestConstants.PERSON_INDEX, id="2", body=TestConstants.PERSON_DATA, version=2,
+                       digest="digest")
+    bulk_indexer.index(index=TestConstants.PERSON_INDEX, id="3", body=TestConstants.PERSON_DATA, version=0)
+    bulk_indexer.flush()
+
+    # Verify
+    assert version_cache.is_applied((TestConstants.PERSON_INDEX, "1"), 0)
+    assert version_cache.is_unchanged((TestConstants.PERSON_INDEX, "1"), "digest")
+    assert version_cache.is_applied((TestConstants.PERSON_INDEX, "2"), 2)
+    # Elasticsearch holds a later document than the one of the conflicting action
+    assert not version_cache.is_unchanged((TestConstants.PERSON_INDEX, "2"), "digest")
+    assert not version_cache.is_applied((TestConstants.PERSON_INDEX, "3"), 0)
+
+
+def test_partial_updates_are_conditional_on_the_previous_revision():
+    version_cache = VersionCache(max_size=10)
+    key = (TestConstants.VEHICLE_REGISTRATION_INDEX, TestConstants.VEHICLE_REGISTRATION_METADATA_ID)
+    body = dict(TestConstants.VEHICLE_REGISTRATION_DATA, State="OR")
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(return_value=[{"status": 200, "_version": 2, "_seq_no": 8,
+                                                         "_primary_term": 1}])
+    bulk_indexer = BulkIndexer(elasticsearch_client, version_cache=version_cache)
+
+    # Trigger
+    bulk_indexer.update(index=key[0], id=key[1], doc={"State": "OR"}, body=body, version=2, if_seq_no=7,
+                        if_primary_term=1)
+    bulk_indexer.flush()
+
+    # Verify
+    assert sent_lines(elasticsearch_client.bulk) == [
+        {"update": {"_index": key[0], "_id": key[1], "if_seq_no": 7, "if_primary_term": 1}},
+        {"doc": {"State": "OR"}}]
+    assert version_cache.previous_state(key, 3) == (8, 1, body)
+    assert bulk_indexer.fallbacks == 0
+
+
+def test_partial_updates_fall_back_to_indexing_the_full_document():
+    version_cache = VersionCache(max_size=10)
+    key = (TestConstants.VEHICLE_REGISTRATION_INDEX, TestConstants.VEHICLE_REGISTRATION_METADATA_ID)
+    body = {"VIN": "L12345", "State": "OR"}
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(side_effect=[[{"status": 409}],
+                                                       [{"status": 201, "_version": 2, "_seq_no": 9,
+                                                         "_primary_term": 1}]])
+    bulk_indexer = BulkIndexer(elasticsearch_client, version_cache=version_cache)
+
+    # Trigger
+    bulk_indexer.update(index=key[0], id=key[1], doc={"State": "OR"}, body=body, version=2, if_seq_no=7,
+                        if_primary_term=1)
+    results = bulk_indexer.flush()
+
+    # Verify
+    assert sent_lines(elasticsearch_client.bulk, call_index=1) == [
+        {"index": {"_index": key[0], "_id": key[1], "version": 2, "version_type": "external"}}, body]
+    assert results == [{"status": 201, "_version": 2, "_seq_no": 9, "_primary_term": 1}]
+    assert version_cache.previous_state(key, 3) == (9, 1, body)
+    assert bulk_indexer.fallbacks == 1
+    assert bulk_indexer.sent == 1
+
+
+def test_partial_updates_are_spilled_as_full_documents(tmp_path):
+    spool = Spool(str(tmp_path))
+    body = {"VIN": "L12345", "State": "OR"}
+
+    # Mock
+    elasticsearch_client.bulk = MagicMock(side_effect=CircuitOpenError())
+    bulk_indexer = BulkIndexer(elasticsearch_client, spool=spool)
+
+    # Trigger
+    bulk_indexer.update(index=TestConstants.VEHICLE_REGISTRATION_INDEX,
+                        id=TestConstants.VEHICLE_REGISTRATION_METADATA_ID, doc={"State": "OR"}, body=body, version=2,
+                        if_seq_no=7, if_primary_term=1)
+    bulk_indexer.flush()
+
+    # Verify
+    assert [json.loads(line) for entry in spool.read() for line in entry.splitlines()] == [
+        {"index": {"_index": TestConstants.VEHICLE_REGISTRATION_INDEX,
+                   "_id": TestConstants.VEHICLE_REGISTRATION_METADATA_ID, "version": 2, "version_type": "external"}},
+        body]
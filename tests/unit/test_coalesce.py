@@ -0,0 +1,62 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.coalesce import coalesce_actions
+from .test_constants import TestConstants
+
+
+def index_action(id, version, index=TestConstants.VEHICLE_REGISTRATION_INDEX):
+    return {"action": "index", "index": index, "id": id, "version": version,
+            "body": TestConstants.VEHICLE_REGISTRATION_DATA}
+
+
+def delete_action(id, version, index=TestConstants.VEHICLE_REGISTRATION_INDEX):
+    return {"action": "delete", "index": index, "id": id, "version": version}
+
+
+def test_only_highest_version_per_document_is_kept():
+    actions = [index_action("a", 0), index_action("b", 0), index_action("a", 1), index_action("a", 2)]
+
+    coalesced, dropped = coalesce_actions(actions)
+
+    assert coalesced == [index_action("b", 0), index_action("a", 2)]
+    assert dropped == 2
+
+
+def test_delete_supersedes_earlier_index():
+    actions = [index_action("a", 0), delete_action("a", 1)]
+
+    coalesced, dropped = coalesce_actions(actions)
+
+    assert coalesced == [delete_action("a", 1)]
+    assert dropped == 1
+
+
+def test_late_arriving_lower_version_is_dropped():
+    actions = [delete_action("a", 2), index_action("a", 0)]
+
+    coalesced, dropped = coalesce_actions(actions)
+
+    assert coalesced == [delete_action("a", 2)]
+    assert dropped == 1
+
+
+def test_same_id_in_different_indexes_is_not_coalesced():
+    actions = [index_action("a", 0, index=TestConstants.PERSON_INDEX), index_action("a", 0)]
+
+    coalesced, dropped = coalesce_actions(actions)
+
+    assert coalesced == actions
+    assert dropped == 0
@@ -0,0 +1,97 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.clients.connection_factory import create_elasticsearch, connection_stats, \
+    compress, PooledRequestsHttpConnection, PooledUrllib3HttpConnection
+from unittest.mock import MagicMock
+import gzip
+import os
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def __signer(request):
+    request.headers["authorization"] = "signed " + request.url
+    return request
+
+
+def test_small_bodies_are_not_compressed():
+    assert compress(b"{}", None, 1024) == (b"{}", None)
+    assert compress(b"{}" * 1024, None, None) == (b"{}" * 1024, None)
+
+
+def test_large_bodies_are_gzipped():
+    body = b'{"index": {}}\n' * 100
+
+    # Trigger
+    compressed, headers = compress(body, {"content-type": "application/x-ndjson"}, 1024)
+
+    # Verify
+    assert gzip.decompress(compressed) == body
+    assert headers == {"content-type": "application/x-ndjson", "content-encoding": "gzip"}
+
+
+def test_requests_connection_pool_is_sized():
+    connection = PooledRequestsHttpConnection(host="elasticsearch_host", port=443, use_ssl=True, pool_maxsize=8)
+
+    # Verify
+    assert connection.session.get_adapter("https://elasticsearch_host")._pool_maxsize == 8
+
+
+def test_urllib3_connection_signs_compressed_body(mocker):
+    connection = PooledUrllib3HttpConnection(host="elasticsearch_host", port=443, use_ssl=True,
+                                             http_auth=__signer, pool_maxsize=4, compression_threshold=10)
+    response = MagicMock(status=200, data=b"{}")
+
+    # Mock
+    mocker.patch.object(connection.pool, 'urlopen', return_value=response)
+
+    # Trigger
+    connection.perform_request("POST", "/_bulk", body=b'{"index": {}}\n' * 10)
+
+    # Verify
+    args, kwargs = connection.pool.urlopen.call_args
+    assert gzip.decompress(args[2]) == (b'{"index": {}}\n' * 10)
+    assert kwargs["headers"]["authorization"] == "signed https://elasticsearch_host:443/_bulk"
+    assert kwargs["headers"]["content-encoding"] == "gzip"
+    assert connection.pool.pool.maxsize == 4
+
+
+def test_connection_stats_count_reused_connections():
+    es = create_elasticsearch("elasticsearch_host", awsauth=None, connection_class="urllib3")
+    pool = es.transport.connection_pool.connections[0].pool
+
+    # Mock
+    pool.num_requests = 10
+    pool.num_connections = 2
+
+    # Verify
+    assert connection_stats(es) == {"requests": 10, "new_connections": 2, "reused_connections": 8}
+
+
+def test_unknown_connection_class_is_rejected():
+    test_case_instance.assertRaises(ValueError, create_elasticsearch, "elasticsearch_host", None,
+                                    connection_class="httpx")
+
+
+def test_provisioning_function_copy_is_identical():
+    shared = os.path.join(ROOT, "src", "qldb_streaming_to_es_sample", "clients", "connection_factory.py")
+    copy = os.path.join(ROOT, "setup", "connection_factory.py")
+
+    with open(shared, "rb") as shared_file, open(copy, "rb") as copy_file:
+        assert copy_file.read() == shared_file.read(), "copy {} to {}".format(shared, copy)
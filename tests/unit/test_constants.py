@@ -16,13 +16,32 @@
 from decimal import Decimal
 from elasticsearch import ConnectionError,ImproperlyConfigured,SSLError
 from elasticsearch import SerializationError, ConflictError, RequestError
+from src.qldb_streaming_to_es_sample.helpers.table_mappings import load_table_mappings
+
+# Indices and fields come from the table mappings shipped with the function
+TABLE_MAPPINGS = load_table_mappings()
+
 
 class TestConstants:
+    PERSON_TABLENAME = "Person"
+    VEHICLE_REGISTRATION_TABLENAME = "VehicleRegistration"
+
+    PERSON_INDEX = TABLE_MAPPINGS.get(PERSON_TABLENAME).index
+    VEHICLE_REGISTRATION_INDEX = TABLE_MAPPINGS.get(VEHICLE_REGISTRATION_TABLENAME).index
+
+    PERSON_TABLE_FIELDS = list(TABLE_MAPPINGS.get(PERSON_TABLENAME).fields)
+    VEHICLE_REGISTRATION_TABLE_FIELDS = list(TABLE_MAPPINGS.get(VEHICLE_REGISTRATION_TABLENAME).fields)
+
     PERSON_DATA = {'FirstName': 'Nova', 'GovId': 'LEWISR261LL', 'LastName': 'Lewis'}
     VEHICLE_REGISTRATION_DATA = {'VIN': 'L12345', 'LicensePlateNumber': '1234567',
                                   'State': 'WA', 'PendingPenaltyTicketAmount': Decimal('127.5')}
     PERSON_METADATA_ID = "a8698243bnnmjy"
     VEHICLE_REGISTRATION_METADATA_ID = "2136bjkdc8"
 
+    # Kinesis sequence numbers of the records in fixtures.py, in batch order
+    SEQUENCE_NUMBERS = ["49590338271490256608559692538361571095921575989136588801",
+                        "49590338271490256608559692538361571095921575989136588802",
+                        "49590338271490256608559692538361571095921575989136588803"]
+
     EXCEPTIONS_THAT_SHOULD_BE_BUBBLED = [ConnectionError, ImproperlyConfigured, SSLError]
     EXCEPTIONS_THAT_SHOULD_BE_HANDLED = [SerializationError, ConflictError, RequestError]
\ No newline at end of file
@@ -0,0 +1,107 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.dispatcher import ConcurrentDispatcher
+from unittest.mock import MagicMock
+import threading
+import time
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+
+def test_writes_to_the_same_key_run_in_submission_order():
+    dispatcher = ConcurrentDispatcher(max_in_flight=4)
+    applied = []
+
+    def write(key, version, delay):
+        time.sleep(delay)
+        applied.append((key, version))
+
+    # Earlier versions sleep longer, so they would finish last without ordering
+    for version in range(4):
+        dispatcher.submit(["a"], write, "a", version, 0.02 * (4 - version))
+    dispatcher.wait()
+    dispatcher.shutdown()
+
+    assert applied == [("a", 0), ("a", 1), ("a", 2), ("a", 3)]
+
+
+def test_in_flight_requests_are_bounded():
+    dispatcher = ConcurrentDispatcher(max_in_flight=2)
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def write():
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+
+    for key in range(10):
+        dispatcher.submit([key], write)
+    dispatcher.wait()
+    dispatcher.shutdown()
+
+    assert peak[0] == 2
+
+
+def test_results_are_returned_in_submission_order():
+    dispatcher = ConcurrentDispatcher(max_in_flight=3)
+
+    for key in range(5):
+        dispatcher.submit([key], lambda value: value * 2, key)
+
+    assert dispatcher.wait() == [0, 2, 4, 6, 8]
+    dispatcher.shutdown()
+
+
+def test_errors_are_raised_on_wait():
+    dispatcher = ConcurrentDispatcher(max_in_flight=2)
+
+    def fail():
+        raise ValueError("failed")
+
+    dispatcher.submit(["a"], fail)
+
+    test_case_instance.assertRaises(ValueError, dispatcher.wait)
+    dispatcher.shutdown()
+
+
+def test_in_flight_tasks_are_limited_by_the_controller():
+    dispatcher = ConcurrentDispatcher(max_in_flight=4, controller=MagicMock(in_flight=1))
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def write(key):
+        with lock:
+            running.append(key)
+            overlaps.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(key)
+
+    # Trigger
+    for key in range(4):
+        dispatcher.submit([key], write, key)
+    dispatcher.wait()
+    dispatcher.shutdown()
+
+    # Verify
+    assert max(overlaps) == 1
@@ -13,7 +13,11 @@
 # HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from src.qldb_streaming_to_es_sample.clients.elasticsearch import ElasticsearchClient
+from src.qldb_streaming_to_es_sample.clients.elasticsearch import ElasticsearchClient, CircuitOpenError, \
+    is_successful
+from src.qldb_streaming_to_es_sample.helpers.circuit_breaker import CircuitBreaker
+from src.qldb_streaming_to_es_sample.helpers.metrics import Metrics
+from elasticsearch import ConnectionError, TransportError
 from requests_aws4auth import AWS4Auth
 from .test_constants import TestConstants
 from src.qldb_streaming_to_es_sample.constants import Constants
@@ -27,6 +31,7 @@ awsauth = AWS4Auth("access_key", "secret_key", region, service, "session_token")
 host = "elasticsearch_host"
 
 elasticsearch_client = ElasticsearchClient(host=host, awsauth=awsauth)
+test_case_instance = unittest.TestCase('__init__')
 
 def test_indexing():
 
@@ -35,12 +40,12 @@ def test_indexing():
 
     # Trigger
     response= elasticsearch_client.index(body = TestConstants.PERSON_DATA, version=1,
-                                         index = Constants.PERSON_INDEX, id = TestConstants.PERSON_DATA["GovId"])
+                                         index = TestConstants.PERSON_INDEX, id = TestConstants.PERSON_DATA["GovId"])
 
     # Verify
     elasticsearch_client.es_client.index.assert_called_once_with(body=TestConstants.PERSON_DATA,
                           id=TestConstants.PERSON_DATA["GovId"],
-                          index=Constants.PERSON_INDEX,
+                          index=TestConstants.PERSON_INDEX,
                           version=1,version_type='external')
 
 
@@ -54,7 +59,7 @@ def test_bad_input_exceptions_are_handled_for_indexing(elasticsearch_error):
 
         # Trigger
         response = elasticsearch_client.index(body=TestConstants.PERSON_DATA, version=1,
-                                              index=Constants.PERSON_INDEX, id=TestConstants.PERSON_DATA["GovId"])
+                                              index=TestConstants.PERSON_INDEX, id=TestConstants.PERSON_DATA["GovId"])
 
 
         # Verify
@@ -68,11 +73,11 @@ def test_deletion():
 
     # Trigger
     response= elasticsearch_client.delete(version=1,
-                                         index = Constants.PERSON_INDEX, id = TestConstants.PERSON_DATA["GovId"])
+                                         index = TestConstants.PERSON_INDEX, id = TestConstants.PERSON_DATA["GovId"])
 
     # Verify
     elasticsearch_client.es_client.delete.assert_called_once_with(id=TestConstants.PERSON_DATA["GovId"],
-                          index=Constants.PERSON_INDEX,
+                          index=TestConstants.PERSON_INDEX,
                           version=1,version_type='external')
 
 
@@ -85,9 +90,158 @@ def test_bad_input_exceptions_are_handled_for_deletion(elasticsearch_error):
         elasticsearch_client.es_client.delete = MagicMock(side_effect=[error, None])
 
         # Trigger
-        response = elasticsearch_client.delete(version=1, index=Constants.PERSON_INDEX,
+        response = elasticsearch_client.delete(version=1, index=TestConstants.PERSON_INDEX,
                                                id=TestConstants.PERSON_DATA["GovId"])
 
 
         # Verify
-        assert response == None
\ No newline at end of file
+        assert response == None
+
+def bulk_response(*statuses):
+    items = []
+    for status in statuses:
+        item = {"_index": TestConstants.PERSON_INDEX, "_id": TestConstants.PERSON_METADATA_ID, "status": status}
+        if status >= 300:
+            item["error"] = {"type": "error", "reason": "reason"}
+        items.append({"index": item})
+
+    return {"errors": any(status >= 300 for status in statuses), "items": items}
+
+
+def test_bulk(mocker):
+
+    # Mock
+    elasticsearch_client.es_client.bulk = MagicMock(return_value=bulk_response(201, 200))
+
+    # Trigger
+    results = elasticsearch_client.bulk(actions=["{}\n{}\n", "{}\n{}\n"])
+
+    # Verify
+    elasticsearch_client.es_client.bulk.assert_called_once_with(body="{}\n{}\n{}\n{}\n")
+    assert [result["status"] for result in results] == [201, 200]
+
+
+def test_bulk_retries_only_throttled_and_server_errors(mocker):
+
+    # Mock
+    sleep = mocker.patch('src.qldb_streaming_to_es_sample.clients.elasticsearch.time.sleep')
+    elasticsearch_client.es_client.bulk = MagicMock(side_effect=[bulk_response(201, 429, 409, 400, 503),
+                                                                 bulk_response(201, 201)])
+
+    # Trigger
+    results = elasticsearch_client.bulk(actions=["a\n", "b\n", "c\n", "d\n", "e\n"])
+
+    # Verify
+    assert elasticsearch_client.es_client.bulk.call_args_list[1][1] == {"body": "b\ne\n"}
+    assert [result["status"] for result in results] == [201, 201, 409, 400, 201]
+    sleep.assert_called_once()
+
+
+def test_bulk_stops_retrying_after_max_retries(mocker):
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.clients.elasticsearch.time.sleep')
+    elasticsearch_client.es_client.bulk = MagicMock(return_value=bulk_response(429))
+
+    # Trigger
+    results = elasticsearch_client.bulk(actions=["a\n"])
+
+    # Verify
+    assert elasticsearch_client.es_client.bulk.call_count == Constants.BULK_MAX_RETRIES + 1
+    assert results[0]["status"] == 429
+
+
+def test_bulk_retries_throttled_requests(mocker):
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.clients.elasticsearch.time.sleep')
+    elasticsearch_client.es_client.bulk = MagicMock(side_effect=[TransportError(429, "es_rejected_execution_exception"),
+                                                                 bulk_response(201)])
+
+    # Trigger
+    results = elasticsearch_client.bulk(actions=["a\n"])
+
+    # Verify
+    assert results[0]["status"] == 201
+
+
+def test_bad_input_exceptions_are_handled_for_bulk(elasticsearch_error):
+
+    for error_class in TestConstants.EXCEPTIONS_THAT_SHOULD_BE_HANDLED:
+        error = elasticsearch_error(error_class)
+
+        # Mock
+        elasticsearch_client.es_client.bulk = MagicMock(side_effect=[error, None])
+
+        # Trigger
+        results = elasticsearch_client.bulk(actions=["a\n"])
+
+        # Verify
+        assert results[0]["status"] == 400
+        assert not is_successful(results[0])
+
+
+def test_version_conflicts_and_missing_deletes_are_successful():
+    assert is_successful({"status": 409})
+    assert is_successful({"status": 404, "result": "not_found"})
+    assert not is_successful({"status": 404, "error": {"type": "index_not_found_exception"}})
+    assert not is_successful({"status": 400})
+
+
+def test_bulk_feeds_rejections_to_controller_and_rate_limiter(mocker):
+    controller = MagicMock()
+    rate_limiter = MagicMock()
+    client = ElasticsearchClient(host=host, awsauth=awsauth, controller=controller, rate_limiter=rate_limiter)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.clients.elasticsearch.time.sleep')
+    client.es_client.bulk = MagicMock(side_effect=[bulk_response(201, 429), bulk_response(201)])
+
+    # Trigger
+    client.bulk(actions=["a\n", "b\n"])
+
+    # Verify
+    assert [call[0][1] for call in controller.record.call_args_list] == [True, False]
+    assert [call[0][0] for call in rate_limiter.acquire.call_args_list] == [2, 1]
+
+
+def test_open_circuit_breaker_fails_requests_fast(mocker):
+    client = ElasticsearchClient(host=host, awsauth=awsauth,
+                                 circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+
+    # Mock
+    client.es_client.bulk = MagicMock(side_effect=ConnectionError("N/A", "connection refused", None))
+
+    # Trigger
+    for request in range(2):
+        test_case_instance.assertRaises(ConnectionError, client.bulk, actions=["a\n"])
+
+    # Verify
+    test_case_instance.assertRaises(CircuitOpenError, client.bulk, actions=["a\n"])
+    assert client.es_client.bulk.call_count == 2
+
+
+def test_requests_and_their_outcome_are_counted_in_metrics(mocker):
+    metrics = Metrics(namespace="test")
+    client = ElasticsearchClient(host=host, awsauth=awsauth, metrics=metrics)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.clients.elasticsearch.time.sleep')
+    response = bulk_response(201, 429, 409)
+    response["took"] = 7
+    client.es_client.bulk = MagicMock(side_effect=[response, bulk_response(201)])
+    client.es_client.delete = MagicMock(return_value={"result": "deleted"})
+
+    # Trigger
+    client.bulk(actions=["a\n", "b\n", "c\n"])
+    client.delete(index=TestConstants.PERSON_INDEX, id="id", version=2)
+
+    # Verify
+    document = metrics.to_emf()
+    assert document["Requests"] == 3
+    assert document["BulkItemRetries"] == 1
+    assert document["DocumentsIndexed"] == 2
+    assert document["VersionConflicts"] == 1
+    assert document["DocumentsDeleted"] == 1
+    assert document["BulkTook"] == [7]
+    assert len(document["RequestLatency"]) == 3
@@ -21,9 +21,16 @@ from aws_kinesis_agg.deaggregator import deaggregate_records
 from .fixtures import deaggregated_stream_records
 from .fixtures import deaggregated_stream_records_for_delete_scenario
 from .fixtures import elasticsearch_error
-from src.qldb_streaming_to_es_sample.constants import Constants
-from unittest.mock import call
+from unittest.mock import call, MagicMock
+from elasticsearch import ConnectionError, ImproperlyConfigured, SSLError, TransportError
 from .test_constants import TestConstants
+from src.qldb_streaming_to_es_sample.helpers.spool import Spool
+from src.qldb_streaming_to_es_sample.helpers.metrics import Metrics
+from src.qldb_streaming_to_es_sample.helpers.throttle import AdaptiveController, TokenBucket
+from src.qldb_streaming_to_es_sample.helpers.version_cache import VersionCache
+from src.qldb_streaming_to_es_sample.helpers.table_mappings import TableMappingRegistry
+import json
+import threading
 import unittest
 
 sys.path.append(os.path.abspath('../../'))
@@ -33,16 +40,16 @@ from src.qldb_streaming_to_es_sample import app
 
 PERSON_INSERT_CALL = call(body=TestConstants.PERSON_DATA,
                           id=TestConstants.PERSON_METADATA_ID,
-                          index=Constants.PERSON_INDEX,
+                          index=TestConstants.PERSON_INDEX,
                           version=0)
 
 PERSON_DELETE_CALL = call(id=TestConstants.PERSON_METADATA_ID,
-                          index=Constants.PERSON_INDEX,
+                          index=TestConstants.PERSON_INDEX,
                           version=2)
 
 VEHICLE_REGISTRATION_INSERT_CALL = call(body=TestConstants.VEHICLE_REGISTRATION_DATA,
                                         id=TestConstants.VEHICLE_REGISTRATION_METADATA_ID,
-                                        index=Constants.VEHICLE_REGISTRATION_INDEX,
+                                        index=TestConstants.VEHICLE_REGISTRATION_INDEX,
                                         version=0)
 
 test_case_instance = unittest.TestCase('__init__')
@@ -79,7 +86,7 @@ def test_deletion_records_for_delete_events(mocker, deaggregated_stream_records_
 
     app.elasticsearch_client.index.assert_has_calls(calls)
     app.elasticsearch_client.delete.assert_called_once_with(id=TestConstants.PERSON_METADATA_ID,
-                                                            index=Constants.PERSON_INDEX, version=2)
+                                                            index=TestConstants.PERSON_INDEX, version=2)
     assert response["statusCode"] == 200
 
 def test_no_indexing_person_record_for_updates(mocker, deaggregated_stream_records):
@@ -95,7 +102,7 @@ def test_no_indexing_person_record_for_updates(mocker, deaggregated_stream_recor
     # Verify
     app.elasticsearch_client.index.assert_called_once_with(body=TestConstants.VEHICLE_REGISTRATION_DATA,
                                                            id=TestConstants.VEHICLE_REGISTRATION_METADATA_ID,
-                                                           index=Constants.VEHICLE_REGISTRATION_INDEX,
+                                                           index=TestConstants.VEHICLE_REGISTRATION_INDEX,
                                                            version=1)
 
     assert reponse["statusCode"] == 200
@@ -131,3 +138,457 @@ def test_config_exceptions_are_bubbled_for_deletion(mocker, deaggregated_stream_
         # Verify
         test_case_instance.assertRaises(error_class, app.lambda_handler,{"Records": ["a dummy record"]}, "")
 
+
+
+def test_bulk_indexing_sends_one_request_per_batch(mocker, deaggregated_stream_records_for_delete_scenario):
+    deaggregated_records = deaggregated_stream_records_for_delete_scenario(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.BULK_INDEXING_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.bulk', return_value=[])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index')
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.delete')
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    app.elasticsearch_client.bulk.assert_called_once()
+    app.elasticsearch_client.index.assert_not_called()
+    app.elasticsearch_client.delete.assert_not_called()
+    assert len(app.elasticsearch_client.bulk.call_args[1]["actions"]) == 3
+    assert response["statusCode"] == 200
+
+
+def test_coalescing_drops_superseded_writes(mocker, deaggregated_stream_records_for_delete_scenario):
+    deaggregated_records = deaggregated_stream_records_for_delete_scenario(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.COALESCE_REVISIONS_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.delete', return_value={"status": "success"})
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    app.elasticsearch_client.index.assert_called_once_with(body=TestConstants.VEHICLE_REGISTRATION_DATA,
+                                                           id=TestConstants.VEHICLE_REGISTRATION_METADATA_ID,
+                                                           index=TestConstants.VEHICLE_REGISTRATION_INDEX,
+                                                           version=0)
+    app.elasticsearch_client.delete.assert_called_once_with(id=TestConstants.PERSON_METADATA_ID,
+                                                            index=TestConstants.PERSON_INDEX, version=2)
+    assert response["statusCode"] == 200
+
+
+def test_concurrent_dispatch_writes_all_records(mocker, deaggregated_stream_records_for_delete_scenario):
+    deaggregated_records = deaggregated_stream_records_for_delete_scenario(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.MAX_IN_FLIGHT_REQUESTS', 4)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.delete', return_value={"status": "success"})
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    app.elasticsearch_client.index.assert_has_calls([PERSON_INSERT_CALL, VEHICLE_REGISTRATION_INSERT_CALL],
+                                                    any_order=True)
+    app.elasticsearch_client.delete.assert_called_once_with(id=TestConstants.PERSON_METADATA_ID,
+                                                            index=TestConstants.PERSON_INDEX, version=2)
+    assert response["statusCode"] == 200
+
+
+def test_config_exceptions_are_bubbled_for_concurrent_dispatch(mocker, deaggregated_stream_records,
+                                                               elasticsearch_error):
+    deaggregated_records = deaggregated_stream_records(revision_version=1)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.MAX_IN_FLIGHT_REQUESTS', 4)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+
+    for error_class in TestConstants.EXCEPTIONS_THAT_SHOULD_BE_BUBBLED:
+        error = elasticsearch_error(error_class)
+        mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', side_effect=[error, None])
+
+        # Verify
+        test_case_instance.assertRaises(error_class, app.lambda_handler, {"Records": ["a dummy record"]}, "")
+
+
+def test_transient_failures_are_reported_as_batch_item_failures(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index',
+                 side_effect=[{"status": "success"}, ConnectionError("N/A", "connection refused", None)])
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert response["statusCode"] == 200
+    assert response["batchItemFailures"] == [{"itemIdentifier": TestConstants.SEQUENCE_NUMBERS[2]}]
+
+
+def test_no_batch_item_failures_are_reported_for_successful_batches(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert response["batchItemFailures"] == []
+
+
+def test_records_after_a_failure_are_not_sent(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index',
+                 side_effect=TransportError(503, "unavailable"))
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    app.elasticsearch_client.index.assert_called_once()
+    assert response["batchItemFailures"] == [{"itemIdentifier": TestConstants.SEQUENCE_NUMBERS[1]}]
+
+
+def test_failed_bulk_items_are_reported_as_batch_item_failures(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.BULK_INDEXING_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.bulk',
+                 return_value=[{"status": 201}, {"status": 429}])
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert response["batchItemFailures"] == [{"itemIdentifier": TestConstants.SEQUENCE_NUMBERS[2]}]
+
+
+def test_config_exceptions_are_bubbled_when_reporting_failures(mocker, deaggregated_stream_records,
+                                                               elasticsearch_error):
+    deaggregated_records = deaggregated_stream_records(revision_version=1)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+
+    for error_class in [ImproperlyConfigured, SSLError]:
+        error = elasticsearch_error(error_class)
+        mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', side_effect=[error, None])
+
+        # Verify
+        test_case_instance.assertRaises(error_class, app.lambda_handler, {"Records": ["a dummy record"]}, "")
+
+
+def test_partitioned_lanes_write_through_their_own_clients(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    lane_client = MagicMock()
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.PARTITION_LANES', 2)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.partition_by_document',
+                 side_effect=lambda actions, lanes: [[action] for action in actions])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.lane_clients', [lane_client])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert response["statusCode"] == 200
+    app.elasticsearch_client.index.assert_called_once()
+    lane_client.index.assert_called_once()
+
+
+def test_partitioned_lanes_handle_batches_without_mapped_actions(mocker, deaggregated_stream_records):
+    # Only the block summary record
+    deaggregated_records = deaggregated_stream_records(revision_version=0)[:1]
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.PARTITION_LANES', 4)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index')
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert response["statusCode"] == 200
+    app.elasticsearch_client.index.assert_not_called()
+
+
+def test_lanes_write_records_before_a_failure_of_another_lane(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    lane_client = MagicMock()
+    failed = threading.Event()
+
+    def fail(**kwargs):
+        failed.set()
+        raise ConnectionError("N/A", "connection refused", None)
+
+    def after_failure(actions):
+        failed.wait(5)
+        yield from actions
+
+    def partition(actions, lanes):
+        person, vehicle_registration = actions
+        return [[vehicle_registration], after_failure([person])]
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.REPORT_BATCH_ITEM_FAILURES', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.PARTITION_LANES', 2)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.partition_by_document', side_effect=partition)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.lane_clients', [lane_client])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', side_effect=fail)
+
+    # Trigger
+    response = app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    # The person record precedes the failed vehicle registration record, Lambda does not retry it
+    lane_client.index.assert_called_once()
+    assert lane_client.index.call_args[1]["id"] == TestConstants.PERSON_METADATA_ID
+    assert response["batchItemFailures"] == [{"itemIdentifier": TestConstants.SEQUENCE_NUMBERS[2]}]
+
+
+def test_elasticsearch_client_is_created_once_on_first_use():
+    # Verify
+    assert app.elasticsearch_client is app.get_elasticsearch_client()
+    assert app.awsauth is app.get_awsauth()
+    test_case_instance.assertRaises(AttributeError, getattr, app, "unknown_attribute")
+
+
+def test_spooled_actions_are_drained_before_the_batch(mocker, deaggregated_stream_records, tmp_path):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    spool = Spool(str(tmp_path))
+    spool.append(['{"delete": {"_index": "person_index", "_id": "1"}}\n'])
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.BULK_INDEXING_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.spool', spool)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.bulk',
+                 side_effect=[[{"status": 200}], [{"status": 201}, {"status": 201}]])
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert app.elasticsearch_client.bulk.call_args_list[0][1] == {
+        "actions": ['{"delete": {"_index": "person_index", "_id": "1"}}\n']}
+    assert list(spool.read()) == []
+
+
+def test_spool_files_of_earlier_processes_are_drained(mocker, deaggregated_stream_records, tmp_path):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    Spool(str(tmp_path)).append(['{"delete": {"_index": "person_index", "_id": "1"}}\n'])
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.BULK_INDEXING_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.spool', Spool(str(tmp_path)))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.bulk',
+                 side_effect=[[{"status": 429}], [{"status": 201}, {"status": 201}]])
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert app.elasticsearch_client.bulk.call_args_list[0][1] == {
+        "actions": ['{"delete": {"_index": "person_index", "_id": "1"}}\n']}
+    # The action that failed again is moved to the spool file of this process
+    assert list(app.spool.read()) == ['{"delete": {"_index": "person_index", "_id": "1"}}\n']
+    assert os.listdir(str(tmp_path)) == [os.path.basename(app.spool.path)]
+
+
+def test_metrics_are_written_to_stdout_once_per_invocation(mocker, capsys, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.metrics', Metrics(namespace="test"))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    document = json.loads(lines[0])
+    assert document["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "test"
+    assert document["RecordsIn"] == 3
+    assert document["RecordsFiltered"] == 1
+    assert document["Writes"] == 2
+    assert document["BytesDecoded"] > 0
+    assert document["HandlerTime"] >= document["DecodeTime"]
+
+
+def test_throttling_metrics_are_counted_per_invocation(mocker, capsys, deaggregated_stream_records):
+    controller = AdaptiveController(min_bulk_size=10, max_bulk_size=100, bulk_size_step=10, max_in_flight=4,
+                                    latency_target=1)
+    rate_limiter = TokenBucket(rate=1000)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.metrics', Metrics(namespace="test"))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.controller', controller)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.rate_limiter', rate_limiter)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.reported_counters', {})
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records',
+                 return_value=deaggregated_stream_records(revision_version=0))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    controller.decreases, controller.rejections, rate_limiter.waited = 3, 1, 0.5
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+    controller.decreases, controller.bulk_size = 5, 50
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    first, second = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert (first["ThrottleDecreases"], first["ThrottleRejections"], first["RateLimitWaitTime"]) == (3, 1, 500)
+    assert (second["ThrottleDecreases"], second["ThrottleRejections"], second["RateLimitWaitTime"]) == (2, 0, 0)
+    assert first["BulkSize"] == [100]
+    assert second["BulkSize"] == [50]
+    assert second["InFlight"] == [4]
+    assert second["ConnectionsNew"] == 0
+
+
+def test_streaming_deaggregation_writes_the_same_documents(mocker, capsys, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.STREAMING_DEAGGREGATION_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.metrics', Metrics(namespace="test"))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    response = app.lambda_handler({"Records": deaggregated_records}, "")
+
+    # Verify
+    app.elasticsearch_client.index.assert_has_calls([PERSON_INSERT_CALL, VEHICLE_REGISTRATION_INSERT_CALL])
+    assert response["statusCode"] == 200
+    assert json.loads(capsys.readouterr().out)["RecordsIn"] == 3
+
+
+def test_redelivered_revisions_are_not_sent_again(mocker, deaggregated_stream_records, tmp_path):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    snapshot_path = str(tmp_path / "version-cache.json")
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.version_cache', VersionCache(max_size=10))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.VERSION_CACHE_SNAPSHOT_PATH', snapshot_path)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records', return_value=deaggregated_records)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+    save = mocker.spy(app.version_cache, 'save')
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert app.elasticsearch_client.index.call_count == 2
+    assert app.version_cache.hits == 2
+    assert save.call_count == 1
+
+    restored = VersionCache(max_size=10)
+    restored.load(snapshot_path)
+    assert len(restored) == 2
+
+
+def test_revisions_with_an_unchanged_projection_are_skipped(mocker, deaggregated_stream_records):
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.version_cache', VersionCache(max_size=10))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.CONTENT_HASH_SKIP_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records',
+                 side_effect=[deaggregated_stream_records(revision_version=0),
+                              deaggregated_stream_records(revision_version=1)])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    assert app.elasticsearch_client.index.call_count == 2
+    assert app.version_cache.unchanged == 1
+    assert app.version_cache.is_applied((TestConstants.VEHICLE_REGISTRATION_INDEX,
+                                         TestConstants.VEHICLE_REGISTRATION_METADATA_ID), 1)
+
+
+def test_documents_missing_from_the_cache_are_prefetched(mocker, deaggregated_stream_records):
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.version_cache', VersionCache(max_size=10))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.CONTENT_HASH_SKIP_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.CONTENT_HASH_MGET_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records',
+                 return_value=deaggregated_stream_records(revision_version=1))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.mget',
+                 return_value=[{"found": True, "_version": 0,
+                                "_source": {"VIN": "L12345", "LicensePlateNumber": "1234567", "State": "WA",
+                                            "PendingPenaltyTicketAmount": 127.5}}])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.index', return_value={"status": "success"})
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    app.elasticsearch_client.mget.assert_called_once_with(
+        [(TestConstants.VEHICLE_REGISTRATION_INDEX, TestConstants.VEHICLE_REGISTRATION_METADATA_ID)])
+    app.elasticsearch_client.index.assert_not_called()
+
+
+def test_revisions_of_partial_update_mappings_send_the_changed_fields(mocker, deaggregated_stream_records):
+    table_mappings = TableMappingRegistry.from_config({"tables": [{
+        "table": TestConstants.VEHICLE_REGISTRATION_TABLENAME, "index": TestConstants.VEHICLE_REGISTRATION_INDEX,
+        "fields": TestConstants.VEHICLE_REGISTRATION_TABLE_FIELDS, "partial_updates": True}]})
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.app.BULK_INDEXING_ENABLED', True)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.TABLE_MAPPINGS', table_mappings)
+    mocker.patch('src.qldb_streaming_to_es_sample.app.version_cache', VersionCache(max_size=10))
+    mocker.patch('src.qldb_streaming_to_es_sample.app.deaggregate_records',
+                 side_effect=[deaggregated_stream_records(revision_version=0),
+                              deaggregated_stream_records(revision_version=1)])
+    mocker.patch('src.qldb_streaming_to_es_sample.app.elasticsearch_client.bulk',
+                 side_effect=[[{"status": 201, "_version": 0, "_seq_no": 4, "_primary_term": 1}],
+                              [{"status": 200, "_version": 1, "_seq_no": 5, "_primary_term": 1}]])
+
+    # Trigger
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+    app.lambda_handler({"Records": ["a dummy record"]}, "")
+
+    # Verify
+    actions = "".join(app.elasticsearch_client.bulk.call_args_list[1][1]["actions"])
+    # The projections of the fixture revisions are the same
+    assert [json.loads(line) for line in actions.splitlines()] == [
+        {"update": {"_index": TestConstants.VEHICLE_REGISTRATION_INDEX,
+                    "_id": TestConstants.VEHICLE_REGISTRATION_METADATA_ID, "if_seq_no": 4, "if_primary_term": 1}},
+        {"doc": {}}]
+    assert app.version_cache.previous_state((TestConstants.VEHICLE_REGISTRATION_INDEX,
+                                             TestConstants.VEHICLE_REGISTRATION_METADATA_ID), 2)[0] == 5
@@ -0,0 +1,140 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from setup.index_provisioning import load_index_spec, provision_index, flatten_settings
+from elasticsearch import RequestError
+from unittest.mock import MagicMock
+import copy
+
+INDEX_SPEC = {
+    "index": "person_index",
+    "settings": {
+        "number_of_shards": 1,
+        "refresh_interval": "5s",
+        "analysis": {"analyzer": {"names": {"type": "custom", "tokenizer": "standard", "filter": ["lowercase"]}}}
+    },
+    "mappings": {"properties": {"FirstName": {"type": "text"}, "GovId": {"type": "keyword"}}}
+}
+
+
+def __existing_index(settings=None, properties=None):
+    es = MagicMock()
+    es.indices.create.side_effect = RequestError(400, "resource_already_exists_exception", {})
+    es.indices.get_settings.return_value = {"person_index": {"settings": settings or {
+        "index.number_of_shards": "1",
+        "index.refresh_interval": "5s",
+        "index.analysis.analyzer.names.type": "custom",
+        "index.analysis.analyzer.names.tokenizer": "standard",
+        "index.analysis.analyzer.names.filter": ["lowercase"],
+        "index.uuid": "s0mEuU1d"
+    }}}
+    es.indices.get_mapping.return_value = {"person_index": {"mappings": {"properties": properties or {
+        "FirstName": {"type": "text"}, "GovId": {"type": "keyword"}
+    }}}}
+    return es
+
+
+def test_nested_settings_are_flattened():
+    assert flatten_settings(INDEX_SPEC["settings"]) == {
+        "index.number_of_shards": "1",
+        "index.refresh_interval": "5s",
+        "index.analysis.analyzer.names.type": "custom",
+        "index.analysis.analyzer.names.tokenizer": "standard",
+        "index.analysis.analyzer.names.filter": ["lowercase"]
+    }
+    assert flatten_settings({"index.routing": {"allocation": {"enable": "all"}}, "blocks": {"read_only": False}}) == {
+        "index.routing.allocation.enable": "all", "index.blocks.read_only": "false"
+    }
+
+
+def test_missing_index_is_created():
+    es = MagicMock()
+
+    # Trigger
+    provision_index(es, INDEX_SPEC)
+
+    # Verify
+    es.indices.create.assert_called_once_with(index="person_index", body={
+        "settings": {"index": INDEX_SPEC["settings"]}, "mappings": INDEX_SPEC["mappings"]})
+    es.indices.get_settings.assert_not_called()
+
+
+def test_rerun_on_unchanged_index_is_a_no_op():
+    es = __existing_index()
+
+    # Trigger
+    provision_index(es, INDEX_SPEC)
+
+    # Verify
+    es.indices.get_settings.assert_called_once_with(index="person_index", flat_settings=True)
+    es.indices.put_settings.assert_not_called()
+    es.indices.put_mapping.assert_not_called()
+
+
+def test_changed_dynamic_setting_is_updated():
+    spec = copy.deepcopy(INDEX_SPEC)
+    spec["settings"]["refresh_interval"] = "30s"
+    es = __existing_index()
+
+    # Trigger
+    provision_index(es, spec)
+
+    # Verify
+    es.indices.put_settings.assert_called_once_with(index="person_index", body={"index.refresh_interval": "30s"})
+
+
+def test_changed_static_settings_are_only_logged(mocker):
+    spec = copy.deepcopy(INDEX_SPEC)
+    spec["settings"]["number_of_shards"] = 3
+    spec["settings"]["analysis"]["analyzer"]["names"]["filter"] = ["lowercase", "asciifolding"]
+    es = __existing_index()
+
+    # Mock
+    warning = mocker.patch('setup.index_provisioning.logger.warning')
+
+    # Trigger
+    provision_index(es, spec)
+
+    # Verify
+    es.indices.put_settings.assert_not_called()
+    assert warning.call_count == 2
+
+
+def test_new_field_is_mapped():
+    spec = copy.deepcopy(INDEX_SPEC)
+    spec["mappings"]["properties"]["DOB"] = {"type": "date"}
+    es = __existing_index()
+
+    # Trigger
+    provision_index(es, spec)
+
+    # Verify
+    es.indices.put_mapping.assert_called_once_with(index="person_index", body={"properties": {"DOB": {"type": "date"}}})
+
+
+def test_shipped_spec_is_unchanged_on_rerun():
+    for index_spec in load_index_spec()["indices"]:
+        index = index_spec["index"]
+        es = MagicMock()
+        es.indices.create.side_effect = RequestError(400, "resource_already_exists_exception", {})
+        es.indices.get_settings.return_value = {index: {"settings": flatten_settings(index_spec["settings"])}}
+        es.indices.get_mapping.return_value = {index: {"mappings": index_spec["mappings"]}}
+
+        # Trigger
+        provision_index(es, index_spec)
+
+        # Verify
+        es.indices.put_settings.assert_not_called()
+        es.indices.put_mapping.assert_not_called()
@@ -0,0 +1,127 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion import simpleion
+from src.qldb_streaming_to_es_sample import export_loader
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from src.qldb_streaming_to_es_sample.helpers.journal_export import export_files, iter_ion_values, read_export_file
+from unittest.mock import MagicMock
+import io
+
+BLOCKS = """
+{
+  blockAddress: {strandId: "strand", sequenceNo: 10},
+  transactionInfo: {
+    statements: [{statement: "INSERT INTO Person ?"}],
+    documents: {
+      personId: {tableName: "Person", tableId: "personTable", statements: [0]},
+      tableInfoId: {tableName: "information_schema", tableId: "systemTable", statements: [0]}
+    }
+  },
+  revisions: [
+    {hash: {{ aGFzaA== }}},
+    {
+      data: {FirstName: "Jane", LastName: "Doe", GovId: "P626-168-229-765", DOB: 1971-01-01T},
+      metadata: {id: "personId", version: 0, txTime: 2020-01-01T, txId: "tx1"}
+    },
+    {data: {name: "table"}, metadata: {id: "tableInfoId", version: 0, txTime: 2020-01-01T, txId: "tx1"}}
+  ]
+}
+{
+  blockAddress: {strandId: "strand", sequenceNo: 11},
+  transactionInfo: {documents: {personId: {tableName: "Person", tableId: "personTable"}}},
+  revisions: [
+    {metadata: {id: "personId", version: 1, txTime: 2020-01-02T, txId: "tx2"}}
+  ]
+}
+"""
+
+
+def __write_export(tmp_path, binary=False):
+    tmp_path.joinpath("strand.1-10.ion").write_text(BLOCKS)
+    second_file = tmp_path.joinpath("strand.11-20.ion")
+
+    if binary:
+        second_file.write_bytes(simpleion.dumps(simpleion.loads(BLOCKS, single_value=False), binary=True,
+                                                sequence_as_stream=True))
+    else:
+        second_file.write_text(BLOCKS)
+
+    tmp_path.joinpath("strand.completed.manifest").write_text(
+        '{keys: ["PREFIX/strand.1-10.ion", "PREFIX/strand.11-20.ion"]}')
+    return str(tmp_path)
+
+
+def test_ion_values_are_read_one_at_a_time():
+    # Trigger
+    blocks = iter_ion_values(io.BytesIO(BLOCKS.encode("utf-8")))
+
+    # Verify
+    assert next(blocks)["blockAddress"]["sequenceNo"] == 10
+    assert next(blocks)["blockAddress"]["sequenceNo"] == 11
+    assert next(blocks, None) is None
+
+
+def test_revisions_of_mapped_tables_are_read_from_text_and_binary_files(tmp_path):
+    directory = __write_export(tmp_path, binary=True)
+
+    for path in export_files(directory):
+        # Trigger
+        revisions = list(read_export_file(path, table_names=["Person"]))
+
+        # Verify
+        assert [revision["revision_metadata"]["version"] for revision in revisions] == [0, 1]
+        assert revisions[0]["table_info"]["tableName"] == "Person"
+        assert revisions[0]["revision_data"]["GovId"] == "P626-168-229-765"
+        assert revisions[1]["revision_data"] is None
+
+
+def test_files_are_listed_in_manifest_order_or_by_name(tmp_path):
+    directory = __write_export(tmp_path)
+
+    # Trigger
+    paths = export_files(directory)
+
+    # Verify
+    assert [path.rsplit("/", 1)[1] for path in paths] == ["strand.1-10.ion", "strand.11-20.ion"]
+
+    # Trigger
+    tmp_path.joinpath("strand.completed.manifest").unlink()
+
+    # Verify
+    assert export_files(directory) == paths
+
+
+def test_export_is_loaded_with_bulk_requests(mocker, tmp_path):
+    directory = __write_export(tmp_path)
+    client = MagicMock()
+    client.es_client.transport.serializer = IonJSONSerializer()
+    client.bulk.return_value = [{"status": 201}, {"status": 200}]
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.helpers.loader.ElasticsearchClient', return_value=client)
+
+    # Trigger
+    totals = export_loader.load(directory, endpoint="http://localhost:9200")
+
+    # Verify
+    assert client.bulk.call_count == 2
+    # An index and a delete action per file
+    assert len(client.bulk.call_args[1]["actions"]) == 2
+    assert totals["files"] == 2
+    assert totals["revisions"] == 4
+    assert totals["actions"] == 4
+    assert totals["sent"] == 4
+    assert totals["failed"] == 0
@@ -0,0 +1,56 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.logger import Sampler, IonText, get_logger
+from src.qldb_streaming_to_es_sample.helpers.filtered_records_generator import filtered_records_generator
+from .fixtures import deaggregated_stream_records
+import amazon.ion.simpleion as ion
+import logging
+
+
+def test_sampler_lets_one_in_rate_through():
+    sampler = Sampler(3)
+
+    assert [sampler.sample() for _ in range(7)] == [True, False, False, True, False, False, True]
+
+
+def test_sampler_with_zero_rate_samples_nothing():
+    sampler = Sampler(0)
+
+    assert not any(sampler.sample() for _ in range(3))
+
+
+def test_ion_text_is_rendered_only_when_formatted(mocker):
+    dumps = mocker.patch('src.qldb_streaming_to_es_sample.helpers.logger.ion.dumps', return_value="{a:1}")
+    text = IonText(ion.loads("{a:1}"))
+
+    dumps.assert_not_called()
+    assert str(text) == "{a:1}"
+    dumps.assert_called_once()
+
+
+def test_records_are_not_rendered_above_debug_level(mocker, deaggregated_stream_records):
+    deaggregated_records = deaggregated_stream_records(revision_version=0)
+    dumps = mocker.patch('src.qldb_streaming_to_es_sample.helpers.logger.ion.dumps')
+    logger = get_logger("filtered_records_generator")
+    logger.setLevel(logging.INFO)
+
+    try:
+        records = list(filtered_records_generator(deaggregated_records))
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+    assert len(records) == 2
+    dumps.assert_not_called()
@@ -0,0 +1,75 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.metrics import Metrics, MAX_VALUES, BYTES, MILLISECONDS
+import io
+import json
+
+
+def test_metrics_are_written_as_one_emf_document():
+    metrics = Metrics(namespace="namespace", dimensions={"FunctionName": "function"})
+    output = io.StringIO()
+
+    # Trigger
+    metrics.increment("RecordsIn", 3)
+    metrics.increment("RecordsIn")
+    metrics.increment("BytesDecoded", 100, BYTES)
+    metrics.add_time("DecodeTime", 0.25)
+    metrics.add_value("RequestLatency", 12)
+    metrics.add_value("RequestLatency", 15)
+    metrics.flush(output)
+
+    # Verify
+    document = json.loads(output.getvalue())
+    directive = document["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "namespace"
+    assert directive["Dimensions"] == [["FunctionName"]]
+    assert {"Name": "BytesDecoded", "Unit": BYTES} in directive["Metrics"]
+    assert {"Name": "DecodeTime", "Unit": MILLISECONDS} in directive["Metrics"]
+    assert document["FunctionName"] == "function"
+    assert document["RecordsIn"] == 4
+    assert document["DecodeTime"] == 250
+    assert document["RequestLatency"] == [12, 15]
+    assert output.getvalue().count("\n") == 1
+
+
+def test_flush_starts_over():
+    metrics = Metrics(namespace="namespace")
+    metrics.increment("RecordsIn")
+
+    # Trigger
+    metrics.flush(io.StringIO())
+
+    # Verify
+    assert metrics.to_emf()["_aws"]["CloudWatchMetrics"][0]["Metrics"] == []
+    assert "RecordsIn" not in metrics.to_emf()
+
+
+def test_values_are_capped_and_snapshots_are_merged():
+    metrics = Metrics(namespace="namespace")
+    child = Metrics(namespace=None)
+
+    # Trigger
+    for value in range(MAX_VALUES + 10):
+        metrics.add_value("RequestLatency", value)
+    with child.timer("DecodeTime"):
+        child.increment("RecordsFiltered", 2)
+    metrics.merge(child.snapshot())
+
+    # Verify
+    document = metrics.to_emf()
+    assert len(document["RequestLatency"]) == MAX_VALUES
+    assert document["RecordsFiltered"] == 2
+    assert document["DecodeTime"] >= 0
@@ -0,0 +1,83 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.parallel_decoder import decode_records
+from src.qldb_streaming_to_es_sample.helpers.filtered_records_generator import filtered_records_generator
+from src.qldb_streaming_to_es_sample.helpers.ion_types import to_python
+from src.qldb_streaming_to_es_sample.helpers.metrics import Metrics
+from .fixtures import deaggregated_stream_records, deaggregated_stream_records_for_delete_scenario
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from .test_constants import TestConstants
+import amazon.ion.simpleion as ion
+import json
+import pickle
+
+
+def as_python(records):
+    return [{key: to_python(value) for key, value in record.items()} for record in records]
+
+
+def test_processes_return_records_in_batch_order(deaggregated_stream_records,
+                                                 deaggregated_stream_records_for_delete_scenario):
+    records = deaggregated_stream_records(revision_version=0) + \
+        deaggregated_stream_records_for_delete_scenario(revision_version=1)
+
+    serial = as_python(filtered_records_generator(records))
+    parallel = list(decode_records(records, processes=3))
+
+    assert parallel == serial
+    assert len(parallel) == 5
+
+
+def test_processes_filter_tables(deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+
+    parallel = list(decode_records(records, table_names=[TestConstants.VEHICLE_REGISTRATION_TABLENAME], processes=2))
+
+    assert len(parallel) == 1
+    assert parallel[0]["revision_data"] == TestConstants.VEHICLE_REGISTRATION_DATA
+
+
+def test_small_batches_are_decoded_serially(mocker, deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+    process = mocker.patch('src.qldb_streaming_to_es_sample.helpers.parallel_decoder.multiprocessing.Process')
+
+    decoded = list(decode_records(records, processes=2, min_batch_size=10))
+
+    process.assert_not_called()
+    assert len(decoded) == 2
+
+
+def test_metrics_of_child_processes_are_merged(deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+    metrics = Metrics(namespace="test")
+
+    decoded = list(decode_records(records, table_names=[TestConstants.VEHICLE_REGISTRATION_TABLENAME], processes=2,
+                                  metrics=metrics))
+
+    assert len(decoded) == 1
+    assert metrics.to_emf()["RecordsFiltered"] == 2
+    assert metrics.to_emf()["BytesDecoded"] > 0
+
+
+def test_timestamps_serialize_the_same_after_decoding_in_another_process():
+    document = ion.loads("{DOB: 1963-08-19T, Since: 2007T, ValidFromDate: 2017-09-14T10:15:30.250-07:00}")
+    serializer = IonJSONSerializer(timestamp_format="precision")
+
+    decoded = pickle.loads(pickle.dumps(to_python(document)))
+
+    assert serializer.dumps(decoded) == serializer.dumps(document)
+    assert json.loads(serializer.dumps(decoded))["DOB"] == "1963-08-19"
+    assert json.loads(serializer.dumps(decoded))["Since"] == "2007"
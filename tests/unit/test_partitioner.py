@@ -0,0 +1,49 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.partitioner import lane_for, partition_by_document
+
+
+def __action(id, version):
+    return {"action": "index", "index": "person_index", "id": id, "version": version}
+
+
+def test_lane_is_stable_and_in_range():
+    for id in ["8F0TPCmdNQ6JTRpiLj2TmW", "1ADLuqnH6Yn0dT7L8tOKfx", "KVWkSaeBwSq9mbcXXOj1dS"]:
+        assert 0 <= lane_for(id, 4) < 4
+        assert lane_for(id, 4) == lane_for(id, 4)
+
+
+def test_documents_stay_in_one_lane_in_order():
+    ids = ["doc%d" % i for i in range(20)]
+    actions = [__action(id, version) for version in range(3) for id in ids]
+
+    # Trigger
+    lanes = partition_by_document(actions, 4)
+
+    # Verify
+    assert len(lanes) == 4
+    assert sum(len(lane) for lane in lanes) == len(actions)
+    for lane in lanes:
+        for id in set(action["id"] for action in lane):
+            assert [action["version"] for action in lane if action["id"] == id] == [0, 1, 2]
+    for id in ids:
+        assert len([lane for lane in lanes if any(action["id"] == id for action in lane)]) == 1
+
+
+def test_single_lane_keeps_all_actions():
+    actions = [__action("a", 0), __action("b", 0)]
+
+    assert partition_by_document(actions, 1) == [actions]
@@ -0,0 +1,45 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from amazon.ion.exceptions import IonException
+from src.qldb_streaming_to_es_sample.helpers.payload_decoder import decode_base64, decode_payload
+from .fixtures import person_revision_details_ion_record
+import amazon.ion.simpleion as ion
+import base64
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+
+def test_binary_and_text_payloads_are_decoded_like_ion_loads():
+    text = person_revision_details_ion_record(revision_version=1)
+
+    for payload in (ion.dumps(ion.loads(text)), text.encode("utf-8")):
+        data = base64.b64encode(payload)
+
+        # Trigger
+        decoded = decode_payload(data.decode("ascii"))
+
+        # Verify
+        assert decoded == ion.loads(payload)
+        assert decode_payload(data) == decoded
+        assert decode_base64(data) == payload
+
+
+def test_payloads_with_several_values_are_rejected():
+    payload = ion.dumps([1, 2], sequence_as_stream=True)
+
+    # Verify
+    test_case_instance.assertRaises(IonException, decode_payload, base64.b64encode(payload))
@@ -0,0 +1,57 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from aws_kinesis_agg.aggregator import RecordAggregator
+from src.qldb_streaming_to_es_sample.helpers.record_stream import RecordStream
+from src.qldb_streaming_to_es_sample.helpers.filtered_records_generator import filtered_records_generator
+from .fixtures import deaggregated_stream_records
+import base64
+
+
+def __aggregate(records, sequence_number):
+    aggregator = RecordAggregator()
+    for record in records:
+        aggregator.add_user_record("key", base64.b64decode(record["kinesis"]["data"]))
+
+    return {"kinesis": {"kinesisSchemaVersion": "1.0", "sequenceNumber": sequence_number,
+                        "approximateArrivalTimestamp": 0, "partitionKey": "key",
+                        "data": base64.b64encode(aggregator.clear_and_get().get_contents()[2]).decode("ascii")}}
+
+
+def test_records_are_deaggregated_one_at_a_time(deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+    stream = RecordStream([__aggregate(records, "1"), __aggregate(records, "2")])
+
+    # Trigger
+    first = next(stream)
+
+    # Verify
+    assert stream.count == 1
+    assert first["kinesis"]["subSequenceNumber"] == 0
+    assert len(list(filtered_records_generator(stream))) == 4
+    assert stream.count == 6
+
+
+def test_records_from_a_sequence_number_are_counted_with_the_unread_ones(deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+    stream = RecordStream([__aggregate(records, "1"), __aggregate(records, "2")])
+    next(stream)
+
+    # Trigger
+    count = stream.count_from("2")
+
+    # Verify
+    assert count == 3
+    assert stream.count == 6
@@ -0,0 +1,112 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample import replay
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from .fixtures import deaggregated_stream_records
+from unittest.mock import MagicMock
+import io
+import json
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+
+def __write_events(tmp_path, records, name="events.jsonl", events=2):
+    path = tmp_path / name
+    lines = [json.dumps({"Records": records}) for event in range(events)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_replay_counts_records_and_stages(tmp_path, deaggregated_stream_records):
+    path = __write_events(tmp_path, deaggregated_stream_records(revision_version=0))
+
+    # Trigger
+    totals = replay.replay([path])
+
+    # Verify
+    assert totals["events"] == 2
+    assert totals["records"] == 6
+    assert totals["revisions"] == 4
+    assert totals["actions"] == 4
+    assert totals["bytes"] > 0
+    assert all(totals[stage] >= 0 for stage in replay.STAGES)
+
+
+def test_memory_mapped_files_and_json_files_are_read(tmp_path, deaggregated_stream_records):
+    records = deaggregated_stream_records(revision_version=0)
+    jsonl_path = __write_events(tmp_path, records)
+    json_path = tmp_path / "events.json"
+    json_path.write_text(json.dumps([{"Records": records}]))
+
+    # Trigger
+    events = list(replay.read_events([jsonl_path, str(json_path)], mmap_threshold=0))
+
+    # Verify
+    assert len(events) == 3
+    assert json.loads(events[0]) == {"Records": records}
+    assert events[2] == {"Records": records}
+
+
+def test_replay_writes_bulk_requests(mocker, tmp_path, deaggregated_stream_records):
+    path = __write_events(tmp_path, deaggregated_stream_records(revision_version=0), events=1)
+    client = MagicMock()
+    client.es_client.transport.serializer = IonJSONSerializer()
+    client.bulk.return_value = [{"status": 201}, {"status": 201}]
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.helpers.loader.ElasticsearchClient', return_value=client)
+
+    # Trigger
+    totals = replay.replay([path], endpoint="http://localhost:9200")
+
+    # Verify
+    client.bulk.assert_called_once()
+    assert len(client.bulk.call_args[1]["actions"]) == 2
+    assert totals["actions"] == 2
+    assert totals["sent"] == 2
+    assert totals["failed"] == 0
+
+
+def test_replay_exits_with_an_error_when_writes_are_rejected(mocker, capsys, tmp_path, deaggregated_stream_records):
+    path = __write_events(tmp_path, deaggregated_stream_records(revision_version=0), events=1)
+    client = MagicMock()
+    client.es_client.transport.serializer = IonJSONSerializer()
+    client.bulk.return_value = [{"status": 201}, {"status": 400}]
+
+    # Mock
+    mocker.patch('src.qldb_streaming_to_es_sample.helpers.loader.ElasticsearchClient', return_value=client)
+
+    # Trigger
+    with test_case_instance.assertRaises(SystemExit) as context:
+        replay.main([path, "--processes", "1", "--json"])
+
+    # Verify
+    assert context.exception.code == 1
+    assert json.loads(capsys.readouterr().out)["failed"] == 1
+
+
+def test_replay_fans_out_to_worker_processes(tmp_path, deaggregated_stream_records):
+    path = __write_events(tmp_path, deaggregated_stream_records(revision_version=0), events=4)
+    output = io.StringIO()
+
+    # Trigger
+    totals = replay.replay([path], processes=2)
+    replay.report(totals, output)
+
+    # Verify
+    assert totals["events"] == 4
+    assert "records/s" in output.getvalue()
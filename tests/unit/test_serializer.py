@@ -0,0 +1,81 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from .test_constants import TestConstants
+from elasticsearch import SerializationError
+import amazon.ion.simpleion as ion
+import json
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+VEHICLE_REGISTRATION_ION = """{
+  VIN: "L12345",
+  State: "WA",
+  PendingPenaltyTicketAmount: 127.50,
+  ValidFromDate: 2017-09-14T,
+  Owners: {
+    PrimaryOwner: { PersonId: "294jJ3YUoH1IEEm8GSabOs" },
+    SecondaryOwners: [ { PersonId: "IN7zQyFDcAXDtuKEdpvHFJ" } ]
+  },
+  Insured: true,
+  Notes: null.string
+}"""
+
+
+def test_ion_values_are_serialized():
+    document = ion.loads(VEHICLE_REGISTRATION_ION)
+
+    serialized = json.loads(IonJSONSerializer().dumps(document))
+
+    assert serialized == {
+        "VIN": "L12345",
+        "State": "WA",
+        "PendingPenaltyTicketAmount": 127.5,
+        "ValidFromDate": "2017-09-14T00:00:00",
+        "Owners": {"PrimaryOwner": {"PersonId": "294jJ3YUoH1IEEm8GSabOs"},
+                   "SecondaryOwners": [{"PersonId": "IN7zQyFDcAXDtuKEdpvHFJ"}]},
+        "Insured": True,
+        "Notes": None}
+
+
+def test_decimals_as_strings_and_timestamps_with_precision():
+    document = ion.loads(VEHICLE_REGISTRATION_ION)
+
+    serialized = json.loads(IonJSONSerializer(decimal_policy="string", timestamp_format="precision").dumps(document))
+
+    assert serialized["PendingPenaltyTicketAmount"] == "127.50"
+    assert serialized["ValidFromDate"] == "2017-09-14"
+
+
+def test_python_values_are_serialized():
+    serialized = IonJSONSerializer().dumps(TestConstants.VEHICLE_REGISTRATION_DATA)
+
+    assert serialized == '{"VIN":"L12345","LicensePlateNumber":"1234567","State":"WA",' \
+                         '"PendingPenaltyTicketAmount":127.5}'
+
+
+def test_strings_are_not_serialized():
+    assert IonJSONSerializer().dumps('{"a":1}') == '{"a":1}'
+
+
+def test_unsupported_values_raise_serialization_error():
+    test_case_instance.assertRaises(SerializationError, IonJSONSerializer().dumps, {"a": object()})
+
+
+def test_unknown_policies_are_rejected():
+    test_case_instance.assertRaises(ValueError, IonJSONSerializer, decimal_policy="double")
+    test_case_instance.assertRaises(ValueError, IonJSONSerializer, timestamp_format="epoch")
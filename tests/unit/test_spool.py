@@ -0,0 +1,111 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.spool import Spool, FRAME_HEADER
+import fcntl
+import os
+
+ENTRIES = ['{"delete": {"_index": "person_index", "_id": "1"}}\n',
+           '{"index": {"_index": "person_index", "_id": "2"}}\n{"FirstName": "Nova"}\n',
+           '{"delete": {"_index": "person_index", "_id": "3"}}\n']
+
+
+def test_spooled_entries_are_read_in_order(tmp_path):
+    spool = Spool(str(tmp_path))
+
+    # Trigger
+    spool.append(ENTRIES[:2])
+    spool.append(ENTRIES[2:])
+
+    # Verify
+    assert list(spool.read()) == ENTRIES
+
+
+def test_torn_frames_are_skipped(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(ENTRIES)
+
+    # Mock
+    with open(spool.path, "r+b") as spool_file:
+        spool_file.truncate(len(spool_file.read()) - 5)
+
+    # Verify
+    assert list(spool.read()) == ENTRIES[:2]
+
+
+def test_corrupt_frames_are_skipped(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(ENTRIES)
+
+    # Mock
+    with open(spool.path, "r+b") as spool_file:
+        spool_file.seek(FRAME_HEADER.size + 2)
+        spool_file.write(b"X")
+
+    # Verify
+    assert list(spool.read()) == []
+
+
+def test_batches_fit_into_bulk_requests(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(ENTRIES)
+
+    # Verify
+    assert list(spool.batches(max_actions=2, max_bytes=1000)) == [ENTRIES[:2], ENTRIES[2:]]
+    assert [len(batch) for batch in spool.batches(max_actions=10, max_bytes=60)] == [1, 1, 1]
+
+
+def test_files_of_earlier_processes_are_claimed(tmp_path):
+    earlier = Spool(str(tmp_path))
+    earlier.append(ENTRIES[:2])
+    spool = Spool(str(tmp_path))
+
+    # Trigger
+    claimed = [list(spool.read(path)) for path in spool.claim()]
+
+    # Verify
+    assert claimed == [ENTRIES[:2]]
+    assert os.listdir(str(tmp_path)) == []
+
+    # Trigger
+    earlier.append(ENTRIES[2:])
+
+    # Verify
+    assert list(spool.batches(max_actions=10, max_bytes=1000, path=earlier.path)) == [ENTRIES[2:]]
+
+
+def test_locked_files_are_not_claimed(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(ENTRIES)
+
+    # Mock
+    with open(spool.path, "rb") as spool_file:
+        fcntl.flock(spool_file, fcntl.LOCK_EX)
+
+        # Verify
+        assert list(Spool(str(tmp_path)).claim()) == []
+
+
+def test_files_of_interrupted_drains_are_claimed_again(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(ENTRIES)
+
+    # Trigger
+    claimed = spool.claim()
+    next(claimed)
+    claimed.close()
+
+    # Verify
+    assert [list(spool.read(path)) for path in Spool(str(tmp_path)).claim()] == [ENTRIES]
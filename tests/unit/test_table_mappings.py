@@ -0,0 +1,93 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.table_mappings import TableMapping, TableMappingRegistry
+from src.qldb_streaming_to_es_sample.helpers.table_mappings import load_table_mappings
+from .test_constants import TestConstants
+import json
+import unittest
+
+test_case_instance = unittest.TestCase('__init__')
+
+REVISION_DATA = dict(TestConstants.VEHICLE_REGISTRATION_DATA, Owners={"PrimaryOwner": {"PersonId": "id"}})
+
+
+def test_default_mappings_project_the_sample_documents():
+    registry = load_table_mappings()
+
+    person = registry.get(TestConstants.PERSON_TABLENAME)
+    vehicle_registration = registry.get(TestConstants.VEHICLE_REGISTRATION_TABLENAME)
+
+    assert registry.table_names == [TestConstants.PERSON_TABLENAME, TestConstants.VEHICLE_REGISTRATION_TABLENAME]
+    assert person.index == "person_index"
+    assert person.project(dict(TestConstants.PERSON_DATA, DOB="1963-08-19")) == TestConstants.PERSON_DATA
+    assert vehicle_registration.index == "vehicle_registration_index"
+    assert vehicle_registration.project(REVISION_DATA) == TestConstants.VEHICLE_REGISTRATION_DATA
+
+
+def test_mappings_are_loaded_from_file(tmpdir):
+    mappings_file = tmpdir.join("mappings.json")
+    mappings_file.write(json.dumps({"tables": [{"table": "DriversLicense", "index": "drivers_license_index",
+                                                "fields": ["LicenseNumber"]}]}))
+
+    registry = load_table_mappings(str(mappings_file))
+
+    assert registry.table_names == ["DriversLicense"]
+    assert registry.get("DriversLicense").project({"LicenseNumber": "LEWISR261LL", "PersonId": "id"}) == \
+        {"LicenseNumber": "LEWISR261LL"}
+
+
+def test_projection_keeps_only_mapped_fields():
+    mapping = TableMapping(table=TestConstants.VEHICLE_REGISTRATION_TABLENAME,
+                           index=TestConstants.VEHICLE_REGISTRATION_INDEX,
+                           fields=TestConstants.VEHICLE_REGISTRATION_TABLE_FIELDS)
+
+    assert mapping.project(REVISION_DATA) == TestConstants.VEHICLE_REGISTRATION_DATA
+
+
+def test_projection_of_incomplete_revision_is_none():
+    mapping = TableMapping(table=TestConstants.PERSON_TABLENAME, index=TestConstants.PERSON_INDEX,
+                           fields=TestConstants.PERSON_TABLE_FIELDS)
+
+    assert mapping.project({"FirstName": "Nova"}) is None
+
+
+def test_operations_policy():
+    mapping = TableMapping(table=TestConstants.PERSON_TABLENAME, index=TestConstants.PERSON_INDEX,
+                           fields=TestConstants.PERSON_TABLE_FIELDS, operations=["insert", "delete"])
+    metadata = {"id": TestConstants.PERSON_METADATA_ID, "version": 0}
+
+    assert mapping.create_action(TestConstants.PERSON_DATA, metadata) == {
+        "action": "index", "index": TestConstants.PERSON_INDEX, "id": TestConstants.PERSON_METADATA_ID,
+        "version": 0, "body": TestConstants.PERSON_DATA}
+    assert mapping.create_action(TestConstants.PERSON_DATA, dict(metadata, version=1)) is None
+    assert mapping.create_action(None, dict(metadata, version=2))["action"] == "delete"
+
+
+def test_unknown_operations_are_rejected():
+    test_case_instance.assertRaises(ValueError, TableMapping, table=TestConstants.PERSON_TABLENAME,
+                                    index=TestConstants.PERSON_INDEX, fields=TestConstants.PERSON_TABLE_FIELDS,
+                                    operations=["upsert"])
+
+
+def test_partial_updates_mark_index_actions():
+    registry = TableMappingRegistry.from_config({"tables": [{
+        "table": TestConstants.VEHICLE_REGISTRATION_TABLENAME, "index": TestConstants.VEHICLE_REGISTRATION_INDEX,
+        "fields": TestConstants.VEHICLE_REGISTRATION_TABLE_FIELDS, "partial_updates": True}]})
+    mapping = registry.get(TestConstants.VEHICLE_REGISTRATION_TABLENAME)
+    metadata = {"id": TestConstants.VEHICLE_REGISTRATION_METADATA_ID, "version": 1}
+
+    assert mapping.create_action(REVISION_DATA, metadata)["partial"]
+    assert "partial" not in mapping.create_action(None, metadata)
@@ -0,0 +1,82 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.throttle import AdaptiveController, TokenBucket
+
+
+def __controller():
+    return AdaptiveController(min_bulk_size=50, max_bulk_size=500, bulk_size_step=50, max_in_flight=4,
+                              latency_target=1.0)
+
+
+def test_rejections_cut_settings_multiplicatively():
+    controller = __controller()
+
+    # Trigger
+    controller.record(latency=0.2, rejected=True)
+
+    # Verify
+    assert controller.bulk_size == 250
+    assert controller.in_flight == 2
+    assert controller.metrics()["rejections"] == 1
+
+
+def test_latency_spikes_cut_settings_down_to_the_minimum():
+    controller = __controller()
+
+    # Trigger
+    for request in range(10):
+        controller.record(latency=2.5, rejected=False)
+
+    # Verify
+    assert controller.bulk_size == 50
+    assert controller.in_flight == 1
+    assert controller.metrics()["decreases"] == 10
+    assert controller.metrics()["rejections"] == 0
+
+
+def test_good_requests_grow_settings_additively_up_to_the_maximum():
+    controller = __controller()
+    controller.record(latency=0.2, rejected=True)
+
+    # Trigger
+    controller.record(latency=0.2, rejected=False)
+    controller.record(latency=0.2, rejected=False)
+
+    # Verify
+    assert controller.bulk_size == 350
+    assert controller.in_flight == 3
+
+    for request in range(20):
+        controller.record(latency=0.2, rejected=False)
+    assert controller.bulk_size == 500
+    assert controller.in_flight == 4
+
+
+def test_token_bucket_waits_for_missing_tokens():
+    now = [0.0]
+    sleeps = []
+    bucket = TokenBucket(rate=100, clock=lambda: now[0], sleep=sleeps.append)
+
+    # Trigger
+    assert bucket.acquire(100) == 0
+    assert bucket.acquire(50) == 0.5
+
+    now[0] = 2.0
+    assert bucket.acquire(100) == 0
+
+    # Verify
+    assert sleeps == [0.5]
+    assert bucket.waited == 0.5
@@ -0,0 +1,147 @@
+# Copyright 2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from src.qldb_streaming_to_es_sample.helpers.version_cache import VersionCache, content_digest
+from src.qldb_streaming_to_es_sample.clients.serializer import IonJSONSerializer
+from src.qldb_streaming_to_es_sample.helpers.metrics import Metrics
+
+KEY = ("person_index", "id")
+
+
+def test_versions_at_or_below_the_confirmed_one_are_applied():
+    cache = VersionCache(max_size=10)
+
+    # Trigger
+    cache.update(KEY, 3)
+    cache.update(KEY, 2)
+
+    # Verify
+    assert cache.is_applied(KEY, 2)
+    assert cache.is_applied(KEY, 3)
+    assert not cache.is_applied(KEY, 4)
+    assert not cache.is_applied(("person_index", "other"), 0)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_documents_are_evicted():
+    metrics = Metrics(namespace="test")
+    cache = VersionCache(max_size=2, metrics=metrics)
+    cache.update(("index", "1"), 1)
+    cache.update(("index", "2"), 1)
+
+    # Trigger
+    cache.is_applied(("index", "1"), 1)
+    cache.update(("index", "3"), 1)
+
+    # Verify
+    assert len(cache) == 2
+    assert not cache.is_applied(("index", "2"), 1)
+    assert cache.is_applied(("index", "1"), 1)
+    assert cache.evictions == 1
+    assert metrics.to_emf()["VersionCacheEvictions"] == 1
+    assert metrics.to_emf()["VersionCacheHits"] == 2
+
+
+def test_snapshots_are_loaded_in_recency_order(tmp_path):
+    path = str(tmp_path / "version-cache.json")
+    cache = VersionCache(max_size=10)
+    cache.update(("index", "1"), 1)
+    cache.update(("index", "2"), 5)
+
+    # Trigger
+    cache.save(path)
+    loaded = VersionCache(max_size=1)
+    loaded.load(path)
+
+    # Verify
+    assert len(loaded) == 1
+    assert loaded.is_applied(("index", "2"), 5)
+
+
+def test_only_changes_of_versions_or_digests_mark_the_cache_changed(tmp_path):
+    path = str(tmp_path / "version-cache.json")
+    cache = VersionCache(max_size=10)
+    cache.update(("index", "1"), 1, "digest")
+    assert cache.changed
+
+    # Trigger
+    cache.save(path)
+    cache.update(("index", "1"), 1, "digest")
+    cache.update(("index", "1"), 0)
+    cache.is_applied(("index", "1"), 1)
+
+    # Verify
+    assert not cache.changed
+
+    cache.discard_digest(("index", "1"))
+    assert cache.changed
+
+    loaded = VersionCache(max_size=10)
+    loaded.load(path)
+    assert not loaded.changed
+
+
+def test_missing_or_corrupt_snapshots_leave_the_cache_empty(tmp_path):
+    path = tmp_path / "version-cache.json"
+    cache = VersionCache(max_size=10)
+
+    # Trigger
+    cache.load(str(path))
+    path.write_text("[[\"index\", ")
+    cache.load(str(path))
+
+    # Verify
+    assert len(cache) == 0
+
+
+def test_digests_are_kept_with_the_latest_version():
+    cache = VersionCache(max_size=10)
+    digest = content_digest(IonJSONSerializer(), {"VIN": "L12345", "State": "WA"})
+
+    # Trigger
+    cache.update(KEY, 2, digest)
+    cache.update(KEY, 1, "older")
+
+    # Verify
+    assert cache.is_unchanged(KEY, digest)
+    assert not cache.is_unchanged(KEY, content_digest(IonJSONSerializer(), {"VIN": "L12345", "State": "OR"}))
+    assert cache.unchanged == 1
+
+    # Trigger
+    cache.discard_digest(KEY)
+
+    # Verify
+    assert not cache.is_unchanged(KEY, digest)
+    assert cache.is_applied(KEY, 2)
+
+
+def test_previous_state_is_only_known_for_the_preceding_version():
+    cache = VersionCache(max_size=10)
+    state = (7, 1, {"VIN": "L12345", "State": "WA"})
+
+    # Trigger
+    cache.update(KEY, 2, "digest", state)
+    cache.discard_digest(KEY)
+
+    # Verify
+    assert cache.previous_state(KEY, 3) == state
+    assert cache.previous_state(KEY, 4) is None
+    assert cache.previous_state(("person_index", "other"), 3) is None
+
+    # Trigger
+    cache.update(KEY, 3, "digest")
+
+    # Verify
+    assert cache.previous_state(KEY, 4) is None